@@ -1,179 +1,55 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-from datetime import datetime, date, time, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from datetime import datetime, date, timedelta
 import json
 import hashlib
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+import secrets
 import tempfile
 import os
+import functools
+import uuid
 from io import BytesIO
-# Email configuration
-EMAIL_CONFIG = {
-    'smtp_server': st.secrets["email"]["smtp_server"],
-    'smtp_port': st.secrets["email"]["smtp_port"],
-    'from_email': st.secrets["email"]["from_email"],
-    'password': st.secrets["email"]["password"],
-    'to_email': st.secrets["email"]["to_email"]
-}
+from gateway import (
+    exports, locks, mail, memprofile, metrics, pipeline, precomputed, profiling, reports, sqlprofile
+)
+from gateway.auth import validate_password
+from gateway.config import get_email_config
+from gateway.locks import DatabaseBusyError
+from gateway.metrics import timed
+from gateway.db import (
+    init_database, verify_user, create_user, create_candidate, verify_candidate,
+    verify_candidate_admin, has_candidate_taken_assessment, get_active_assessment_window,
+    has_taken_assessment_in_window, create_assessment_window, toggle_assessment_window,
+    save_assessment_draft, load_assessment_draft, reset_user_password, verify_user_exists,
+    deactivate_past_windows, load_assessment_windows, load_employee_assessments,
+    load_all_assessments, load_candidate_assessments, load_candidates,
+    deactivate_expired_candidates, save_employee_assessment, save_candidate_assessment,
+    load_submission_outcomes, load_assessment_scores, load_competency_summary, iter_report_data
+)
+from gateway.questions import DEFAULT_LANGUAGE
+from gateway.scoring import calculate_scores, expand_interpretation, get_interpretation
+from gateway.templates import all_templates, template_for_role
+
+
 def generate_assessment_pdf(user_data, scores, interpretations, overall_assessment, total_possible, user_type="employee"):
     """Generate PDF report for assessment results"""
     try:
-        buffer = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-        doc = SimpleDocTemplate(buffer.name, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=1  # Center alignment
-        )
-        story.append(Paragraph("Tuaman Engineering Limited", title_style))
-        story.append(Paragraph("Behavioral Competency Assessment Report", title_style))
-        story.append(Spacer(1, 20))
-        
-        # User Information
-        if user_type == "employee":
-            user_info = [
-                ['Employee ID:', user_data.get('employee_id', 'N/A')],
-                ['Name:', user_data.get('employee_name', 'N/A')],
-                ['Department:', user_data.get('department', 'N/A')],
-                ['Assessment Date:', user_data.get('submit_date', 'N/A')]
-            ]
-        else:  # candidate
-            user_info = [
-                ['Candidate Code:', user_data.get('candidate_code', 'N/A')],
-                ['Name:', user_data.get('full_name', 'N/A')],
-                ['Position Applied:', user_data.get('position_applied', 'N/A')],
-                ['Assessment Date:', user_data.get('submit_date', 'N/A')]
-            ]
-        
-        # Create user info table
-        user_table = Table(user_info, colWidths=[2*inch, 4*inch])
-        user_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(user_table)
-        story.append(Spacer(1, 20))
-        
-        # Scores section
-        story.append(Paragraph("Assessment Scores", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        score_data = [['Competency', 'Score', 'Max Score', 'Percentage']]
-        for comp, score in scores.items():
-            max_score = total_possible.get(comp, 36)
-            percentage = f"{(score/max_score)*100:.1f}%"
-            score_data.append([comp, str(score), str(max_score), percentage])
-        
-        # Add total row
-        total_score = sum(scores.values())
-        total_max = sum(total_possible.values())
-        total_percentage = f"{(total_score/total_max)*100:.1f}%"
-        score_data.append(['TOTAL', str(total_score), str(total_max), total_percentage])
-        
-        score_table = Table(score_data, colWidths=[3*inch, 1*inch, 1*inch, 1*inch])
-        score_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(score_table)
-        story.append(Spacer(1, 20))
-        
-        # Overall assessment
-        story.append(Paragraph("Overall Assessment", styles['Heading2']))
-        story.append(Paragraph(overall_assessment, styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.close()
-        
-        return buffer.name
-        
+        return reports.generate_assessment_pdf(user_data, scores, interpretations, overall_assessment, total_possible, user_type)
     except Exception as e:
         st.error(f"Error generating PDF: {str(e)}")
         return None
 
-def send_email_with_attachment(subject, body, attachment_path, attachment_name, cc_emails=None):
+def send_email_with_attachment(subject, body, attachment_path, attachment_name, cc_emails=None, to_email=None,
+                               stage=None):
     """Send email with attachment"""
+    import smtplib
+    
     try:
-        st.write("📧 Starting email process...")
-        
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_CONFIG['from_email']
-        msg['To'] = EMAIL_CONFIG['to_email']
-        msg['Subject'] = subject
-        
-        recipients = [EMAIL_CONFIG['to_email']]
-        if cc_emails:
-            cc_emails = [email.strip() for email in cc_emails if email.strip()]
-            if cc_emails:
-                msg['Cc'] = ', '.join(cc_emails)
-                recipients.extend(cc_emails)
-        
-        # Add body
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Attach file if exists
-        if attachment_path and os.path.exists(attachment_path):
-            st.write(f"📎 Attaching file: {attachment_name}")
-            with open(attachment_path, "rb") as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-            
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename="{attachment_name}"'
-            )
-            msg.attach(part)
-        
-        # Connect to server
-        st.write("🔗 Connecting to Gmail SMTP...")
-        server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
-        
-        st.write("🔐 Starting TLS encryption...")
-        server.starttls()
-        
-        st.write("👤 Logging in...")
-        server.login(EMAIL_CONFIG['from_email'], EMAIL_CONFIG['password'])
-        
-        st.write("📤 Sending email...")
-        server.sendmail(EMAIL_CONFIG['from_email'], recipients, msg.as_string())
-        server.quit()
-        
+        recipients = mail.send_email_with_attachment(
+            subject, body, attachment_path, attachment_name, cc_emails,
+            to_email=to_email, progress=st.write, stage=stage
+        )
         st.success(f"✅ Email sent successfully to: {', '.join(recipients)}")
         return True
         
@@ -189,6 +65,7 @@ def send_email_with_attachment(subject, body, attachment_path, attachment_name,
         st.error(f"Error type: {type(e).__name__}")
         return False
 
+@timed('page')
 def show_email_preview(email_type, user_data, attachment_path=None, attachment_name=None):
     """Show email preview with editable fields"""
     st.subheader("📧 Email Preview")
@@ -217,8 +94,9 @@ Assessment System"""
     import time
     form_key = f"email_form_{email_type}_{int(time.time())}"
     
-    from_email = st.text_input("From:", value=EMAIL_CONFIG['from_email'], disabled=True, key=f"from_{form_key}")
-    to_email = st.text_input("To:", value=EMAIL_CONFIG['to_email'], key=f"to_{form_key}")
+    email_config = get_email_config()
+    from_email = st.text_input("From:", value=email_config['from_email'], disabled=True, key=f"from_{form_key}")
+    to_email = st.text_input("To:", value=email_config['to_email'], key=f"to_{form_key}")
     cc_emails = st.text_input("CC:", placeholder="email1@domain.com, email2@domain.com", key=f"cc_{form_key}")
     subject = st.text_input("Subject:", value=default_subject, key=f"subject_{form_key}")
     body = st.text_area("Message Body:", value=default_body, height=200, key=f"body_{form_key}")
@@ -232,12 +110,9 @@ Assessment System"""
             if cc_emails:
                 cc_list = [email.strip() for email in cc_emails.split(',') if email.strip()]
             
-            # Update EMAIL_CONFIG
-            EMAIL_CONFIG['to_email'] = to_email
-            
             # Call the email function
             with st.spinner("Sending email..."):
-                success = send_email_with_attachment(subject, body, attachment_path, attachment_name, cc_list)
+                success = send_email_with_attachment(subject, body, attachment_path, attachment_name, cc_list, to_email=to_email)
             
             if success:
                 st.success("✅ Email sent successfully!")
@@ -246,693 +121,374 @@ Assessment System"""
                 st.error("❌ Failed to send email!")
         else:
             st.error("❌ Please fill in subject and message body.")
-# Database setup
-def init_database():
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    # Existing assessments table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS assessments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id TEXT NOT NULL,
-            employee_name TEXT NOT NULL,
-            department TEXT,
-            assessment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            submit_date DATE,
-            submit_time TIME,
-            language TEXT,
-            window_id INTEGER,
-            accountability_score INTEGER,
-            teamwork_score INTEGER,
-            result_orientation_score INTEGER,
-            communication_score INTEGER,
-            adaptability_score INTEGER,
-            integrity_score INTEGER,
-            conflict_resolution_score INTEGER,
-            total_score INTEGER,
-            responses TEXT,
-            interpretation TEXT,
-            FOREIGN KEY (window_id) REFERENCES assessment_windows (id)
-        )
-    ''')
-    
-    # Check if columns exist, if not add them
-    cursor.execute("PRAGMA table_info(assessments)")
-    columns = [column[1] for column in cursor.fetchall()]
-    
-    if 'window_id' not in columns:
-        cursor.execute('ALTER TABLE assessments ADD COLUMN window_id INTEGER')
-    if 'submit_date' not in columns:
-        cursor.execute('ALTER TABLE assessments ADD COLUMN submit_date DATE')
-    if 'submit_time' not in columns:
-        cursor.execute('ALTER TABLE assessments ADD COLUMN submit_time TIME')
-    
-    # Existing users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id TEXT UNIQUE NOT NULL,
-            employee_name TEXT NOT NULL,
-            password_hash TEXT NOT NULL,
-            department TEXT NOT NULL,
-            user_type TEXT DEFAULT 'employee',
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Existing assessment windows table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS assessment_windows (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            window_name TEXT NOT NULL,
-            start_date DATE NOT NULL,
-            end_date DATE NOT NULL,
-            start_time TIME NOT NULL,
-            end_time TIME NOT NULL,
-            is_active BOOLEAN DEFAULT 1,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            created_by TEXT NOT NULL
-        )
-    ''')
-    
-    # NEW: Candidates table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS candidates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            candidate_code TEXT UNIQUE NOT NULL,
-            full_name TEXT NOT NULL,
-            position_applied TEXT NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            expires_at DATETIME NOT NULL,
-            is_active BOOLEAN DEFAULT 1
-        )
-    ''')
-    
-    # NEW: Candidate assessments table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS candidate_assessments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            candidate_code TEXT NOT NULL,
-            full_name TEXT NOT NULL,
-            position_applied TEXT,
-            assessment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            submit_date DATE,
-            submit_time TIME,
-            language TEXT,
-            accountability_score INTEGER,
-            teamwork_score INTEGER,
-            result_orientation_score INTEGER,
-            communication_score INTEGER,
-            adaptability_score INTEGER,
-            integrity_score INTEGER,
-            conflict_resolution_score INTEGER,
-            total_score INTEGER,
-            responses TEXT,
-            interpretation TEXT,
-            FOREIGN KEY (candidate_code) REFERENCES candidates (candidate_code)
-        )
-    ''')
-    
-    # NEW: Candidate admin table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS candidate_admins (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            admin_id TEXT UNIQUE NOT NULL,
-            admin_name TEXT NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Insert default admins
-    admin_password = hashlib.sha256("admin123".encode()).hexdigest()
-    cursor.execute('''
-        INSERT OR IGNORE INTO users (employee_id, employee_name, password_hash, department, user_type)
-        VALUES (?, ?, ?, ?, ?)
-    ''', ("admin", "Administrator", admin_password, "Administration", "admin"))
-    
-    candidate_admin_password = hashlib.sha256("candidateadmin123".encode()).hexdigest()
-    cursor.execute('''
-        INSERT OR IGNORE INTO candidate_admins (admin_id, admin_name, password_hash)
-        VALUES (?, ?, ?)
-    ''', ("candidateadmin", "Candidate Administrator", candidate_admin_password))
-    
-    conn.commit()
-    conn.close()
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_user(employee_id, password):
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    password_hash = hash_password(password)
-    cursor.execute('''
-        SELECT employee_id, employee_name, department, user_type 
-        FROM users 
-        WHERE employee_id = ? AND password_hash = ?
-    ''', (employee_id, password_hash))
-    
-    result = cursor.fetchone()
-    conn.close()
-    
-    if result:
-        return {
-            'employee_id': result[0],
-            'employee_name': result[1],
-            'department': result[2],
-            'user_type': result[3]
-        }
-    return None
 
-def create_user(employee_id, employee_name, password, department):
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    password_hash = hash_password(password)
-    try:
-        cursor.execute('''
-            INSERT INTO users (employee_id, employee_name, password_hash, department)
-            VALUES (?, ?, ?, ?)
-        ''', (employee_id, employee_name, password_hash, department))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False
 
-def generate_candidate_code():
-    """Generate next candidate code"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT COUNT(*) FROM candidates')
-    count = cursor.fetchone()[0]
-    conn.close()
-    
-    return f"TELCAN{count + 1:05d}"
+def session_user_label():
+    """Id of the logged-in user, for profiles and memory stats"""
+    user = st.session_state.get('user') or {}
+    return user.get('employee_id') or user.get('candidate_code') or user.get('admin_id') or 'anonymous'
 
-def create_candidate(full_name, position_applied, password):
-    """Create new candidate with 2-day expiry"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    candidate_code = generate_candidate_code()
-    password_hash = hash_password(password)
-    expires_at = datetime.now() + timedelta(days=2)
-    
-    try:
-        cursor.execute('''
-            INSERT INTO candidates (candidate_code, full_name, position_applied, password_hash, expires_at)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (candidate_code, full_name, position_applied, password_hash, expires_at))
-        conn.commit()
-        conn.close()
-        return candidate_code
-    except sqlite3.IntegrityError:
-        conn.close()
-        return None
 
-def verify_candidate(candidate_code, password):
-    """Verify candidate login and check expiry"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    password_hash = hash_password(password)
-    cursor.execute('''
-        SELECT candidate_code, full_name, position_applied, expires_at, is_active
-        FROM candidates 
-        WHERE candidate_code = ? AND password_hash = ?
-    ''', (candidate_code, password_hash))
-    
-    result = cursor.fetchone()
-    conn.close()
-    
-    if result:
-        expires_at = datetime.fromisoformat(result[3])
-        if datetime.now() > expires_at or not result[4]:
-            return None  # Expired or inactive
-        
-        return {
-            'candidate_code': result[0],
-            'full_name': result[1],
-            'position_applied': result[2],
-            'expires_at': result[3]
-        }
-    return None
-
-def verify_candidate_admin(admin_id, password):
-    """Verify candidate admin login"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    password_hash = hash_password(password)
-    cursor.execute('''
-        SELECT admin_id, admin_name
-        FROM candidate_admins 
-        WHERE admin_id = ? AND password_hash = ?
-    ''', (admin_id, password_hash))
-    
-    result = cursor.fetchone()
-    conn.close()
-    
-    if result:
-        return {
-            'admin_id': result[0],
-            'admin_name': result[1],
-            'user_type': 'candidate_admin'
-        }
-    return None
+def track_memory(func):
+    """Measure a page render with tracemalloc while an admin has tracing on"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not memprofile.is_enabled():
+            return func(*args, **kwargs)
+        if 'memory_session_id' not in st.session_state:
+            st.session_state.memory_session_id = uuid.uuid4().hex
+        with memprofile.render(func.__name__, st.session_state.memory_session_id,
+                               session_user_label(), st.session_state):
+            return func(*args, **kwargs)
+    return wrapper
 
-def has_candidate_taken_assessment(candidate_code):
-    """Check if candidate has already taken assessment"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT COUNT(*) FROM candidate_assessments 
-        WHERE candidate_code = ?
-    ''', (candidate_code,))
-    
-    count = cursor.fetchone()[0]
-    conn.close()
-    
-    return count > 0
 
-def get_active_assessment_window():
-    """Get currently active assessment window"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    # Use IST timezone
-    from datetime import timezone, timedelta
-    ist = timezone(timedelta(hours=5, minutes=30))
-    
-    current_datetime = datetime.now(ist)
-    current_date = current_datetime.date()
-    current_time = current_datetime.time()
-    
-    # Convert time to string for SQLite compatibility
-    current_time_str = current_time.strftime('%H:%M:%S')
-    
-    cursor.execute('''
-        SELECT * FROM assessment_windows 
-        WHERE is_active = 1 
-        AND start_date <= ? AND end_date >= ?
-        ORDER BY created_at DESC
-    ''', (current_date, current_date))
-    
-    results = cursor.fetchall()
-    conn.close()
-    
-    # Check time constraints in Python for more reliable comparison
-    for result in results:
-        start_time_str = result[4]  # start_time column
-        end_time_str = result[5]    # end_time column
-        
-        # Convert string times to time objects for comparison
+# Shown when a write still finds the database locked after every retry
+DATABASE_BUSY_MESSAGE = ("The system is handling many submissions right now. "
+                         "Your answers are kept, please press Submit again in a moment.")
+
+
+# Minimum number of seconds between two draft writes for the same session
+DRAFT_SAVE_INTERVAL = 5
+
+
+def restore_assessment_draft(owner_type, owner_id, window_id):
+    """Pre-fill the assessment widgets from a saved draft once per session"""
+    restored_key = f"draft_restored_{owner_type}_{owner_id}_{window_id}"
+    if st.session_state.get(restored_key):
+        return
+    st.session_state[restored_key] = True
+
+    draft = load_assessment_draft(owner_type, owner_id, window_id)
+    if not draft:
+        return
+
+    if draft['language'] and 'assessment_language' not in st.session_state:
+        st.session_state.assessment_language = draft['language']
+    for key, value in draft['responses'].items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+
+    st.info("📝 Your saved answers have been restored. / आपके सहेजे गए उत्तर पुनः लोड कर दिए गए हैं।")
+
+
+def autosave_assessment_draft(owner_type, owner_id, window_id, language, responses):
+    """Save answered questions as one batched write, at most every DRAFT_SAVE_INTERVAL seconds
+
+    A change made sooner is kept in session_state as pending and written by
+    flush_assessment_drafts on a later rerun, whatever page it renders.
+    """
+    answered = {key: value for key, value in responses.items() if value is not None}
+    payload = json.dumps({'language': language, 'responses': answered}, sort_keys=True)
+
+    state_key = f"draft_saved_{owner_type}_{owner_id}_{window_id}"
+    last_save = st.session_state.get(state_key)
+    pending = st.session_state.setdefault('draft_pending', {})
+
+    # First render of the page only records a baseline, nothing has been answered yet
+    if last_save is None:
+        st.session_state[state_key] = {'payload': payload, 'at': datetime.now().timestamp()}
+        return
+    if last_save['payload'] == payload:
+        pending.pop(state_key, None)
+        return
+
+    pending[state_key] = {'draft': (owner_type, owner_id, window_id, language, answered), 'payload': payload}
+    flush_assessment_drafts()
+
+
+def flush_assessment_drafts(force=False):
+    """Write the pending drafts whose DRAFT_SAVE_INTERVAL has passed, or all of them with force
+
+    Called on every rerun, and with force before a submit, a page change or
+    a logout, so no answer is left only in the session.
+    """
+    pending = st.session_state.get('draft_pending')
+    if not pending:
+        return
+    now = datetime.now().timestamp()
+    for state_key, entry in list(pending.items()):
+        last_save = st.session_state.get(state_key)
+        if not force and last_save and now - last_save['at'] < DRAFT_SAVE_INTERVAL:
+            continue
         try:
-            start_time = datetime.strptime(start_time_str, '%H:%M:%S').time()
-            end_time = datetime.strptime(end_time_str, '%H:%M:%S').time()
-            
-            # Check if current time is within the window
-            if start_time <= current_time <= end_time:
-                return {
-                    'id': result[0],
-                    'window_name': result[1],
-                    'start_date': result[2],
-                    'end_date': result[3],
-                    'start_time': result[4],
-                    'end_time': result[5],
-                    'is_active': result[6]
-                }
-        except ValueError:
-            # Skip if time format is invalid
+            save_assessment_draft(*entry['draft'])
+        except sqlite3.Error:
+            # Autosave is best effort, the entry stays pending for the next rerun
             continue
-    
-    return None
-def has_taken_assessment_in_window(employee_id, window_id):
-    """Check if employee has already taken assessment in this window"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT COUNT(*) FROM assessments 
-        WHERE employee_id = ? AND window_id = ?
-    ''', (employee_id, window_id))
-    
-    count = cursor.fetchone()[0]
-    conn.close()
-    
-    return count > 0
+        st.session_state[state_key] = {'payload': entry['payload'], 'at': now}
+        del pending[state_key]
 
-def create_assessment_window(window_name, start_date, end_date, start_time, end_time, created_by):
-    """Create new assessment window"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    try:
-        # Convert time objects to strings for SQLite compatibility
-        start_time_str = start_time.strftime('%H:%M:%S') if hasattr(start_time, 'strftime') else str(start_time)
-        end_time_str = end_time.strftime('%H:%M:%S') if hasattr(end_time, 'strftime') else str(end_time)
-        
-        cursor.execute('''
-            INSERT INTO assessment_windows (window_name, start_date, end_date, start_time, end_time, created_by)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (window_name, start_date, end_date, start_time_str, end_time_str, created_by))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        conn.close()
-        return False
 
-def toggle_assessment_window(window_id, is_active):
-    """Toggle assessment window active status"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        UPDATE assessment_windows 
-        SET is_active = ? 
-        WHERE id = ?
-    ''', (is_active, window_id))
-    
-    conn.commit()
-    conn.close()
-
-# Question bank with bilingual support (keeping existing questions)
-QUESTIONS = {
-    "Accountability": {
-        "en": [
-            {"type": "likert", "question": "I take full responsibility for my work outcomes, even when things go wrong.", "marks": 5},
-            {"type": "situational", "question": "You missed a project deadline due to unexpected issues. What do you do?", 
-             "options": ["Blame external factors", "Take responsibility and create recovery plan", "Wait for supervisor guidance", "Ignore and move to next task"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "Choose what describes you better:", 
-             "options": ["I prefer clear instructions", "I take initiative without being asked"], "marks": 4},
-            {"type": "likert", "question": "I consistently deliver on my commitments and promises.", "marks": 5},
-            {"type": "situational", "question": "You discover an error in your completed work that no one else has noticed. You:", 
-             "options": ["Keep quiet and hope no one finds out", "Immediately report and fix the error", "Wait to see if someone else catches it", "Fix it quietly without telling anyone"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "When facing challenges, I:", 
-             "options": ["Look for someone else to handle it", "Take ownership and find solutions"], "marks": 4},
-            {"type": "likert", "question": "I admit my mistakes openly and learn from them.", "marks": 5}
-        ],
-        "hi": [
-            {"type": "likert", "question": "मैं अपने काम के परिणामों की पूरी जिम्मेदारी लेता हूं, भले ही चीजें गलत हो जाएं।", "marks": 5},
-            {"type": "situational", "question": "आप अप्रत्याशित समस्याओं के कारण प्रोजेक्ट की समय सीमा चूक गए। आप क्या करते हैं?", 
-             "options": ["बाहरी कारकों को दोष देना", "जिम्मेदारी लेना और रिकवरी प्लान बनाना", "सुपरवाइजर के मार्गदर्शन का इंतजार करना", "अनदेखा करके अगले काम पर जाना"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "चुनें कि आपका बेहतर वर्णन क्या करता है:", 
-             "options": ["मैं स्पष्ट निर्देश पसंद करता हूं", "मैं बिना कहे पहल करता हूं"], "marks": 4},
-            {"type": "likert", "question": "मैं अपनी प्रतिबद्धताओं और वादों को लगातार पूरा करता हूं।", "marks": 5},
-            {"type": "situational", "question": "आप अपने पूरे किए गए काम में एक त्रुटि की खोज करते हैं जिसे किसी और ने नहीं देखा है। आप:", 
-             "options": ["चुप रहना और उम्मीद करना कि कोई पता न लगाए", "तुरंत रिपोर्ट करना और त्रुटि ठीक करना", "देखना कि कोई और इसे पकड़ता है या नहीं", "चुपचाप इसे ठीक करना बिना किसी को बताए"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "चुनौतियों का सामना करते समय, मैं:", 
-             "options": ["इसे संभालने के लिए किसी और को ढूंढता हूं", "स्वामित्व लेता हूं और समाधान खोजता हूं"], "marks": 4},
-            {"type": "likert", "question": "मैं अपनी गलतियों को खुले तौर पर स्वीकार करता हूं और उनसे सीखता हूं।", "marks": 5}
-        ]
-    },
-    "Team Collaboration": {
-        "en": [
-            {"type": "likert", "question": "I actively contribute to team discussions and decision-making.", "marks": 5},
-            {"type": "situational", "question": "A team member is struggling with their tasks. You:", 
-             "options": ["Focus on your own work", "Offer help and support", "Report to supervisor", "Wait for them to ask for help"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "In team projects, I prefer to:", 
-             "options": ["Work independently", "Collaborate closely with others"], "marks": 4},
-            {"type": "likert", "question": "I respect and value diverse perspectives from team members.", "marks": 5},
-            {"type": "situational", "question": "Your team has conflicting opinions on a project approach. You:", 
-             "options": ["Push for your own idea", "Facilitate discussion to find common ground", "Stay neutral and let others decide", "Go with the majority opinion"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "When team goals conflict with personal goals, I:", 
-             "options": ["Prioritize personal goals", "Put team goals first"], "marks": 4},
-            {"type": "likert", "question": "I share knowledge and resources freely with my teammates.", "marks": 5}
-        ],
-        "hi": [
-            {"type": "likert", "question": "मैं टीम की चर्चाओं और निर्णय लेने में सक्रिय रूप से योगदान देता हूं।", "marks": 5},
-            {"type": "situational", "question": "एक टीम सदस्य अपने कार्यों के साथ संघर्ष कर रहा है। आप:", 
-             "options": ["अपने काम पर ध्यान देना", "मदद और सहायता की पेशकश करना", "सुपरवाइजर को रिपोर्ट करना", "उनके मदद मांगने का इंतजार करना"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "टीम प्रोजेक्ट्स में, मैं पसंद करता हूं:", 
-             "options": ["स्वतंत्र रूप से काम करना", "दूसरों के साथ मिलकर काम करना"], "marks": 4},
-            {"type": "likert", "question": "मैं टीम के सदस्यों के विविध दृष्टिकोणों का सम्मान और मूल्यांकन करता हूं।", "marks": 5},
-            {"type": "situational", "question": "आपकी टीम में प्रोजेक्ट दृष्टिकोण पर विरोधाभासी राय हैं। आप:", 
-             "options": ["अपने विचार के लिए जोर देना", "साझा आधार खोजने के लिए चर्चा की सुविधा देना", "तटस्थ रहना और दूसरों को निर्णय लेने देना", "बहुमत की राय के साथ जाना"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "जब टीम के लक्ष्य व्यक्तिगत लक्ष्यों से टकराते हैं, तो मैं:", 
-             "options": ["व्यक्तिगत लक्ष्यों को प्राथमिकता देता हूं", "टीम के लक्ष्यों को पहले रखता हूं"], "marks": 4},
-            {"type": "likert", "question": "मैं अपने टीम के साथियों के साथ ज्ञान और संसाधनों को स्वतंत्र रूप से साझा करता हूं।", "marks": 5}
-        ]
-    },
-    "Result Orientation": {
-        "en": [
-            {"type": "likert", "question": "I consistently focus on achieving measurable outcomes.", "marks": 5},
-            {"type": "situational", "question": "You're working on a project with tight deadlines. You:", 
-             "options": ["Work at your normal pace", "Prioritize tasks and work efficiently", "Ask for deadline extension", "Focus on perfection over completion"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "I am more motivated by:", 
-             "options": ["The process of working", "Achieving specific results"], "marks": 4},
-            {"type": "likert", "question": "I set clear, measurable goals for myself and track progress.", "marks": 5},
-            {"type": "situational", "question": "A project is 80% complete but facing quality issues. You:", 
-             "options": ["Rush to finish on time", "Address quality issues even if it delays completion", "Submit as is and fix later", "Seek guidance from supervisor"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "When facing obstacles, I:", 
-             "options": ["Find alternative approaches", "Wait for conditions to improve"], "marks": 4},
-            {"type": "likert", "question": "I celebrate achievements and learn from setbacks.", "marks": 5}
-        ],
-        "hi": [
-            {"type": "likert", "question": "मैं लगातार मापने योग्य परिणाम प्राप्त करने पर ध्यान देता हूं।", "marks": 5},
-            {"type": "situational", "question": "आप तंग समय सीमा वाले प्रोजेक्ट पर काम कर रहे हैं। आप:", 
-             "options": ["अपनी सामान्य गति से काम करना", "कार्यों को प्राथमिकता देना और कुशलता से काम करना", "समय सीमा बढ़ाने के लिए कहना", "पूर्णता पर ध्यान देना बजाय समापन के"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "मैं अधिक प्रेरित होता हूं:", 
-             "options": ["काम करने की प्रक्रिया से", "विशिष्ट परिणाम प्राप्त करने से"], "marks": 4},
-            {"type": "likert", "question": "मैं अपने लिए स्पष्ट, मापने योग्य लक्ष्य निर्धारित करता हूं और प्रगति को ट्रैक करता हूं।", "marks": 5},
-            {"type": "situational", "question": "एक प्रोजेक्ट 80% पूरा है लेकिन गुणवत्ता की समस्याओं का सामना कर रहा है। आप:", 
-             "options": ["समय पर पूरा करने के लिए जल्दबाजी करना", "गुणवत्ता की समस्याओं को संबोधित करना भले ही इससे देरी हो", "जैसा है वैसा जमा करना और बाद में ठीक करना", "सुपरवाइजर से मार्गदर्शन लेना"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "बाधाओं का सामना करते समय, मैं:", 
-             "options": ["वैकल्पिक दृष्टिकोण खोजता हूं", "स्थितियों के सुधरने का इंतजार करता हूं"], "marks": 4},
-            {"type": "likert", "question": "मैं उपलब्धियों का जश्न मनाता हूं और असफलताओं से सीखता हूं।", "marks": 5}
-        ]
-    },
-    "Communication Skills": {
-        "en": [
-            {"type": "likert", "question": "I express my ideas clearly and concisely.", "marks": 5},
-            {"type": "situational", "question": "You need to explain a complex technical concept to non-technical colleagues. You:", 
-             "options": ["Use technical jargon", "Simplify and use analogies", "Refer them to documentation", "Ask a technical expert to explain"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "In meetings, I prefer to:", 
-             "options": ["Listen more than speak", "Actively participate in discussions"], "marks": 4},
-            {"type": "likert", "question": "I am an active listener who seeks to understand others' perspectives.", "marks": 5},
-            {"type": "situational", "question": "A colleague seems confused by your instructions. You:", 
-             "options": ["Blame them for not listening", "Repeat the same instructions louder", "Rephrase and confirm understanding", "Put everything in writing"], 
-             "correct": 2, "marks": 6},
-            {"type": "likert", "question": "I adapt my communication style based on my audience.", "marks": 5},
-            {"type": "forced_choice", "question": "When presenting complex information, I:", 
-             "options": ["Use technical details", "Simplify with examples"], "marks": 4}
-        ],
-        "hi": [
-            {"type": "likert", "question": "मैं अपने विचारों को स्पष्ट और संक्षिप्त रूप से व्यक्त करता हूं।", "marks": 5},
-            {"type": "situational", "question": "आपको गैर-तकनीकी सहयोगियों को एक जटिल तकनीकी अवधारणा समझानी है। आप:", 
-             "options": ["तकनीकी शब्दजाल का उपयोग करना", "सरल बनाना और उदाहरण का उपयोग करना", "उन्हें दस्तावेज़ीकरण का संदर्भ देना", "किसी तकनीकी विशेषज्ञ से समझाने को कहना"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "बैठकों में, मैं पसंद करता हूं:", 
-             "options": ["बोलने से ज्यादा सुनना", "चर्चाओं में सक्रिय रूप से भाग लेना"], "marks": 4},
-            {"type": "likert", "question": "मैं एक सक्रिय श्रोता हूं जो दूसरों के दृष्टिकोण को समझने की कोशिश करता हूं।", "marks": 5},
-            {"type": "situational", "question": "एक सहयोगी आपके निर्देशों से भ्रमित लग रहा है। आप:", 
-             "options": ["उन्हें न सुनने के लिए दोष देना", "वही निर्देश जोर से दोहराना", "दोबारा कहना और समझ की पुष्टि करना", "सब कुछ लिखित में देना"], 
-             "correct": 2, "marks": 6},
-            {"type": "likert", "question": "मैं अपने दर्शकों के आधार पर अपनी संचार शैली को अनुकूलित करता हूं।", "marks": 5},
-            {"type": "forced_choice", "question": "जटिल जानकारी प्रस्तुत करते समय, मैं:", 
-             "options": ["तकनीकी विवरण का उपयोग करता हूं", "उदाहरणों के साथ सरल बनाता हूं"], "marks": 4}
-        ]
-    },
-    "Adaptability": {
-        "en": [
-            {"type": "likert", "question": "I embrace change as an opportunity for growth.", "marks": 5},
-            {"type": "situational", "question": "Your company implements new software that changes your workflow. You:", 
-             "options": ["Resist and prefer old methods", "Learn quickly and help others adapt", "Wait for formal training", "Complain about unnecessary changes"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "When plans change suddenly, I:", 
-             "options": ["Feel stressed and overwhelmed", "Adjust and find new solutions"], "marks": 4},
-            {"type": "likert", "question": "I remain calm and focused during unexpected situations.", "marks": 5},
-            {"type": "situational", "question": "Your role responsibilities expand significantly. You:", 
-             "options": ["Feel overwhelmed and resist", "Embrace the challenge and adapt", "Ask for additional compensation first", "Delegate to others"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "I prefer:", 
-             "options": ["Predictable routines", "Variety and new challenges"], "marks": 4},
-            {"type": "likert", "question": "I learn new skills quickly when required.", "marks": 5}
-        ],
-        "hi": [
-            {"type": "likert", "question": "मैं परिवर्तन को विकास के अवसर के रूप में अपनाता हूं।", "marks": 5},
-            {"type": "situational", "question": "आपकी कंपनी नया सॉफ्टवेयर लागू करती है जो आपके कार्यप्रवाह को बदल देता है। आप:", 
-             "options": ["विरोध करना और पुराने तरीकों को पसंद करना", "जल्दी सीखना और दूसरों को अनुकूलित होने में मदद करना", "औपचारिक प्रशिक्षण का इंतजार करना", "अनावश्यक बदलावों की शिकायत करना"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "जब योजनाएं अचानक बदल जाती हैं, तो मैं:", 
-             "options": ["तनावग्रस्त और अभिभूत महसूस करता हूं", "समायोजित करता हूं और नए समाधान खोजता हूं"], "marks": 4},
-            {"type": "likert", "question": "मैं अप्रत्याशित स्थितियों के दौरान शांत और केंद्रित रहता हूं।", "marks": 5},
-            {"type": "situational", "question": "आपकी भूमिका की जिम्मेदारियां काफी बढ़ जाती हैं। आप:", 
-             "options": ["अभिभूत महसूस करना और विरोध करना", "चुनौती को अपनाना और अनुकूलित होना", "पहले अतिरिक्त मुआवजे के लिए कहना", "दूसरों को सौंपना"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "मैं पसंद करता हूं:", 
-             "options": ["अनुमानित दिनचर्या", "विविधता और नई चुनौतियां"], "marks": 4},
-            {"type": "likert", "question": "जब आवश्यक हो तो मैं नए कौशल जल्दी सीखता हूं।", "marks": 5}
-        ]
-    },
-    "Integrity": {
-        "en": [
-            {"type": "likert", "question": "I always act according to my moral principles, even under pressure.", "marks": 5},
-            {"type": "situational", "question": "You discover a billing error that benefits your company. You:", 
-             "options": ["Keep quiet to benefit company", "Report it immediately", "Wait to see if client notices", "Discuss with colleagues first"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "When faced with ethical dilemmas, I:", 
-             "options": ["Consider what others would do", "Follow my moral compass"], "marks": 4},
-            {"type": "likert", "question": "I am honest about my capabilities and limitations.", "marks": 5},
-            {"type": "situational", "question": "Your supervisor asks you to bend company policies for a client. You:", 
-             "options": ["Comply without question", "Explain policy concerns and suggest alternatives", "Refuse directly", "Ask other colleagues what they would do"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "I believe:", 
-             "options": ["Rules can be flexible when needed", "Principles should be consistently applied"], "marks": 4},
-            {"type": "likert", "question": "I treat all people with respect and fairness.", "marks": 5}
-        ],
-        "hi": [
-            {"type": "likert", "question": "मैं हमेशा अपने नैतिक सिद्धांतों के अनुसार काम करता हूं, दबाव में भी।", "marks": 5},
-            {"type": "situational", "question": "आप एक बिलिंग त्रुटि की खोज करते हैं जो आपकी कंपनी को फायदा पहुंचाती है। आप:", 
-             "options": ["कंपनी को फायदा पहुंचाने के लिए चुप रहना", "तुरंत रिपोर्ट करना", "देखना कि क्लाइंट नोटिस करता है या नहीं", "पहले सहयोगियों के साथ चर्चा करना"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "नैतिक दुविधाओं का सामना करते समय, मैं:", 
-             "options": ["विचार करता हूं कि दूसरे क्या करेंगे", "अपने नैतिक कम्पास का पालन करता हूं"], "marks": 4},
-            {"type": "likert", "question": "मैं अपनी क्षमताओं और सीमाओं के बारे में ईमानदार हूं।", "marks": 5},
-            {"type": "situational", "question": "आपका सुपरवाइजर आपसे एक क्लाइंट के लिए कंपनी की नीतियों को मोड़ने के लिए कहता है। आप:", 
-             "options": ["बिना सवाल के पालन करना", "नीति की चिंताओं को समझाना और विकल्प सुझाना", "सीधे मना करना", "अन्य सहयोगियों से पूछना कि वे क्या करेंगे"], 
-             "correct": 1, "marks": 6},
-            {"type": "forced_choice", "question": "मैं मानता हूं:", 
-             "options": ["नियम आवश्यकता पड़ने पर लचीले हो सकते हैं", "सिद्धांतों को लगातार लागू किया जाना चाहिए"], "marks": 4},
-            {"type": "likert", "question": "मैं सभी लोगों के साथ सम्मान और निष्पक्षता से व्यवहार करता हूं।", "marks": 5}
-        ]
-    },
-    "Conflict Resolution": {
-        "en": [
-            {"type": "likert", "question": "I handle conflicts constructively and seek win-win solutions.", "marks": 5},
-            {"type": "situational", "question": "Two team members are in heated disagreement affecting project progress. You:", 
-             "options": ["Let them work it out themselves", "Mediate and help find common ground", "Report to supervisor immediately", "Take sides with the person you agree with"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "In conflicts, I focus more on:", 
-             "options": ["Winning the argument", "Finding mutual solutions"], "marks": 4},
-            {"type": "likert", "question": "I remain neutral and objective when mediating disputes.", "marks": 5},
-            {"type": "situational", "question": "You strongly disagree with your supervisor's decision. You:", 
-             "options": ["Comply without expressing concerns", "Request private meeting to discuss concerns", "Publicly voice disagreement", "Seek support from other colleagues"], 
-             "correct": 1, "marks": 6},
-            {"type": "likert", "question": "I help others find common ground during disagreements.", "marks": 5},
-            {"type": "forced_choice", "question": "When emotions run high in conflicts, I:", 
-             "options": ["Wait for emotions to cool down", "Address emotional aspects first"], "marks": 4}
-        ],
-        "hi": [
-            {"type": "likert", "question": "मैं संघर्षों को रचनात्मक तरीके से संभालता हूं और जीत-जीत के समाधान खोजता हूं।", "marks": 5},
-            {"type": "situational", "question": "दो टीम सदस्य तीव्र असहमति में हैं जो प्रोजेक्ट की प्रगति को प्रभावित कर रहा है। आप:", 
-             "options": ["उन्हें इसे खुद सुलझाने देना", "मध्यस्थता करना और साझा आधार खोजने में मदद करना", "तुरंत सुपरवाइजर को रिपोर्ट करना", "जिससे आप सहमत हैं उसका पक्ष लेना"], 
-             "correct": 1, "marks": 7},
-            {"type": "forced_choice", "question": "संघर्षों में, मैं अधिक ध्यान देता हूं:", 
-             "options": ["बहस जीतने पर", "पारस्परिक समाधान खोजने पर"], "marks": 4},
-            {"type": "likert", "question": "मैं विवादों की मध्यस्थता करते समय तटस्थ और वस्तुनिष्ठ रहता हूं।", "marks": 5},
-            {"type": "situational", "question": "आप अपने सुपरवाइजर के निर्णय से दृढ़ता से असहमत हैं। आप:", 
-             "options": ["चिंताओं को व्यक्त किए बिना पालन करना", "चर्चा के लिए निजी मीटिंग का अनुरोध करना", "सार्वजनिक रूप से असहमति व्यक्त करना", "अन्य सहकर्मियों से समर्थन लेना"], 
-             "correct": 1, "marks": 6},
-            {"type": "likert", "question": "मैं असहमति के दौरान दूसरों को साझा आधार खोजने में मदद करता हूं।", "marks": 5},
-            {"type": "forced_choice", "question": "जब संघर्षों में भावनाएं तेज हो जाती हैं, तो मैं:", 
-             "options": ["भावनाओं के शांत होने का इंतजार करता हूं", "पहले भावनात्मक पहलुओं को संबोधित करता हूं"], "marks": 4}
-        ]
+LIKERT_LEGEND_HTML = """
+<div style="font-size: 14px; color: #333; margin-top: -10px; margin-bottom: 15px; 
+           background-color: #f0f2f6; padding: 8px; border-radius: 5px; border-left: 4px solid #ff4b4b;">
+    <strong>😠 1 - Strongly Disagree   🙁 2 - Disagree   😐 3 - Neutral   🙂 4 - Agree   😄 5 - Strongly Agree</strong>
+</div>
+"""
+
+@st.cache_resource
+def get_question_fragments(language, bank_name, bank_digest, _bank):
+    """Pre-render the static HTML of a question bank's assessment form for one language
+
+    Cached per bank content, so an edited bank gets fresh fragments.
+    """
+    questions = _bank.questions
+    fragments = {
+        'instructions': _bank.strings(language)['instructions'],
+        'competencies': {}
     }
-}
+    for competency in questions.keys():
+        fragments['competencies'][competency] = {
+            'header': f"""
+            <div class="competency-section">
+                <h3>📊 {competency}</h3>
+            </div>
+            """,
+            'cards': [
+                f"""
+                <div class="question-card">
+                    <p><strong>Q{i+1}:</strong> {question['question']}</p>
+                    <small>Points: {question['marks']}</small>
+                </div>
+                """
+                for i, question in enumerate(questions[competency][language])
+            ]
+        }
+    return fragments
+
+def warm_question_fragments():
+    """Render the question fragments of every template once per process, in the default language only
 
-# Scoring and interpretation logic
-def calculate_scores(responses, language):
-    scores = {}
-    total_possible = {}
+    Other languages are loaded and rendered when someone first picks them.
+    """
+    for template in all_templates():
+        bank = template.current_bank()
+        if DEFAULT_LANGUAGE in bank.languages:
+            get_question_fragments(DEFAULT_LANGUAGE, bank.name, bank.digest, bank)
+
+def select_assessment_language(bank):
+    """Language selectbox offering the languages the bank has bundles for"""
+    if st.session_state.get('assessment_language') not in bank.languages:
+        # A restored draft or an earlier page may hold a language this bank lacks
+        st.session_state.pop('assessment_language', None)
+    return st.selectbox(
+        "Select Language / भाषा चुनें",
+        bank.languages,
+        format_func=bank.language_name,
+        key="assessment_language"
+    )
+
+def render_assessment_questions(language, bank):
+    """Render a question bank's assessment form from cached fragments and return the responses"""
+    questions = bank.questions
+    fragments = get_question_fragments(language, bank.name, bank.digest, bank)
+    st.markdown(fragments['instructions'])
+    
+    responses = {}
     
-    for competency in QUESTIONS.keys():
-        score = 0
-        max_score = 0
+    for competency in questions.keys():
+        competency_fragments = fragments['competencies'][competency]
+        st.markdown(competency_fragments['header'], unsafe_allow_html=True)
         
-        for i, question in enumerate(QUESTIONS[competency][language]):
-            response = responses.get(f"{competency}_{i}", 0)
-            max_score += question["marks"]
+        for i, question in enumerate(questions[competency][language]):
+            st.markdown(competency_fragments['cards'][i], unsafe_allow_html=True)
+            
+            key = f"{competency}_{i}"
             
             if question["type"] == "likert":
-                score += response * question["marks"] / 5
+                responses[key] = st.slider(
+                    "Response",
+                    1, 5,
+                    value=None,
+                    key=key,
+                    help="1=Strongly Disagree, 2=Disagree, 3=Neutral, 4=Agree, 5=Strongly Agree"
+                )
+                st.markdown(LIKERT_LEGEND_HTML, unsafe_allow_html=True)
+            
             elif question["type"] == "situational":
-                if response == question["correct"]:
-                    score += question["marks"]
+                responses[key] = st.radio(
+                    "Choose the best response:",
+                    range(len(question["options"])),
+                    format_func=lambda x, options=question["options"]: options[x],
+                    key=key,
+                    index=None
+                )
+            
             elif question["type"] == "forced_choice":
-                if response == 1:  # Second option is usually the better choice
-                    score += question["marks"]
-        
-        scores[competency] = round(score, 1)
-        total_possible[competency] = max_score
+                responses[key] = st.radio(
+                    "Choose what better describes you:",
+                    [0, 1],
+                    format_func=lambda x, options=question["options"]: options[x],
+                    key=key,
+                    index=None
+                )
+            
+            st.markdown("---")
     
-    return scores, total_possible
+    return responses
+
+# Images shown in the UI and the width (in CSS pixels) they are displayed at
+IMAGE_ASSETS = {
+    'logo': ('Logo-TEL.png', 300),
+    'logo_small': ('Logo-TEL.png', 200),
+    'staff': ('staff.png', 120),
+    'cv': ('cv.png', 120),
+    'favicon': ('Logo-TEL.png', 32)
+}
+
+# Images keep twice their display width so they stay sharp on high-density screens
+IMAGE_PIXEL_RATIO = 2
+
+# Served at app/static/ when server.enableStaticServing is on (see .streamlit/config.toml)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+APP_CSS = """
+.main-header {
+    text-align: center;
+    padding: 2rem 0;
+    background: linear-gradient(90deg, #1f4e79, #2e86ab);
+    color: white;
+    border-radius: 10px;
+    margin-bottom: 2rem;
+}
+.competency-section {
+    background-color: #f0f2f6;
+    padding: 1rem;
+    border-radius: 8px;
+    margin: 1rem 0;
+}
+.question-card {
+    background-color: white;
+    padding: 1rem;
+    border-left: 4px solid #1f4e79;
+    margin: 0.5rem 0;
+    border-radius: 5px;
+}
+.score-card {
+    text-align: center;
+    padding: 1rem;
+    background-color: #f8f9fa;
+    border-radius: 8px;
+    border: 1px solid #dee2e6;
+}
+.stButton > button {
+    width: 100%;
+}
+.app-footer {
+    position: fixed;
+    bottom: 0;
+    left: 0;
+    width: 100%;
+    background-color: #f8f9fa;
+    text-align: center;
+    padding: 10px 0;
+    border-top: 1px solid #dee2e6;
+    font-size: 12px;
+    color: #6c757d;
+    z-index: 999;
+}
+.app-footer p {
+    margin: 0;
+}
+.main .block-container {
+    padding-bottom: 80px;
+}
+"""
 
-def get_interpretation(scores, total_possible):
-    interpretations = {}
-    overall_categories = []
+def publish_static_file(name, extension, data):
+    """Write a content-addressed file to the static folder and return its URL"""
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    filename = f"{name}-{digest}.{extension}"
+    path = os.path.join(STATIC_DIR, filename)
+    
+    if not os.path.exists(path):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as static_file:
+            static_file.write(data)
+        os.replace(temp_path, path)
+    
+    # app/static sends no Cache-Control, only ETag and Last-Modified, so browsers revalidate
+    # the file and get a bodyless 304 while it is unchanged. The name changes with the
+    # content, so an edited image or stylesheet is fetched at once rather than revalidated
+    return f"app/static/{filename}?v={digest}"
+
+@st.cache_resource(show_spinner=False)
+def build_static_assets():
+    """Resize, recompress and publish the UI images and stylesheet once per process"""
+    assets = {'images': {}, 'stylesheet_url': None}
+    static_serving = st.get_option("server.enableStaticServing")
     
-    for competency, score in scores.items():
-        percentage = (score / total_possible[competency]) * 100
-        
-        if percentage >= 80:
-            level = "Excellent"
-            desc = "Demonstrates exceptional competency with consistent high performance"
-        elif percentage >= 65:
-            level = "Good"
-            desc = "Shows strong competency with room for minor improvements"
-        elif percentage >= 50:
-            level = "Average"
-            desc = "Displays adequate competency but needs focused development"
-        elif percentage >= 35:
-            level = "Below Average"
-            desc = "Shows limited competency requiring significant improvement"
-        else:
-            level = "Poor"
-            desc = "Demonstrates weak competency needing immediate attention"
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+    
+    for name, (path, width) in IMAGE_ASSETS.items():
+        if Image is None or not os.path.exists(path):
+            continue
+        try:
+            with Image.open(path) as image:
+                target_width = min(image.width, width * IMAGE_PIXEL_RATIO)
+                target_height = max(1, round(image.height * target_width / image.width))
+                resized = image.convert('RGBA').resize((target_width, target_height), Image.LANCZOS)
+            compressed = resized.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+            output = BytesIO()
+            compressed.save(output, format='PNG', optimize=True)
+        except OSError:
+            continue
         
-        interpretations[competency] = {
-            "level": level,
-            "percentage": round(percentage, 1),
-            "description": desc
-        }
-        overall_categories.append(level)
-    
-    # Overall assessment
-    excellent_count = overall_categories.count("Excellent")
-    good_count = overall_categories.count("Good")
-    
-    if excellent_count >= 5:
-        overall = "High Performer"
-    elif excellent_count + good_count >= 5:
-        overall = "Strong Performer"
-    elif overall_categories.count("Poor") >= 3:
-        overall = "Needs Development"
-    else:
-        overall = "Average Performer"
+        data = output.getvalue()
+        url = None
+        if static_serving:
+            try:
+                url = publish_static_file(name, 'png', data)
+            except OSError:
+                url = None
+        assets['images'][name] = {'data': data, 'width': width, 'url': url}
     
-    return interpretations, overall
+    if static_serving:
+        try:
+            assets['stylesheet_url'] = publish_static_file('app', 'css', APP_CSS.encode())
+        except OSError:
+            pass
+    
+    return assets
+
+def show_image_asset(name):
+    """Display a pre-processed image, returns False if it is not available"""
+    asset = build_static_assets()['images'].get(name)
+    if asset is None:
+        return False
+    
+    if asset['url']:
+        st.markdown(f'<img src="{asset["url"]}" width="{asset["width"]}" alt="{name}">', unsafe_allow_html=True)
+    else:
+        st.image(asset['data'], width=asset['width'])
+    return True
+
+def get_page_icon():
+    """Small favicon bytes, falling back to the original logo file"""
+    asset = build_static_assets()['images'].get('favicon')
+    return asset['data'] if asset else "Logo-TEL.png"
+
+def apply_app_styles():
+    """Import the cached stylesheet, or inline the CSS when static serving is disabled"""
+    stylesheet_url = build_static_assets()['stylesheet_url']
+    if stylesheet_url:
+        st.markdown(f'<style>@import url("{stylesheet_url}");</style>', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{APP_CSS}</style>", unsafe_allow_html=True)
 
+@timed('page')
+@track_memory
 def show_initial_selection():
     """Show initial selection between Existing Employee and New Candidate"""
     # Header with logo
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        try:
-            st.image("Logo-TEL.png", width=300)
-        except:
+        if not show_image_asset('logo'):
             st.write("Logo not found - please add Logo-TEL.png to project folder")
     
     # Main header
@@ -1005,9 +561,7 @@ def show_initial_selection():
         # Image section
         col1_1, col1_2, col1_3 = st.columns([1, 2, 1])
         with col1_2:
-            try:
-                st.image("staff.png", width=120)
-            except:
+            if not show_image_asset('staff'):
                 st.markdown("""
                 <div style="text-align: center; padding: 20px; background-color: #f0f2f6; border-radius: 10px; margin: 10px 0;">
                     <p style="color: #666;">👥 Staff Icon</p>
@@ -1036,9 +590,7 @@ def show_initial_selection():
         # Image section
         col2_1, col2_2, col2_3 = st.columns([1, 2, 1])
         with col2_2:
-            try:
-                st.image("cv.png", width=120)
-            except:
+            if not show_image_asset('cv'):
                 st.markdown("""
                 <div style="text-align: center; padding: 20px; background-color: #f0f2f6; border-radius: 10px; margin: 10px 0;">
                     <p style="color: #666;">📄 CV Icon</p>
@@ -1060,12 +612,12 @@ def show_initial_selection():
     </div>
     """, unsafe_allow_html=True)
 
+@timed('page')
+@track_memory
 def show_login_page():
     col1, col2, col3 = st.columns([1, 2, 1])
     with col3:
-        try:
-            st.image("Logo-TEL.png", width=300)
-        except:
+        if not show_image_asset('logo'):
             st.write("Logo not found - please add Logo-TEL.png to project folder")
     
     st.markdown("""
@@ -1245,6 +797,7 @@ def show_login_page():
                 else:
                     st.error("Please fill in all fields.")   
 
+@timed('page')
 def show_forgot_password_form():
     """Show the forgot password form"""
     
@@ -1298,131 +851,24 @@ def show_forgot_password_form():
     # Password requirements reminder
        
 
-def reset_user_password(employee_id, new_password):
-    """Reset employee password"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    password_hash = hash_password(new_password)
-    try:
-        cursor.execute('''
-            UPDATE users 
-            SET password_hash = ? 
-            WHERE employee_id = ?
-        ''', (password_hash, employee_id))
-        
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return True
-        else:
-            conn.close()
-            return False
-    except Exception:
-        conn.close()
-        return False
-
-def reset_candidate_password(candidate_code, new_password):
-    """Reset candidate password"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    password_hash = hash_password(new_password)
-    try:
-        cursor.execute('''
-            UPDATE candidates 
-            SET password_hash = ? 
-            WHERE candidate_code = ? AND is_active = 1
-        ''', (password_hash, candidate_code))
-        
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return True
-        else:
-            conn.close()
-            return False
-    except Exception:
-        conn.close()
-        return False
-
-def verify_user_exists(employee_id):
-    """Check if employee exists"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT employee_name FROM users WHERE employee_id = ?', (employee_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    return result[0] if result else None
-
-def verify_candidate_exists(candidate_code):
-    """Check if candidate exists and is active"""
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT full_name FROM candidates 
-        WHERE candidate_code = ? AND is_active = 1 AND expires_at > datetime('now')
-    ''', (candidate_code,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    return result[0] if result else None
-def validate_password(password):
-    """Validate password according to requirements"""
-    import re
-    
-    if len(password) < 8:
-        return False, "Password must be at least 8 characters long."
-    
-    if not password[0].isupper():
-        return False, "Password must start with an uppercase letter."
-    
-    if not re.search(r'[a-z]', password):
-        return False, "Password must contain at least one lowercase letter."
-    
-    if not re.search(r'[@#$]', password):
-        return False, "Password must contain at least one special symbol (@, #, or $)."
-    
-    return True, "Password is valid."
+@timed('page')
 def show_footer():
     """Display copyright footer on every page"""
     st.markdown("""
-    <div style="
-        position: fixed;
-        bottom: 0;
-        left: 0;
-        width: 100%;
-        background-color: #f8f9fa;
-        text-align: center;
-        padding: 10px 0;
-        border-top: 1px solid #dee2e6;
-        font-size: 12px;
-        color: #6c757d;
-        z-index: 999;
-    ">
-        <p style="margin: 0;">© 2025 Tuaman Engineering Limited</p>
-        <p style="margin: 0;">Head Office, Kolkata, West Bengal</p>
+    <div class="app-footer">
+        <p>© 2025 Tuaman Engineering Limited</p>
+        <p>Head Office, Kolkata, West Bengal</p>
     </div>
     """, unsafe_allow_html=True)
-    
-    # Add bottom padding to main content to prevent overlap
-    st.markdown("""
-    <style>
-    .main .block-container {
-        padding-bottom: 80px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+
+
+@timed('page')
+@track_memory
 def show_candidate_login_page():
     """Show candidate login/signup page"""
     col1, col2, col3 = st.columns([1, 2, 1])
     with col3:
-        try:
-            st.image("Logo-TEL.png", width=300)
-        except:
+        if not show_image_asset('logo'):
             st.write("Logo not found - please add Logo-TEL.png to project folder")
     
     st.markdown("""
@@ -1552,23 +998,15 @@ def show_candidate_login_page():
                     st.error("Please fill in all fields.")
 
 
-
+@timed('page')
+@track_memory
 def show_assessment_window_management():
     st.title("🕒 Assessment Window Management")
     
     user = st.session_state.user
     
     # Auto-deactivate past windows
-    conn = sqlite3.connect('assessment_data.db')
-    cursor = conn.cursor()
-    current_date = date.today()
-    cursor.execute('''
-        UPDATE assessment_windows 
-        SET is_active = 0 
-        WHERE end_date < ? AND is_active = 1
-    ''', (current_date,))
-    conn.commit()
-    conn.close()
+    deactivate_past_windows(date.today())
     
     # Create new assessment window
     st.subheader("Create New Assessment Window")
@@ -1610,18 +1048,9 @@ def show_assessment_window_management():
     
     # Display existing windows
     st.subheader("Existing Assessment Windows")
-    conn = sqlite3.connect('assessment_data.db')
     
     # Get windows with assessment counts
-    windows_df = pd.read_sql_query('''
-        SELECT aw.*, 
-               COALESCE(COUNT(a.id), 0) as assessment_count
-        FROM assessment_windows aw
-        LEFT JOIN assessments a ON aw.id = a.window_id
-        GROUP BY aw.id
-        ORDER BY aw.created_at DESC
-    ''', conn)
-    conn.close()
+    windows_df = load_assessment_windows()
     
     if not windows_df.empty:
         for _, window in windows_df.iterrows():
@@ -1651,6 +1080,8 @@ def show_assessment_window_management():
     else:
         st.info("No assessment windows created yet.")
 
+@timed('page')
+@track_memory
 def show_employee_dashboard():
     user = st.session_state.user
     st.markdown(f"""
@@ -1661,15 +1092,7 @@ def show_employee_dashboard():
     """, unsafe_allow_html=True)
     
     # Get user's assessment data
-    conn = sqlite3.connect('assessment_data.db')
-    df = pd.read_sql_query('''
-        SELECT a.*, aw.window_name 
-        FROM assessments a
-        LEFT JOIN assessment_windows aw ON a.window_id = aw.id
-        WHERE a.employee_id = ? 
-        ORDER BY a.submit_date DESC, a.submit_time DESC
-    ''', conn, params=(user['employee_id'],))
-    conn.close()
+    df = load_employee_assessments(user['employee_id'])
     
     if df.empty:
         st.info("No assessment completed yet. Please take the assessment first.")
@@ -1712,7 +1135,7 @@ def show_employee_dashboard():
     
     # Show latest assessment results
     latest = filtered_df.iloc[0]
-    interpretations = json.loads(latest['interpretation'])
+    interpretations = expand_interpretation(latest['interpretation'])
     
     # Display selected assessment info
     st.subheader("📋 Selected Assessment Details")
@@ -1726,19 +1149,8 @@ def show_employee_dashboard():
     with col4:
         st.info(f"**Total Score:** {latest['total_score']}")
     
-    # Recreate scores dictionary
-    scores = {
-        "Accountability": latest['accountability_score'],
-        "Team Collaboration": latest['teamwork_score'],
-        "Result Orientation": latest['result_orientation_score'],
-        "Communication Skills": latest['communication_score'],
-        "Adaptability": latest['adaptability_score'],
-        "Integrity": latest['integrity_score'],
-        "Conflict Resolution": latest['conflict_resolution_score']
-    }
-    
-    # Calculate total possible scores
-    total_possible = {comp: 36 for comp in scores.keys()}
+    # Scores and maximums per competency, in the template's order
+    scores, total_possible = load_assessment_scores('employee', int(latest['id']))
     
     # Show results
     overall_assessment = "High Performer" if latest['total_score'] > 200 else "Average Performer"
@@ -1754,6 +1166,8 @@ def show_employee_dashboard():
             history_df['submit_time'] = history_df['submit_time'].astype(str).str[:8]
         st.dataframe(history_df, use_container_width=True)
 
+@timed('page')
+@track_memory
 def show_assessment_page():
     user = st.session_state.user
     
@@ -1772,9 +1186,7 @@ def show_assessment_page():
     
     col1, col2, col3 = st.columns([1, 2, 1])
     with col3:
-        try:
-            st.image("Logo-TEL.png", width=200)
-        except:
+        if not show_image_asset('logo_small'):
             st.write("Logo not found - please add Logo-TEL.png to project folder")
     
     st.markdown(f"""
@@ -1785,14 +1197,17 @@ def show_assessment_page():
     </div>
     """, unsafe_allow_html=True)
     
+    # Resume answers saved before a dropped connection
+    restore_assessment_draft('employee', user['employee_id'], active_window['id'])
+    
+    # Question bank of the employee's department, its bundles decide the languages offered
+    template = template_for_role(user['department'])
+    bank = template.current_bank()
+    
     # Language selection
     col1, col2 = st.columns([1, 1])
     with col1:
-        language = st.selectbox(
-            "Select Language / भाषा चुनें",
-            ["en", "hi"],
-            format_func=lambda x: "English" if x == "en" else "हिंदी"
-        )
+        language = select_assessment_language(bank)
     
     # Pre-fill employee information
     st.subheader("Employee Information / कर्मचारी जानकारी")
@@ -1805,150 +1220,80 @@ def show_assessment_page():
     with col3:
         department = st.text_input("Department / विभाग", value=user['department'], disabled=True)
     
-    # Assessment instructions
-    instructions = {
-        "en": """
-        ## Instructions
-        1. Answer all questions honestly based on your typical behavior
-        2. For Likert scale questions: 1=Strongly Disagree, 5=Strongly Agree
-        3. For situational questions: Choose the best response
-        4. For forced-choice questions: Select the option that better describes you
-        5. Complete all sections before submitting
-        """,
-        "hi": """
-        ## निर्देश
-        1. अपने सामान्य व्यवहार के आधार पर सभी प्रश्नों का ईमानदारी से उत्तर दें
-        2. लिकर्ट स्केल प्रश्नों के लिए: 1=बिल्कुल असहमत, 5=पूर्णतः सहमत
-        3. स्थितिजन्य प्रश्नों के लिए: सबसे अच्छा उत्तर चुनें
-        4. मजबूर विकल्प प्रश्नों के लिए: वह विकल्प चुनें जो आपका बेहतर वर्णन करता है
-        5. जमा करने से पहले सभी अनुभाग पूरे करें
-        """
-    }
-    
-    st.markdown(instructions[language])
-    
     # Assessment form
-    responses = {}
+    responses = render_assessment_questions(language, bank)
     
-    for competency in QUESTIONS.keys():
-        st.markdown(f"""
-        <div class="competency-section">
-            <h3>📊 {competency}</h3>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        for i, question in enumerate(QUESTIONS[competency][language]):
-            st.markdown(f"""
-            <div class="question-card">
-                <p><strong>Q{i+1}:</strong> {question['question']}</p>
-                <small>Points: {question['marks']}</small>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            key = f"{competency}_{i}"
-            
-            if question["type"] == "likert":
-                responses[key] = st.slider(
-                    "Response",
-                    1, 5,
-                    value=None,
-                    key=key,
-                    help="1=Strongly Disagree, 2=Disagree, 3=Neutral, 4=Agree, 5=Strongly Agree"
-                )
-                st.markdown("""
-                <div style="font-size: 14px; color: #333; margin-top: -10px; margin-bottom: 15px; 
-                           background-color: #f0f2f6; padding: 8px; border-radius: 5px; border-left: 4px solid #ff4b4b;">
-                    <strong>😠 1 - Strongly Disagree   🙁 2 - Disagree   😐 3 - Neutral   🙂 4 - Agree   😄 5 - Strongly Agree</strong>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            elif question["type"] == "situational":
-                responses[key] = st.radio(
-                    "Choose the best response:",
-                    range(len(question["options"])),
-                    format_func=lambda x: question["options"][x],
-                    key=key,
-                    index=None
-                )
-            
-            elif question["type"] == "forced_choice":
-                responses[key] = st.radio(
-                    "Choose what better describes you:",
-                    [0, 1],
-                    format_func=lambda x: question["options"][x],
-                    key=key,
-                    index=None
-                )
-            
-            st.markdown("---")
+    # Autosave answers so a reconnect can resume the form
+    autosave_assessment_draft('employee', user['employee_id'], active_window['id'], language, responses)
     
     # Submit assessment
     if st.button("Submit Assessment / मूल्यांकन जमा करें", type="primary"):
-        # Check again if user has already taken assessment in this window
-        if has_taken_assessment_in_window(user['employee_id'], active_window['id']):
-            st.error("You have already submitted an assessment for this window.")
-            return
-            
-        if len(responses) < sum(len(QUESTIONS[comp][language]) for comp in QUESTIONS):
-            st.error("Please answer all questions before submitting.")
-            return
-            
-        # Calculate scores
-        scores, total_possible = calculate_scores(responses, language)
-        interpretations, overall_assessment = get_interpretation(scores, total_possible)
-            
-        # Get current date and time
-        current_date = date.today()
-        current_time = datetime.now().time().strftime('%H:%M:%S')
-            
-        # Save to database
-        conn = sqlite3.connect('assessment_data.db')
-        cursor = conn.cursor()
-            
-        cursor.execute('''
-        INSERT INTO assessments (
-            employee_id, employee_name, department, language, window_id,
-            submit_date, submit_time,
-            accountability_score, teamwork_score, result_orientation_score,
-            communication_score, adaptability_score, integrity_score,
-            conflict_resolution_score, total_score, responses, interpretation
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            employee_id, employee_name, department, language, active_window['id'],
-            current_date, current_time,
-            scores["Accountability"], scores["Team Collaboration"], scores["Result Orientation"],
-            scores["Communication Skills"], scores["Adaptability"], scores["Integrity"],
-            scores["Conflict Resolution"], sum(scores.values()),
-            json.dumps(responses), json.dumps(interpretations)
-        ))
-            
-        conn.commit()
-        conn.close()
-            
-        # Display results
-        st.success("Assessment completed successfully!")
-        show_results(scores, interpretations, overall_assessment, total_possible)
-        
-        # AUTOMATICALLY SEND EMAIL TO ADMIN/HR
-        st.info("📧 Sending assessment report to HR team...")
-        
-        user_data = {
-            'employee_id': employee_id,
-            'employee_name': employee_name,
-            'department': department,
-            'submit_date': str(current_date),
-            'total_score': sum(scores.values())
-        }
-        
-        # Generate PDF
-        pdf_path = generate_assessment_pdf(user_data, scores, interpretations, overall_assessment, total_possible, "employee")
-        
-        if pdf_path and os.path.exists(pdf_path):
-            pdf_name = f"Assessment_Report_{employee_id}_{current_date}.pdf"
-            
-            # Send email automatically
-            subject = f"New Employee Assessment Submitted - {employee_name}"
-            body = f"""Dear HR Team,
+        # Kept should the submission fail
+        flush_assessment_drafts(force=True)
+        with pipeline.submission('employee') as trace:
+            # Check again if user has already taken assessment in this window
+            with trace.stage('duplicate_check'):
+                already_submitted = has_taken_assessment_in_window(user['employee_id'], active_window['id'])
+            if already_submitted:
+                st.error("You have already submitted an assessment for this window.")
+                trace.outcome = 'duplicate'
+                return
+                
+            if len(responses) < bank.question_count(language):
+                st.error("Please answer all questions before submitting.")
+                trace.outcome = 'incomplete'
+                return
+                
+            # Calculate scores
+            with trace.stage('scoring'):
+                scores, total_possible = calculate_scores(responses, language, bank.questions)
+            with trace.stage('interpretation'):
+                interpretations, overall_assessment = get_interpretation(scores, total_possible)
+                
+            # Get current date and time
+            current_date = date.today()
+            current_time = datetime.now().time().strftime('%H:%M:%S')
+                
+            # Save to database
+            try:
+                with trace.stage('insert'):
+                    save_employee_assessment(
+                        employee_id, employee_name, department, language, active_window['id'],
+                        current_date, current_time, scores, responses, interpretations,
+                        total_possible=total_possible, template=template.name, bank=bank
+                    )
+            except DatabaseBusyError:
+                st.error(DATABASE_BUSY_MESSAGE)
+                trace.outcome = 'database_busy'
+                return
+                
+            # Display results
+            with trace.stage('render'):
+                st.success("Assessment completed successfully!")
+                show_results(scores, interpretations, overall_assessment, total_possible)
+            
+            # AUTOMATICALLY SEND EMAIL TO ADMIN/HR
+            st.info("📧 Sending assessment report to HR team...")
+            
+            user_data = {
+                'employee_id': employee_id,
+                'employee_name': employee_name,
+                'department': department,
+                'submit_date': str(current_date),
+                'total_score': sum(scores.values()),
+                'language': language
+            }
+            
+            # Generate PDF
+            with trace.stage('pdf'):
+                pdf_path = generate_assessment_pdf(user_data, scores, interpretations, overall_assessment, total_possible, "employee")
+            
+            if pdf_path and os.path.exists(pdf_path):
+                pdf_name = f"Assessment_Report_{employee_id}_{current_date}.pdf"
+                
+                # Send email automatically
+                subject = f"New Employee Assessment Submitted - {employee_name}"
+                body = f"""Dear HR Team,
 
 A new employee assessment has been submitted:
 
@@ -1963,16 +1308,20 @@ Please find the detailed assessment report attached.
 
 Best regards,
 Assessment System"""
-            
-            success = send_email_with_attachment(subject, body, pdf_path, pdf_name)
-            
-            if success:
-                st.success("✅ Assessment report automatically sent to HR team!")
+                
+                success = send_email_with_attachment(subject, body, pdf_path, pdf_name, stage=trace.stage)
+                
+                if success:
+                    st.success("✅ Assessment report automatically sent to HR team!")
+                else:
+                    st.warning("⚠️ Assessment saved but email notification failed. HR team will be notified separately.")
+                    trace.outcome = 'email_failed'
             else:
-                st.warning("⚠️ Assessment saved but email notification failed. HR team will be notified separately.")
-        else:
-            st.warning("⚠️ Assessment saved but PDF generation failed. HR team will be notified separately.")
+                st.warning("⚠️ Assessment saved but PDF generation failed. HR team will be notified separately.")
+                trace.outcome = 'pdf_failed'
 
+@timed('page')
+@track_memory
 def show_candidate_assessment_page():
     """Assessment page for candidates"""
     user = st.session_state.user
@@ -1985,9 +1334,7 @@ def show_candidate_assessment_page():
     
     col1, col2, col3 = st.columns([1, 2, 1])
     with col3:
-        try:
-            st.image("Logo-TEL.png", width=200)
-        except:
+        if not show_image_asset('logo_small'):
             st.write("Logo not found - please add Logo-TEL.png to project folder")
     
     st.markdown(f"""
@@ -1998,14 +1345,17 @@ def show_candidate_assessment_page():
     </div>
     """, unsafe_allow_html=True)
     
+    # Resume answers saved before a dropped connection
+    restore_assessment_draft('candidate', user['candidate_code'], 0)
+    
+    # Question bank of the position applied for, its bundles decide the languages offered
+    template = template_for_role(user['position_applied'])
+    bank = template.current_bank()
+    
     # Language selection
     col1, col2 = st.columns([1, 1])
     with col1:
-        language = st.selectbox(
-            "Select Language / भाषा चुनें",
-            ["en", "hi"],
-            format_func=lambda x: "English" if x == "en" else "हिंदी"
-        )
+        language = select_assessment_language(bank)
     
     # Pre-fill candidate information
     st.subheader("Candidate Information / उम्मीदवार जानकारी")
@@ -2018,150 +1368,80 @@ def show_candidate_assessment_page():
     with col3:
         position_applied = st.text_input("Position Applied / आवेदित पद", value=user['position_applied'], disabled=True)
     
-    # Assessment instructions
-    instructions = {
-        "en": """
-        ## Instructions
-        1. Answer all questions honestly based on your typical behavior
-        2. For Likert scale questions: 1=Strongly Disagree, 5=Strongly Agree
-        3. For situational questions: Choose the best response
-        4. For forced-choice questions: Select the option that better describes you
-        5. Complete all sections before submitting
-        """,
-        "hi": """
-        ## निर्देश
-        1. अपने सामान्य व्यवहार के आधार पर सभी प्रश्नों का ईमानदारी से उत्तर दें
-        2. लिकर्ट स्केल प्रश्नों के लिए: 1=बिल्कुल असहमत, 5=पूर्णतः सहमत
-        3. स्थितिजन्य प्रश्नों के लिए: सबसे अच्छा उत्तर चुनें
-        4. मजबूर विकल्प प्रश्नों के लिए: वह विकल्प चुनें जो आपका बेहतर वर्णन करता है
-        5. जमा करने से पहले सभी अनुभाग पूरे करें
-        """
-    }
-    
-    st.markdown(instructions[language])
-    
     # Assessment form
-    responses = {}
+    responses = render_assessment_questions(language, bank)
     
-    for competency in QUESTIONS.keys():
-        st.markdown(f"""
-        <div class="competency-section">
-            <h3>📊 {competency}</h3>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        for i, question in enumerate(QUESTIONS[competency][language]):
-            st.markdown(f"""
-            <div class="question-card">
-                <p><strong>Q{i+1}:</strong> {question['question']}</p>
-                <small>Points: {question['marks']}</small>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            key = f"{competency}_{i}"
-            
-            if question["type"] == "likert":
-                responses[key] = st.slider(
-                    "Response",
-                    1, 5,
-                    value=None,
-                    key=key,
-                    help="1=Strongly Disagree, 2=Disagree, 3=Neutral, 4=Agree, 5=Strongly Agree"
-                )
-                st.markdown("""
-                <div style="font-size: 14px; color: #333; margin-top: -10px; margin-bottom: 15px; 
-                           background-color: #f0f2f6; padding: 8px; border-radius: 5px; border-left: 4px solid #ff4b4b;">
-                    <strong>😠 1 - Strongly Disagree   🙁 2 - Disagree   😐 3 - Neutral   🙂 4 - Agree   😄 5 - Strongly Agree</strong>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            elif question["type"] == "situational":
-                responses[key] = st.radio(
-                    "Choose the best response:",
-                    range(len(question["options"])),
-                    format_func=lambda x: question["options"][x],
-                    key=key,
-                    index=None
-                )
-            
-            elif question["type"] == "forced_choice":
-                responses[key] = st.radio(
-                    "Choose what better describes you:",
-                    [0, 1],
-                    format_func=lambda x: question["options"][x],
-                    key=key,
-                    index=None
-                )
-            
-            st.markdown("---")
+    # Autosave answers so a reconnect can resume the form
+    autosave_assessment_draft('candidate', user['candidate_code'], 0, language, responses)
     
     # Submit assessment
     if st.button("Submit Assessment / मूल्यांकन जमा करें", type="primary"):
-        # Check if candidate has already taken assessment
-        if has_candidate_taken_assessment(user['candidate_code']):
-            st.error("You have already submitted an assessment.")
-            return
-        
-        if len(responses) < sum(len(QUESTIONS[comp][language]) for comp in QUESTIONS):
-            st.error("Please answer all questions before submitting.")
-            return
-            
-        # Calculate scores
-        scores, total_possible = calculate_scores(responses, language)
-        interpretations, overall_assessment = get_interpretation(scores, total_possible)
-            
-        # Get current date and time
-        current_date = date.today()
-        current_time = datetime.now().time().strftime('%H:%M:%S')
-            
-        # Save to database
-        conn = sqlite3.connect('assessment_data.db')
-        cursor = conn.cursor()
-            
-        cursor.execute('''
-        INSERT INTO candidate_assessments (
-            candidate_code, full_name, position_applied, language,
-            submit_date, submit_time,
-            accountability_score, teamwork_score, result_orientation_score,
-            communication_score, adaptability_score, integrity_score,
-            conflict_resolution_score, total_score, responses, interpretation
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            user['candidate_code'], user['full_name'], user['position_applied'], language,
-            current_date, current_time,
-            scores["Accountability"], scores["Team Collaboration"], scores["Result Orientation"],
-            scores["Communication Skills"], scores["Adaptability"], scores["Integrity"],
-            scores["Conflict Resolution"], sum(scores.values()),
-            json.dumps(responses), json.dumps(interpretations)
-        ))
-            
-        conn.commit()
-        conn.close()
-            
-        # Display results
-        st.success("Assessment completed successfully!")
-        show_results(scores, interpretations, overall_assessment, total_possible)
-        
-        # AUTOMATICALLY SEND EMAIL TO HR TEAM
-        st.info("📧 Sending assessment report to HR team...")
-        
-        user_data = {
-            'candidate_code': user['candidate_code'],
-            'full_name': user['full_name'],
-            'position_applied': user['position_applied'],
-            'submit_date': str(current_date),
-            'total_score': sum(scores.values())
-        }
-        
-        # Generate PDF
-        pdf_path = generate_assessment_pdf(user_data, scores, interpretations, overall_assessment, total_possible, "candidate")
-        
-        if pdf_path and os.path.exists(pdf_path):
-            pdf_name = f"Candidate_Assessment_Report_{user['candidate_code']}_{current_date}.pdf"
-            
-            # Send email automatically
-            subject = f"New Candidate Assessment Submitted - {user['full_name']}"
-            body = f"""Dear HR Team,
+        # Kept should the submission fail
+        flush_assessment_drafts(force=True)
+        with pipeline.submission('candidate') as trace:
+            # Check if candidate has already taken assessment
+            with trace.stage('duplicate_check'):
+                already_submitted = has_candidate_taken_assessment(user['candidate_code'])
+            if already_submitted:
+                st.error("You have already submitted an assessment.")
+                trace.outcome = 'duplicate'
+                return
+            
+            if len(responses) < bank.question_count(language):
+                st.error("Please answer all questions before submitting.")
+                trace.outcome = 'incomplete'
+                return
+                
+            # Calculate scores
+            with trace.stage('scoring'):
+                scores, total_possible = calculate_scores(responses, language, bank.questions)
+            with trace.stage('interpretation'):
+                interpretations, overall_assessment = get_interpretation(scores, total_possible)
+                
+            # Get current date and time
+            current_date = date.today()
+            current_time = datetime.now().time().strftime('%H:%M:%S')
+                
+            # Save to database
+            try:
+                with trace.stage('insert'):
+                    save_candidate_assessment(
+                        user['candidate_code'], user['full_name'], user['position_applied'], language,
+                        current_date, current_time, scores, responses, interpretations,
+                        total_possible=total_possible, template=template.name, bank=bank
+                    )
+            except DatabaseBusyError:
+                st.error(DATABASE_BUSY_MESSAGE)
+                trace.outcome = 'database_busy'
+                return
+                
+            # Display results
+            with trace.stage('render'):
+                st.success("Assessment completed successfully!")
+                show_results(scores, interpretations, overall_assessment, total_possible)
+            
+            # AUTOMATICALLY SEND EMAIL TO HR TEAM
+            st.info("📧 Sending assessment report to HR team...")
+            
+            user_data = {
+                'candidate_code': user['candidate_code'],
+                'full_name': user['full_name'],
+                'position_applied': user['position_applied'],
+                'submit_date': str(current_date),
+                'total_score': sum(scores.values()),
+                'language': language
+            }
+            
+            # Generate PDF
+            with trace.stage('pdf'):
+                pdf_path = generate_assessment_pdf(user_data, scores, interpretations, overall_assessment, total_possible, "candidate")
+            
+            if pdf_path and os.path.exists(pdf_path):
+                pdf_name = f"Candidate_Assessment_Report_{user['candidate_code']}_{current_date}.pdf"
+                
+                # Send email automatically
+                subject = f"New Candidate Assessment Submitted - {user['full_name']}"
+                body = f"""Dear HR Team,
 
 A new candidate assessment has been submitted:
 
@@ -2176,15 +1456,21 @@ Please find the detailed assessment report attached.
 
 Best regards,
 Assessment System"""
-            
-            success = send_email_with_attachment(subject, body, pdf_path, pdf_name)
-            
-            if success:
-                st.success("✅ Assessment report automatically sent to HR team!")
+                
+                success = send_email_with_attachment(subject, body, pdf_path, pdf_name, stage=trace.stage)
+                
+                if success:
+                    st.success("✅ Assessment report automatically sent to HR team!")
+                else:
+                    st.warning("⚠️ Assessment saved but email notification failed. HR team will be notified separately.")
+                    trace.outcome = 'email_failed'
             else:
-                st.warning("⚠️ Assessment saved but email notification failed. HR team will be notified separately.")
-        else:
-            st.warning("⚠️ Assessment saved but PDF generation failed. HR team will be notified separately.")
+                st.warning("⚠️ Assessment saved but PDF generation failed. HR team will be notified separately.")
+                trace.outcome = 'pdf_failed'
+
+
+@timed('page')
+@track_memory
 def show_candidate_dashboard():
     """Dashboard for candidates to view their results"""
     user = st.session_state.user
@@ -2197,13 +1483,7 @@ def show_candidate_dashboard():
     """, unsafe_allow_html=True)
     
     # Get candidate's assessment data
-    conn = sqlite3.connect('assessment_data.db')
-    df = pd.read_sql_query('''
-        SELECT * FROM candidate_assessments 
-        WHERE candidate_code = ? 
-        ORDER BY submit_date DESC, submit_time DESC
-    ''', conn, params=(user['candidate_code'],))
-    conn.close()
+    df = load_candidate_assessments(user['candidate_code'])
     
     if df.empty:
         st.info("No assessment completed yet. Please take the assessment first.")
@@ -2211,7 +1491,7 @@ def show_candidate_dashboard():
     
     # Show latest assessment results
     latest = df.iloc[0]
-    interpretations = json.loads(latest['interpretation'])
+    interpretations = expand_interpretation(latest['interpretation'])
     
     # Display assessment info
     st.subheader("📋 Assessment Details")
@@ -2223,24 +1503,15 @@ def show_candidate_dashboard():
     with col3:
         st.info(f"**Total Score:** {latest['total_score']}")
     
-    # Recreate scores dictionary
-    scores = {
-        "Accountability": latest['accountability_score'],
-        "Team Collaboration": latest['teamwork_score'],
-        "Result Orientation": latest['result_orientation_score'],
-        "Communication Skills": latest['communication_score'],
-        "Adaptability": latest['adaptability_score'],
-        "Integrity": latest['integrity_score'],
-        "Conflict Resolution": latest['conflict_resolution_score']
-    }
-    
-    # Calculate total possible scores
-    total_possible = {comp: 36 for comp in scores.keys()}
+    # Scores and maximums per competency, in the template's order
+    scores, total_possible = load_assessment_scores('candidate', int(latest['id']))
     
     # Show results
     overall_assessment = "High Performer" if latest['total_score'] > 200 else "Average Performer"
     show_results(scores, interpretations, overall_assessment, total_possible)
 
+@timed('page')
+@track_memory
 def show_candidate_admin_dashboard():
     """Dashboard for candidate admin to manage candidates and view results"""
     st.title("👥 Candidate Administration Dashboard")
@@ -2251,15 +1522,7 @@ def show_candidate_admin_dashboard():
         st.subheader("Registered Candidates")
         
         # Load candidates data
-        conn = sqlite3.connect('assessment_data.db')
-        candidates_df = pd.read_sql_query('''
-            SELECT c.*, 
-                   CASE WHEN ca.candidate_code IS NOT NULL THEN 'Completed' ELSE 'Pending' END as assessment_status
-            FROM candidates c
-            LEFT JOIN candidate_assessments ca ON c.candidate_code = ca.candidate_code
-            ORDER BY c.created_at DESC
-        ''', conn)
-        conn.close()
+        candidates_df = load_candidates()
         
         if not candidates_df.empty:
             # Format expiry dates
@@ -2276,17 +1539,13 @@ def show_candidate_admin_dashboard():
             
             with col1:
                 if st.button("Deactivate Expired Candidates"):
-                    conn = sqlite3.connect('assessment_data.db')
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        UPDATE candidates 
-                        SET is_active = 0 
-                        WHERE expires_at < datetime('now')
-                    ''')
-                    conn.commit()
-                    conn.close()
-                    st.success("Expired candidates deactivated!")
-                    st.rerun()
+                    try:
+                        deactivate_expired_candidates()
+                    except DatabaseBusyError:
+                        st.error("The database is busy, please try again in a moment.")
+                    else:
+                        st.success("Expired candidates deactivated!")
+                        st.rerun()
             
             with col2:
                 if st.button("Export Candidates List"):
@@ -2304,12 +1563,7 @@ def show_candidate_admin_dashboard():
         st.subheader("Assessment Results")
         
         # Load candidate assessment data
-        conn = sqlite3.connect('assessment_data.db')
-        results_df = pd.read_sql_query('''
-            SELECT * FROM candidate_assessments 
-            ORDER BY submit_date DESC, submit_time DESC
-        ''', conn)
-        conn.close()
+        results_df = load_candidate_assessments()
         
         if not results_df.empty:
             # Filters
@@ -2326,8 +1580,8 @@ def show_candidate_admin_dashboard():
             if date_filter:
                 filtered_df = filtered_df[pd.to_datetime(filtered_df['submit_date']).dt.date == date_filter]
             
-            # Add percentage calculation
-            filtered_df['percentage'] = (filtered_df['total_score'] / 252) * 100  # 252 is max possible score (36*7)
+            # Percentage of the maximums stored with each assessment's scores
+            filtered_df['percentage'] = (filtered_df['total_score'] / filtered_df['max_total_score']) * 100
             
             # Display results
             display_cols = ['candidate_code', 'full_name', 'position_applied', 'submit_date', 'submit_time', 'total_score', 'percentage']
@@ -2338,65 +1592,27 @@ def show_candidate_admin_dashboard():
             # Export and Email options
             col1, col2 = st.columns(2)
             
+            # Precomputed exports (gateway.precomputed), built here only when the data changed since
+            export_filters = {
+                'position': None if position_filter == "All" else position_filter,
+                'since': date_filter,
+                'until': date_filter
+            }
             with col1:
                 if st.button("📥 Download Excel"):
-                    # Create Excel file in memory with conditional formatting
-                    output = BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        display_df.to_excel(writer, sheet_name='Candidate_Results', index=False)
-                        
-                        # Get the workbook and worksheet
-                        workbook = writer.book
-                        worksheet = writer.sheets['Candidate_Results']
-                        
-                        # Create a red fill for poor performers
-                        from openpyxl.styles import PatternFill
-                        red_fill = PatternFill(start_color='FFCCCC', end_color='FFCCCC', fill_type='solid')
-                        
-                        # Apply red background to rows where percentage < 60
-                        for row_num, (_, row_data) in enumerate(display_df.iterrows(), start=2):
-                            if row_data['percentage'] < 60:
-                                for col_num in range(1, len(display_df.columns) + 1):
-                                    worksheet.cell(row=row_num, column=col_num).fill = red_fill
-                    
-                    excel_data = output.getvalue()
+                    excel_path = precomputed.export_file('candidates', **export_filters)
                     
-                    st.download_button(
-                        label="Download Excel File",
-                        data=excel_data,
-                        file_name=f"candidate_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
+                    with open(excel_path, 'rb') as excel_file:
+                        st.download_button(
+                            label="Download Excel File",
+                            data=excel_file.read(),
+                            file_name=f"candidate_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                            mime=exports.EXCEL_MIME
+                        )
             
             with col2:
                 if st.button("📧 Email Excel Report NOW", key="candidate_email_excel_direct", type="primary"):
-                    st.info("Creating Excel report...")
-                    
-                    # Create Excel file in memory
-                    output = BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        display_df.to_excel(writer, sheet_name='Candidate_Results', index=False)
-                        
-                        # Get the workbook and worksheet
-                        workbook = writer.book
-                        worksheet = writer.sheets['Candidate_Results']
-                        
-                        # Create a red fill for poor performers
-                        from openpyxl.styles import PatternFill
-                        red_fill = PatternFill(start_color='FFCCCC', end_color='FFCCCC', fill_type='solid')
-                        
-                        # Apply red background to rows where percentage < 60
-                        for row_num, (_, row_data) in enumerate(display_df.iterrows(), start=2):
-                            if row_data['percentage'] < 60:
-                                for col_num in range(1, len(display_df.columns) + 1):
-                                    worksheet.cell(row=row_num, column=col_num).fill = red_fill
-                    
-                    excel_data = output.getvalue()
-                    
-                    # Save Excel to temporary file
-                    temp_excel = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-                    temp_excel.write(excel_data)
-                    temp_excel.close()
+                    excel_path = precomputed.export_file('candidates', **export_filters)
                     
                     excel_name = f"candidate_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
                     
@@ -2413,18 +1629,12 @@ Best regards,
 Assessment System"""
                     
                     st.info("Sending email...")
-                    success = send_email_with_attachment(subject, body, temp_excel.name, excel_name)
+                    success = send_email_with_attachment(subject, body, excel_path, excel_name)
                     
                     if success:
                         st.success("✅ Email sent successfully!")
                     else:
                         st.error("❌ Failed to send email!")
-                    
-                    # Clean up temp file
-                    try:
-                        os.unlink(temp_excel.name)
-                    except:
-                        pass
         else:
             st.info("No assessment results available yet.")
     
@@ -2432,17 +1642,14 @@ Assessment System"""
         st.subheader("Candidate Analytics Dashboard")
         
         # Load candidate assessment data
-        conn = sqlite3.connect('assessment_data.db')
-        df = pd.read_sql_query('''
-            SELECT * FROM candidate_assessments
-            ORDER BY submit_date DESC, submit_time DESC
-        ''', conn)
-        conn.close()
+        df = load_candidate_assessments()
         
         if df.empty:
             st.info("No candidate assessment data available yet.")
             return
         
+        render_competency_summary('candidate')
+        
         # Candidate filter
         st.subheader("Select Candidate")
         col1, col2 = st.columns(2)
@@ -2470,21 +1677,9 @@ Assessment System"""
         candidate_data = df[(df['candidate_code'] == selected_candidate_code) & 
                           (df['full_name'] == selected_candidate_name)].iloc[-1]  # Latest assessment
         
-        # Parse scores and interpretations
-        scores = {
-            'Accountability': candidate_data['accountability_score'],
-            'Teamwork': candidate_data['teamwork_score'],
-            'Result Orientation': candidate_data['result_orientation_score'],
-            'Communication': candidate_data['communication_score'],
-            'Adaptability': candidate_data['adaptability_score'],
-            'Integrity': candidate_data['integrity_score'],
-            'Conflict Resolution': candidate_data['conflict_resolution_score']
-        }
-        
-        interpretations = json.loads(candidate_data['interpretation'])
-        
-        # Calculate total possible scores
-        total_possible = {comp: 36 for comp in scores.keys()}
+        # Scores and maximums per competency, in the template's order
+        scores, total_possible = load_assessment_scores('candidate', int(candidate_data['id']))
+        interpretations = expand_interpretation(candidate_data['interpretation'])
         
         # Display candidate info
         st.subheader(f"Assessment Results for {selected_candidate_name}")
@@ -2501,24 +1696,21 @@ Assessment System"""
         overall_assessment = "High Performer" if candidate_data['total_score'] > 200 else "Average Performer"
         show_results(scores, interpretations, overall_assessment, total_possible)
 
-def show_results(scores, interpretations, overall_assessment, total_possible):
-    st.subheader("📊 Assessment Results")
-    
-    # Overall score
-    total_score = sum(scores.values())
-    max_total = sum(total_possible.values())
-    overall_percentage = (total_score / max_total) * 100
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Total Score", f"{total_score:.1f}/{max_total}", f"{overall_percentage:.1f}%")
-    with col2:
-        st.metric("Overall Assessment", overall_assessment)
-    with col3:
-        st.metric("Competencies Evaluated", len(scores))
-    
-    # Individual competency scores
-    st.subheader("Competency Breakdown")
+def render_competency_summary(owner_type):
+    """Average score of every competency across all assessments"""
+    summary = load_competency_summary(owner_type)
+    if summary.empty:
+        return
+    st.subheader("📊 Competency Averages")
+    st.dataframe(summary.round({'average_score': 1, 'average_percentage': 1}), hide_index=True,
+                 use_container_width=True)
+
+@timed('chart')
+def build_results_figure(scores, interpretations, total_possible):
+    """Plotly figure with the bar, pie, ribbon and radar views of one assessment"""
+    # plotly is only needed once results are shown, keep it out of startup
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
     
     # Create visualization
     fig = make_subplots(
@@ -2530,7 +1722,6 @@ def show_results(scores, interpretations, overall_assessment, total_possible):
     
     # Bar chart
     competencies = list(scores.keys())
-    score_values = list(scores.values())
     percentages = [(scores[comp] / total_possible[comp]) * 100 for comp in competencies]
     
     fig.add_trace(
@@ -2588,9 +1779,32 @@ def show_results(scores, interpretations, overall_assessment, total_possible):
     )
     
     fig.update_layout(height=800, showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+@timed('page')
+def show_results(scores, interpretations, overall_assessment, total_possible):
+    st.subheader("📊 Assessment Results")
+    
+    # Overall score
+    total_score = sum(scores.values())
+    max_total = sum(total_possible.values())
+    overall_percentage = (total_score / max_total) * 100
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Score", f"{total_score:.1f}/{max_total}", f"{overall_percentage:.1f}%")
+    with col2:
+        st.metric("Overall Assessment", overall_assessment)
+    with col3:
+        st.metric("Competencies Evaluated", len(scores))
+    
+    # Individual competency scores
+    st.subheader("Competency Breakdown")
+    
+    st.plotly_chart(build_results_figure(scores, interpretations, total_possible), use_container_width=True)
     
     # Detailed breakdown
+    competencies = list(scores.keys())
     for competency in competencies:
         col1, col2, col3 = st.columns([2, 1, 2])
         
@@ -2609,24 +1823,20 @@ def show_results(scores, interpretations, overall_assessment, total_possible):
         with col3:
             st.write(interpretations[competency]["description"])
 
+@timed('page')
+@track_memory
 def show_dashboard_page():
     st.title("📈 Employee Dashboard")
     
     # Load data
-    conn = sqlite3.connect('assessment_data.db')
-    df = pd.read_sql_query('''
-        SELECT a.*, aw.window_name 
-        FROM assessments a
-        LEFT JOIN assessment_windows aw ON a.window_id = aw.id
-        ORDER BY COALESCE(a.submit_date, a.assessment_date) DESC, 
-                 COALESCE(a.submit_time, '00:00:00') DESC
-    ''', conn)
-    conn.close()
+    df = load_all_assessments()
     
     if df.empty:
         st.info("No assessment data available yet.")
         return
     
+    render_competency_summary('employee')
+    
     # Employee filter
     st.subheader("Select Employee")
     col1, col2 = st.columns(2)
@@ -2654,21 +1864,10 @@ def show_dashboard_page():
                       (df['employee_name'] == selected_employee_name)].iloc[-1]  # Latest assessment
     
     # Parse interpretation data
-    interpretations = json.loads(employee_data['interpretation'])
-    
-    # Recreate scores dictionary
-    scores = {
-        "Accountability": employee_data['accountability_score'],
-        "Team Collaboration": employee_data['teamwork_score'],
-        "Result Orientation": employee_data['result_orientation_score'],
-        "Communication Skills": employee_data['communication_score'],
-        "Adaptability": employee_data['adaptability_score'],
-        "Integrity": employee_data['integrity_score'],
-        "Conflict Resolution": employee_data['conflict_resolution_score']
-    }
+    interpretations = expand_interpretation(employee_data['interpretation'])
     
-    # Calculate total possible scores (assuming max 36 per competency based on question structure)
-    total_possible = {comp: 36 for comp in scores.keys()}
+    # Scores and maximums per competency, in the template's order
+    scores, total_possible = load_assessment_scores('employee', int(employee_data['id']))
     
     # Display employee info
     st.subheader(f"Assessment Results for {selected_employee_name}")
@@ -2687,18 +1886,121 @@ def show_dashboard_page():
     overall_assessment = "High Performer" if employee_data['total_score'] > 200 else "Average Performer"
     show_results(scores, interpretations, overall_assessment, total_possible)
 
+
+# Archives served from app/static stream from disk; Streamlit serves files up to 200 MB there
+# and reports are ~35 KB each. Larger sets go through the CLI.
+REPORTS_ZIP_MAX_REPORTS = 5000
+# Without static serving the archive goes through st.download_button, which holds it in
+# memory until the session ends, so only a few MB of reports are offered that way
+REPORTS_ZIP_MAX_INLINE_REPORTS = 100
+# Seconds a published archive stays in the static folder
+REPORTS_ZIP_TTL = 15 * 60
+
+
+def publish_reports_zip(write_zip):
+    """Write a reports ZIP to the static folder under an unguessable name, returns its URL
+
+    The name is all that guards the archive, so it is only shown to the admin
+    who built it, and archives older than REPORTS_ZIP_TTL are removed.
+    """
+    directory = os.path.join(STATIC_DIR, 'reports')
+    os.makedirs(directory, exist_ok=True)
+    cutoff = datetime.now().timestamp() - REPORTS_ZIP_TTL
+    for name in os.listdir(directory):
+        try:
+            if os.path.getmtime(os.path.join(directory, name)) < cutoff:
+                os.unlink(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+    filename = f"{secrets.token_urlsafe(24)}.zip"
+    path = os.path.join(directory, filename)
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, 'wb') as zip_file:
+            write_zip(zip_file)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return f"app/static/reports/{filename}"
+
+
+def render_reports_zip(df, department, window_name, submit_date):
+    """Download link for a ZIP of the individual reports of the filtered records in df
+
+    The archive is streamed from the report cache into the static folder when
+    the button is clicked and served from disk from there, so memory holds
+    one report at a time however many are selected. Without static serving
+    it falls back to a download button for up to REPORTS_ZIP_MAX_INLINE_REPORTS.
+    """
+    if df.empty:
+        return
+    static_serving = st.get_option("server.enableStaticServing")
+    limit = REPORTS_ZIP_MAX_REPORTS if static_serving else REPORTS_ZIP_MAX_INLINE_REPORTS
+    if len(df) > limit:
+        st.caption(f"ZIP downloads are limited to {limit} reports, narrow the filters "
+                   "or run `python -m gateway reports --zip reports.zip`.")
+        return
+
+    window_id = None
+    if window_name != "All":
+        window_id = int(df['window_id'].iloc[0])
+    filters = (window_id, None if department == "All" else department, submit_date)
+    file_name = f"assessment_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+
+    def write_zip(zip_file):
+        records = iter_report_data('employee', filters[0], filters[1], start_date=submit_date, end_date=submit_date)
+        for chunk in reports.iter_reports_zip(records):
+            zip_file.write(chunk)
+
+    if not static_serving:
+        def build_zip():
+            with tempfile.TemporaryFile(suffix='.zip') as zip_file:
+                write_zip(zip_file)
+                zip_file.seek(0)
+                return zip_file.read()
+
+        st.download_button(label="🗂️ Download All Reports (ZIP)", data=build_zip, file_name=file_name,
+                           mime="application/zip", key="reports_zip")
+        return
+
+    if st.button("🗂️ Prepare Reports ZIP", key="reports_zip"):
+        with st.spinner(f"Collecting {len(df)} reports..."):
+            st.session_state.reports_zip_url = (filters, publish_reports_zip(write_zip))
+    published = st.session_state.get('reports_zip_url')
+    if published and published[0] == filters:
+        st.markdown(f'<a href="{published[1]}" download="{file_name}">🗂️ Download All Reports (ZIP)</a>',
+                    unsafe_allow_html=True)
+
+
+def render_cohort_report(df, department, window_name):
+    """Download button for the cohort PDF of one department in one window"""
+    if department == "All" or window_name == "All":
+        st.caption("Pick a department and a window for a cohort PDF.")
+        return
+    if st.button("📄 Cohort PDF", key="cohort_pdf"):
+        window_id = int(df.loc[df['window_name'] == window_name, 'window_id'].iloc[0])
+        with st.spinner("Generating cohort report..."):
+            pdf_path = reports.generate_cohort_pdf(window_id, department)
+        with open(pdf_path, 'rb') as pdf_file:
+            st.download_button(
+                label="Download Cohort PDF",
+                data=pdf_file.read(),
+                file_name=f"cohort_{window_id}_{department}.pdf",
+                mime="application/pdf"
+            )
+        os.unlink(pdf_path)
+
+
+@timed('page')
+@track_memory
 def show_records_page():
     st.title("👥 Employee Records")
     
     # Load data with window information
-    conn = sqlite3.connect('assessment_data.db')
-    df = pd.read_sql_query('''
-        SELECT a.*, aw.window_name 
-        FROM assessments a
-        LEFT JOIN assessment_windows aw ON a.window_id = aw.id
-        ORDER BY a.submit_date DESC, a.submit_time DESC
-    ''', conn)
-    conn.close()
+    df = load_all_assessments()
     
     if df.empty:
         st.info("No records available yet.")
@@ -2733,9 +2035,8 @@ def show_records_page():
                              'teamwork_score', 'result_orientation_score', 'communication_score', 
                              'adaptability_score', 'integrity_score', 'conflict_resolution_score']].copy()
     
-    # Calculate percentage
-    max_total_score = 252  # 7 competencies × 36 marks each
-    display_df['percentage'] = (display_df['total_score'] / max_total_score * 100).round(1)
+    # Percentage of the maximums stored with each assessment's scores
+    display_df['percentage'] = (display_df['total_score'] / filtered_df['max_total_score'] * 100).round(1)
 
     if not display_df.empty:
         st.subheader("📊 Performance Summary")
@@ -2786,66 +2087,33 @@ def show_records_page():
     # Export and Email functionality
     st.subheader("📊 Export & Email Options")
     
-    col1, col2 = st.columns([1,1])
+    col1, col2, col3 = st.columns([1,1,1])
     
+    with col3:
+        render_cohort_report(df, selected_department, selected_window)
+        render_reports_zip(filtered_df, selected_department, selected_window, date_filter)
+    # Precomputed exports (gateway.precomputed), built here only when the data changed since
+    export_filters = {
+        'window_id': None if selected_window == "All" else
+        int(df.loc[df['window_name'] == selected_window, 'window_id'].iloc[0]),
+        'department': None if selected_department == "All" else selected_department,
+        'since': date_filter,
+        'until': date_filter
+    }
     with col1:
         if st.button("📥 Download Excel"):
-            # Create Excel file in memory with conditional formatting
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                display_df.to_excel(writer, sheet_name='Assessment_Records', index=False)
-                
-                # Get the workbook and worksheet
-                workbook = writer.book
-                worksheet = writer.sheets['Assessment_Records']
-                
-                # Create a red fill for poor performers
-                from openpyxl.styles import PatternFill
-                red_fill = PatternFill(start_color='FFCCCC', end_color='FFCCCC', fill_type='solid')
-                
-                # Apply red background to rows where percentage < 60
-                for row_num, (_, row_data) in enumerate(display_df.iterrows(), start=2):
-                    if row_data['percentage'] < 60:
-                        for col_num in range(1, len(display_df.columns) + 1):
-                            worksheet.cell(row=row_num, column=col_num).fill = red_fill
-            
-            excel_data = output.getvalue()
-            
-            st.download_button(
-                label="Download Excel File",
-                data=excel_data,
-                file_name=f"assessment_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+            excel_path = precomputed.export_file('records', **export_filters)
+            
+            with open(excel_path, 'rb') as excel_file:
+                st.download_button(
+                    label="Download Excel File",
+                    data=excel_file.read(),
+                    file_name=f"assessment_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                    mime=exports.EXCEL_MIME
+                )
     with col2:
         if st.button("📧 Email Excel Report NOW", key="admin_email_excel_direct", type="primary"):
-            st.info("Creating Excel report...")
-            
-            # Create Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                display_df.to_excel(writer, sheet_name='Assessment_Records', index=False)
-                
-                # Get the workbook and worksheet
-                workbook = writer.book
-                worksheet = writer.sheets['Assessment_Records']
-                
-                # Create a red fill for poor performers
-                from openpyxl.styles import PatternFill
-                red_fill = PatternFill(start_color='FFCCCC', end_color='FFCCCC', fill_type='solid')
-                
-                # Apply red background to rows where percentage < 60
-                for row_num, (_, row_data) in enumerate(display_df.iterrows(), start=2):
-                    if row_data['percentage'] < 60:
-                        for col_num in range(1, len(display_df.columns) + 1):
-                            worksheet.cell(row=row_num, column=col_num).fill = red_fill
-            
-            excel_data = output.getvalue()
-            
-            # Save Excel to temporary file
-            temp_excel = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-            temp_excel.write(excel_data)
-            temp_excel.close()
+            excel_path = precomputed.export_file('records', **export_filters)
             
             excel_name = f"assessment_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             
@@ -2862,68 +2130,239 @@ Best regards,
 Assessment System"""
             
             st.info("Sending email...")
-            success = send_email_with_attachment(subject, body, temp_excel.name, excel_name)
+            success = send_email_with_attachment(subject, body, excel_path, excel_name)
             
             if success:
                 st.success("✅ Email sent successfully!")
             else:
                 st.error("❌ Failed to send email!")
-            
-            # Clean up temp file
-            try:
-                os.unlink(temp_excel.name)
-            except:
-                pass
         
     
     # DIRECT EMAIL SENDING - NO PREVIEW
     
     
+def render_submissions_tab():
+    col1, col2 = st.columns(2)
+    with col1:
+        since = st.date_input("Since", value=date.today() - timedelta(days=13), key="submissions_since")
+    with col2:
+        user_type = st.selectbox("Submitted by", ["All", "employee", "candidate"], key="submissions_user_type")
+    user_type = None if user_type == "All" else user_type
+    
+    outcomes_df = load_submission_outcomes(since, user_type)
+    if outcomes_df.empty:
+        st.info("No submissions recorded in this period.")
+        return
+    
+    st.subheader("Outcomes per day")
+    st.dataframe(outcomes_df.pivot_table(index='day', columns='outcome', values='submissions', aggfunc='sum', fill_value=0),
+                 use_container_width=True)
+    
+    st.subheader("Stage latency per day")
+    stages_df = pd.DataFrame(pipeline.stage_percentiles(since, user_type))
+    selected_stages = st.multiselect("Stages", list(pipeline.STAGES), default=list(pipeline.STAGES))
+    stages_df = stages_df[stages_df['stage'].isin(selected_stages)]
+    st.dataframe(stages_df.round(1), use_container_width=True, hide_index=True)
+    
+    # p95 trend, a rising SMTP line shows mail degrading before it fails
+    import plotly.express as px
+    
+    fig = px.line(stages_df, x='day', y='p95_ms', color='stage', markers=True)
+    fig.update_layout(yaxis_title="p95 (ms)", height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
+def render_timings_tab():
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        enabled = st.toggle("Record timings", value=metrics.is_enabled(),
+                            help="Applies to every session on this server. Costs next to nothing when off.")
+        if enabled != metrics.is_enabled():
+            metrics.set_enabled(enabled)
+    with col2:
+        if st.button("Reset timings"):
+            metrics.reset()
+            st.rerun()
+    
+    rows = metrics.snapshot()
+    if not rows:
+        st.info("No timings recorded yet. Switch recording on and use the app.")
+        return
+    
+    df = pd.DataFrame(rows)
+    selected_group = st.selectbox("Area", ["All"] + sorted(df['group'].unique()))
+    if selected_group != "All":
+        df = df[df['group'] == selected_group]
+    
+    display_df = df[['group', 'name', 'calls', 'errors', 'total_s', 'mean_ms', 'p50_ms', 'p95_ms', 'max_ms']].copy()
+    display_df = display_df.round({'total_s': 3, 'mean_ms': 1, 'p50_ms': 1, 'p95_ms': 1, 'max_ms': 1})
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    st.caption("p50 and p95 are the upper bounds of the histogram buckets holding them.")
+    
+    # Histogram of one function
+    import plotly.graph_objects as go
+    
+    selected_name = st.selectbox("Histogram", [f"{row.group}.{row.name}" for row in df.itertuples()])
+    row = df[(df['group'] + '.' + df['name']) == selected_name].iloc[0]
+    fig = go.Figure(go.Bar(x=metrics.bucket_labels(), y=row['buckets']))
+    fig.update_layout(xaxis_title="Wall time", yaxis_title="Calls", height=350)
+    st.plotly_chart(fig, use_container_width=True)
+
+def render_sql_tab():
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        enabled = st.toggle("Profile SQL", value=sqlprofile.is_enabled(),
+                            help="Times every statement on connections opened from now on, for all sessions.")
+        if enabled != sqlprofile.is_enabled():
+            sqlprofile.set_enabled(enabled)
+    with col2:
+        if st.button("Reset queries"):
+            sqlprofile.reset()
+            st.rerun()
+    
+    rows = sqlprofile.snapshot()
+    if not rows:
+        st.info("No queries recorded yet. Switch SQL profiling on and use the app.")
+        return
+    
+    display_df = pd.DataFrame(rows)[['sql', 'calls', 'total_ms', 'mean_ms', 'max_ms', 'rows', 'pages']]
+    display_df = display_df.round({'total_ms': 1, 'mean_ms': 2, 'max_ms': 1})
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    
+    # Slow queries with their plans
+    st.subheader(f"Slow queries (≥ {sqlprofile.slow_query_threshold_ms():g} ms)")
+    slow_queries = sqlprofile.recent_slow_queries()
+    if not slow_queries:
+        st.caption("None so far.")
+    for entry in slow_queries:
+        with st.expander(f"{entry['time']} · {entry['ms']:.1f} ms · {entry['rows']} rows · {entry['page']}"):
+            st.code(entry['sql'], language='sql')
+            st.code('\n'.join(entry['plan']) or "(no plan)", language='text')
+
+def render_locks_tab():
+    settings = locks.settings()
+    st.caption(f"Busy timeout {settings['busy_timeout_ms']} ms, up to {settings['retries']} retries per write "
+               f"with jittered backoff starting at {settings['backoff_ms']:g} ms. "
+               "Set GATEWAY_BUSY_TIMEOUT_MS, GATEWAY_WRITE_RETRIES and GATEWAY_RETRY_BACKOFF_MS to tune.")
+    if st.button("Reset lock counters"):
+        locks.reset()
+        st.rerun()
+    
+    rows = locks.snapshot()
+    if not rows:
+        st.info("No write transactions since the server started.")
+        return
+    
+    display_df = pd.DataFrame(rows)[['statement', 'transactions', 'busy_events', 'retries', 'failures', 'wait_s']]
+    display_df = display_df.round({'wait_s': 3})
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    st.caption("Wait time covers attempts that ended in a lock error and the backoff before each retry. "
+               "Failures are writes that gave up and showed the user an error.")
+
+def render_profiles_tab():
+    st.caption(f"Profiles whole reruns of main() with cProfile and saves them to {profiling.profile_dir()}/. "
+               "Open a file with pstats or snakeviz for the full call graph.")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        runs = st.number_input("Reruns to profile", min_value=1, max_value=100, value=5,
+                               help="The next reruns of any session on this server, including this one's.")
+    with col2:
+        if st.button("Start profiling"):
+            profiling.arm(runs)
+            st.rerun()
+    if profiling.remaining():
+        st.info(f"Profiling the next {profiling.remaining()} reruns.")
+    
+    profiles = profiling.list_profiles()
+    if not profiles:
+        st.info("No profiles saved yet.")
+        return
+    
+    labels = {f"{profile['recorded']} · {profile['label']} · {profile['duration']}": profile for profile in profiles}
+    profile = labels[st.selectbox("Profile", list(labels))]
+    sort = st.radio("Sort by", ['cumulative', 'tottime', 'calls'], horizontal=True)
+    display_df = pd.DataFrame(profiling.top_functions(profile['path'], sort))
+    display_df = display_df.round({'tottime_ms': 2, 'cumtime_ms': 2, 'percall_ms': 3})
+    st.dataframe(display_df, use_container_width=True, hide_index=True)
+    with open(profile['path'], 'rb') as profile_file:
+        st.download_button("Download .prof", profile_file.read(), file_name=profile['name'],
+                           mime='application/octet-stream')
+
+def render_memory_tab():
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        enabled = st.toggle("Trace allocations", value=memprofile.is_enabled(),
+                            help="tracemalloc slows the whole server down, switch it off when done.")
+        if enabled != memprofile.is_enabled():
+            memprofile.set_enabled(enabled)
+    with col2:
+        if st.button("Reset memory stats"):
+            memprofile.reset()
+            st.rerun()
+    
+    for alert in memprofile.recent_alerts()[:5]:
+        st.warning(f"{alert['time']}: {alert['page']} used {alert['peak_mb']:.1f} MB for {alert['user']}, "
+                   f"over the {memprofile.budget_mb():g} MB budget")
+    
+    rows = memprofile.page_stats()
+    if not rows:
+        st.info("No page renders traced yet. Switch tracing on and use the app.")
+        return
+    
+    st.subheader("Pages")
+    st.dataframe(pd.DataFrame(rows).round(2), use_container_width=True, hide_index=True)
+    st.caption(f"Peak is the traced memory a render needed on top of what was allocated before it, "
+               f"retained is what it left allocated. Budget {memprofile.budget_mb():g} MB "
+               "(GATEWAY_PAGE_MEMORY_BUDGET_MB).")
+    
+    page = st.selectbox("Allocation sites of the last render of", [row['page'] for row in rows])
+    sites = memprofile.page_sites(page)
+    if sites:
+        st.dataframe(pd.DataFrame(sites).round(1), use_container_width=True, hide_index=True)
+    
+    st.subheader("Sessions")
+    memprofile.forget_idle_sessions()
+    st.dataframe(pd.DataFrame(memprofile.session_stats()).round(2), use_container_width=True, hide_index=True)
+    st.caption("Footprint is an estimate: the size of the session's state plus what its last render left allocated.")
+    
+    if st.button("Show top allocation sites of the whole process"):
+        st.dataframe(pd.DataFrame(memprofile.process_top_sites()).round(1), use_container_width=True, hide_index=True)
+
+@timed('page')
+@track_memory
+def show_performance_page():
+    st.title("⏱️ Performance")
+    st.caption("Wall time of pages, database helpers, scoring, PDF reports and email in this server process. "
+               "Timings are kept in memory and reset when the server restarts.")
+    
+    submissions_tab, timings_tab, sql_tab, locks_tab, profiles_tab, memory_tab = st.tabs(
+        ["Submissions", "Timings", "SQL queries", "Database locks", "Profiles", "Memory"]
+    )
+    with submissions_tab:
+        render_submissions_tab()
+    with timings_tab:
+        render_timings_tab()
+    with sql_tab:
+        render_sql_tab()
+    with locks_tab:
+        render_locks_tab()
+    with profiles_tab:
+        render_profiles_tab()
+    with memory_tab:
+        render_memory_tab()
+
 def main():
     # Initialize database
     st.set_page_config(
         page_title="Talent Gateway",
-        page_icon="Logo-TEL.png",  # This will use your Tuaman logo as favicon
+        page_icon=get_page_icon(),  # This will use your Tuaman logo as favicon
 
     )
     init_database()
+    warm_question_fragments()
+    precomputed.start_refresher()
     
     # Custom CSS
-    st.markdown("""
-    <style>
-    .main-header {
-        text-align: center;
-        padding: 2rem 0;
-        background: linear-gradient(90deg, #1f4e79, #2e86ab);
-        color: white;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-    }
-    .competency-section {
-        background-color: #f0f2f6;
-        padding: 1rem;
-        border-radius: 8px;
-        margin: 1rem 0;
-    }
-    .question-card {
-        background-color: white;
-        padding: 1rem;
-        border-left: 4px solid #1f4e79;
-        margin: 0.5rem 0;
-        border-radius: 5px;
-    }
-    .score-card {
-        text-align: center;
-        padding: 1rem;
-        background-color: #f8f9fa;
-        border-radius: 8px;
-        border: 1px solid #dee2e6;
-    }
-    .stButton > button {
-        width: 100%;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    apply_app_styles()
     
     # Initialize session state
     if 'authenticated' not in st.session_state:
@@ -2949,6 +2388,9 @@ def main():
             show_candidate_login_page()
         return
     
+    # Answers held back by the autosave interval, written once it has passed
+    flush_assessment_drafts()
+    
     # Main application logic based on user type
     user = st.session_state.user
     user_type = st.session_state.user_type
@@ -2959,6 +2401,7 @@ def main():
         st.markdown(f"**Type:** {user_type.replace('_', ' ').title()}")
         
         if st.button("Logout"):
+            flush_assessment_drafts(force=True)
             st.session_state.authenticated = False
             st.session_state.user = None
             st.session_state.user_category = None
@@ -2971,7 +2414,7 @@ def main():
             # Admin navigation
             page = st.sidebar.selectbox(
                 "Navigation",
-                ["View Dashboard", "Employee Records", "Assessment Windows"]
+                ["View Dashboard", "Employee Records", "Assessment Windows", "Performance"]
             )
             
             if page == "View Dashboard":
@@ -2980,6 +2423,8 @@ def main():
                 show_records_page()
             elif page == "Assessment Windows":
                 show_assessment_window_management()
+            elif page == "Performance":
+                show_performance_page()
         else:
             # Regular employee navigation
             page = st.sidebar.selectbox(
@@ -2989,7 +2434,9 @@ def main():
             
             if page == "Take Assessment":
                 show_assessment_page()
-            elif page == "My Dashboard":
+            else:
+                flush_assessment_drafts(force=True)
+            if page == "My Dashboard":
                 show_employee_dashboard()
     
     elif user_type == "candidate":
@@ -3001,12 +2448,34 @@ def main():
         
         if page == "Take Assessment":
             show_candidate_assessment_page()
-        elif page == "My Results":
+        else:
+            flush_assessment_drafts(force=True)
+        if page == "My Results":
             show_candidate_dashboard()
     
     elif user_type == "candidate_admin":
         # Candidate admin navigation
         show_candidate_admin_dashboard()
 
+def take_session_profile_run():
+    """Claim one of the reruns this session asked to profile with ?profile=N"""
+    if profiling.query_param_allowed() and 'profile' in st.query_params:
+        try:
+            st.session_state.profile_runs = min(int(st.query_params['profile']), profiling.MAX_SESSION_RUNS)
+        except ValueError:
+            pass
+        del st.query_params['profile']
+    if st.session_state.get('profile_runs', 0) > 0:
+        st.session_state.profile_runs -= 1
+        return True
+    return False
+
+def run_app():
+    """Run main(), under cProfile when an admin or ?profile=N asked for it"""
+    if profiling.take_run() or take_session_profile_run():
+        profiling.profile_call(main, session_user_label())
+    else:
+        main()
+
 if __name__ == "__main__":
-    main()
+    run_app()
@@ -0,0 +1,244 @@
+"""Concurrent submission load test using streamlit.testing AppTest.
+
+Simulates the start of an appraisal window: N employee sessions, up to
+--concurrency at a time, each going through the landing page, the login
+page, the assessment page and the submit, with no browser. Mail goes to a
+local SMTP sink (smtp_sink.py).
+
+AppTest swaps global runtime state on every run and is not thread-safe, so
+the sessions in flight run in separate worker processes, each taking the
+next session when its current one finishes. They contend for the SQLite
+database and the CPU like the sessions of a real server. Streamlit caches
+are not shared between workers, so the first session of each worker also
+pays for warming them.
+
+The run happens in a scratch directory with a fresh database holding one
+login per session and a window that is open all day. The report gives
+p50/p95/p99 latency per step, submission throughput, database lock errors
+and failed submissions as JSON.
+
+    python benchmarks/load_test.py --sessions 200 --concurrency 50
+    python benchmarks/load_test.py --sessions 20 --smtp-delay 0.05 --output load.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import multiprocessing
+import tempfile
+import time
+import traceback
+from datetime import date
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from smtp_sink import SMTPSink  # noqa: E402
+
+# Files the pages read relative to the working directory
+RUNTIME_FILES = ['app.py', 'Logo-TEL.png', 'staff.png', 'cv.png']
+
+PASSWORD = "Load@12345"
+STEPS = ['landing', 'choose_employee', 'login', 'answer', 'submit']
+SUCCESS_MESSAGE = "Assessment completed successfully!"
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def prepare_workdir(sessions):
+    """Scratch directory with the app, its images and a database with one login per session"""
+    workdir = tempfile.mkdtemp(prefix='gateway-load-')
+    for name in RUNTIME_FILES:
+        source = os.path.join(REPO_DIR, name)
+        if os.path.exists(source):
+            shutil.copy(source, workdir)
+
+    os.environ['GATEWAY_DB_PATH'] = os.path.join(workdir, 'assessment_data.db')
+    from gateway import db
+    db.init_database()
+    db.create_users([(f"LOAD{n:05d}", f"Load User {n}", PASSWORD, "Load Test") for n in range(1, sessions + 1)])
+    today = date.today()
+    db.create_assessment_window("Load test", today, today, "00:00:00", "23:59:59", "load_test")
+    return workdir
+
+
+def is_lock_error(message):
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+class Session:
+    """One simulated employee, records the wall time of every step"""
+
+    def __init__(self, script, employee_id, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.app = AppTest.from_file(script, default_timeout=timeout)
+        self.employee_id = employee_id
+        self.timings = {}
+        self.errors = []
+
+    def run_step(self, step):
+        start = time.perf_counter()
+        self.app.run()
+        self.timings[step] = time.perf_counter() - start
+        for exception in self.app.exception:
+            self.errors.append(f"{step}: {exception.value}")
+        if self.errors:
+            raise RuntimeError(self.errors[-1])
+
+    def click(self, label):
+        buttons = [button for button in self.app.button if button.label.startswith(label)]
+        if not buttons:
+            raise RuntimeError(f"button '{label}' not found")
+        buttons[0].click()
+
+    def fill(self, label, value):
+        inputs = [text_input for text_input in self.app.text_input if text_input.label == label]
+        if not inputs:
+            raise RuntimeError(f"text input '{label}' not found")
+        inputs[0].input(value)
+
+    def run(self):
+        self.run_step('landing')
+
+        self.click("🏢 Existing Employee")
+        self.run_step('choose_employee')
+
+        self.fill("Employee ID", self.employee_id)
+        self.fill("Password", PASSWORD)
+        self.click("Login")
+        self.run_step('login')
+        if not self.app.session_state['authenticated']:
+            raise RuntimeError("login failed")
+
+        for slider in self.app.slider:
+            slider.set_value(4)
+        for radio in self.app.radio:
+            radio.set_value(1)
+        self.run_step('answer')
+
+        self.click("Submit Assessment")
+        self.run_step('submit')
+        messages = [element.value for element in self.app.success]
+        if SUCCESS_MESSAGE not in messages:
+            errors = [element.value for element in self.app.error]
+            raise RuntimeError(f"submit: {errors[0] if errors else 'no confirmation shown'}")
+
+
+def simulate(job):
+    """Run one session in a worker process and return (outcome, timings, errors)"""
+    script, employee_id, timeout = job
+    session = Session(script, employee_id, timeout)
+    try:
+        session.run()
+        outcome = 'ok'
+    except Exception as e:
+        outcome = str(e) or type(e).__name__
+        if not session.errors:
+            session.errors.append(''.join(traceback.format_exception_only(type(e), e)).strip())
+    return outcome, session.timings, session.errors
+
+
+def run_load_test(sessions, concurrency, timeout, smtp_delay):
+    """Run the sessions and return the report dict"""
+    workdir = prepare_workdir(sessions)
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with SMTPSink(delay=smtp_delay) as sink:
+            # Workers inherit the environment and working directory
+            os.environ.update({
+                'GATEWAY_SMTP_SERVER': sink.host,
+                'GATEWAY_SMTP_PORT': str(sink.port),
+                'GATEWAY_FROM_EMAIL': 'load-test@localhost',
+                'GATEWAY_SMTP_PASSWORD': 'load-test',
+                'GATEWAY_TO_EMAIL': 'hr@localhost',
+            })
+            script = os.path.join(workdir, 'app.py')
+            jobs = [(script, f"LOAD{number:05d}", timeout) for number in range(1, sessions + 1)]
+
+            with multiprocessing.get_context('spawn').Pool(concurrency) as pool:
+                # Start every worker before the clock so interpreter start-up is not counted
+                pool.map(time.sleep, [0.5] * concurrency)
+                started = time.perf_counter()
+                results = list(pool.imap_unordered(simulate, jobs))
+                elapsed = time.perf_counter() - started
+            emails = sink.messages
+
+        from gateway.db import get_connection
+        conn = get_connection()
+        stored = conn.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+        conn.close()
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    completed = sum(1 for outcome, _, _ in results if outcome == 'ok')
+    all_errors = [error for _, _, errors in results for error in errors]
+    steps = {}
+    for step in STEPS:
+        values = [timings[step] for _, timings, _ in results if step in timings]
+        steps[step] = {
+            'count': len(values),
+            'p50_s': round(percentile(values, 0.50), 4) if values else None,
+            'p95_s': round(percentile(values, 0.95), 4) if values else None,
+            'p99_s': round(percentile(values, 0.99), 4) if values else None,
+            'max_s': round(max(values), 4) if values else None
+        }
+
+    failures = {}
+    for outcome, _, _ in results:
+        if outcome != 'ok':
+            failures[outcome] = failures.get(outcome, 0) + 1
+
+    return {
+        'config': {
+            'sessions': sessions,
+            'concurrency': concurrency,
+            'smtp_delay_s': smtp_delay,
+            'cpus': os.cpu_count()
+        },
+        'elapsed_s': round(elapsed, 2),
+        'throughput_submissions_per_s': round(completed / elapsed, 3) if elapsed else None,
+        'completed_submissions': completed,
+        'failed_submissions': sessions - completed,
+        'stored_assessments': stored,
+        'emails_received': emails,
+        'lock_errors': sum(1 for error in all_errors if is_lock_error(error)),
+        'steps': steps,
+        'failures': failures
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20, help='employees submitting (default 20)')
+    parser.add_argument('--concurrency', type=int, default=None, help='sessions in flight at once (default all)')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds one script run may take (default 300)')
+    parser.add_argument('--smtp-delay', type=float, default=0.0, help='seconds the SMTP sink waits before each reply')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args.sessions, args.concurrency or args.sessions, args.timeout, args.smtp_delay)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    print(output)
+    return 1 if report['failed_submissions'] else 0
+
+
+if __name__ == '__main__':
+    # AppTest replaces sys.modules['__main__'] with the app script while it runs,
+    # so workers must find simulate() under the module's importable name
+    import load_test
+    sys.exit(load_test.main())
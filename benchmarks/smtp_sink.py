@@ -0,0 +1,125 @@
+"""Local SMTP sink for load tests.
+
+Speaks enough SMTP for smtplib's starttls(), login() and sendmail(): every
+message is accepted and counted, then discarded. STARTTLS uses a throwaway
+self-signed certificate made with the openssl command line tool; without
+openssl the extension is not advertised and starttls() fails the way a
+misconfigured server would. ``delay`` adds a pause before every reply to
+stand in for the round trips to a real mail server.
+
+    with SMTPSink(delay=0.02) as sink:
+        ...  # point GATEWAY_SMTP_SERVER / GATEWAY_SMTP_PORT at sink.host / sink.port
+    print(sink.messages)
+"""
+import os
+import shutil
+import socketserver
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+
+def make_certificate(directory):
+    """Create a self-signed localhost certificate, returns (certfile, keyfile) or None"""
+    if not shutil.which('openssl'):
+        return None
+    certfile = os.path.join(directory, 'sink.crt')
+    keyfile = os.path.join(directory, 'sink.key')
+    result = subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=localhost', '-keyout', keyfile, '-out', certfile],
+        capture_output=True, check=False
+    )
+    return (certfile, keyfile) if result.returncode == 0 else None
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.wfile.write(f"{line}\r\n".encode())
+        self.wfile.flush()
+
+    def handle(self):
+        self.reply("220 localhost SMTP sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb in ('EHLO', 'HELO'):
+                extensions = ["250-localhost", "250-AUTH PLAIN LOGIN", "250-SIZE 52428800"]
+                if self.server.ssl_context and not isinstance(self.connection, ssl.SSLSocket):
+                    extensions.append("250-STARTTLS")
+                extensions.append("250 8BITMIME")
+                for extension in extensions if verb == 'EHLO' else ["250 localhost"]:
+                    self.reply(extension)
+            elif verb == 'STARTTLS' and self.server.ssl_context:
+                self.reply("220 Ready to start TLS")
+                self.connection = self.server.ssl_context.wrap_socket(self.connection, server_side=True)
+                self.rfile = self.connection.makefile('rb')
+                self.wfile = self.connection.makefile('wb')
+            elif verb == 'AUTH':
+                self.reply("235 Authentication successful")
+            elif verb in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    size += len(data)
+                self.server.record(size)
+                self.reply("250 OK queued")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Threaded SMTP server on localhost that accepts and counts every message"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, delay=0.0):
+        super().__init__(('127.0.0.1', port), SMTPHandler)
+        self.delay = delay
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._cert_dir = tempfile.mkdtemp(prefix='smtp-sink-')
+        self.ssl_context = None
+        certificate = make_certificate(self._cert_dir)
+        if certificate:
+            self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.ssl_context.load_cert_chain(*certificate)
+
+    @property
+    def host(self):
+        return self.server_address[0]
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record(self, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        shutil.rmtree(self._cert_dir, ignore_errors=True)
@@ -0,0 +1,154 @@
+"""Cold-start benchmark for app.py.
+
+Measures, each in a fresh interpreter:
+  * import_core     - wall time of `import gateway` plus its data, report and
+                      mail modules, what a worker or CLI process pays
+  * import_app      - wall time of `import app`
+  * first_render    - wall time of the first run of the landing page under
+                      streamlit.testing AppTest (no browser)
+
+The median of several runs is compared with startup_budget.json and the
+script exits non-zero when a measurement exceeds its budget by more than
+the allowed tolerance, so it can gate CI.
+
+    python benchmarks/startup.py                  # measure and check
+    python benchmarks/startup.py --update-budget  # record new budget
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+
+# Files the landing page reads relative to the working directory
+RUNTIME_FILES = ['Logo-TEL.png', 'staff.png', 'cv.png']
+
+# Placeholder mail settings so the app can start without real credentials
+SECRETS_TOML = """[email]
+smtp_server = "localhost"
+smtp_port = 25
+from_email = "benchmark@localhost"
+password = ""
+to_email = "benchmark@localhost"
+"""
+
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+"""
+
+CORE_IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+import gateway, gateway.db, gateway.reports, gateway.mail
+print(time.perf_counter() - start)
+"""
+
+RENDER_SNIPPET = """
+import time, tomllib
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({script!r}, default_timeout=120)
+with open('.streamlit/secrets.toml', 'rb') as secrets_file:
+    for section, values in tomllib.load(secrets_file).items():
+        at.secrets[section] = values
+start = time.perf_counter()
+at.run()
+elapsed = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(f"first render failed: {{at.exception[0].value}}")
+print(elapsed)
+"""
+
+
+def prepare_workdir():
+    """Create a scratch working directory with secrets and the landing page images"""
+    workdir = tempfile.mkdtemp(prefix='gateway-startup-')
+    os.makedirs(os.path.join(workdir, '.streamlit'))
+    with open(os.path.join(workdir, '.streamlit', 'secrets.toml'), 'w') as secrets_file:
+        secrets_file.write(SECRETS_TOML)
+    for name in RUNTIME_FILES:
+        source = os.path.join(REPO_DIR, name)
+        if os.path.exists(source):
+            shutil.copy(source, workdir)
+    return workdir
+
+
+def time_snippet(snippet, workdir):
+    """Run a snippet in a fresh interpreter and return the seconds it prints"""
+    # The copied app.py imports the gateway package from the repository
+    python_path = [REPO_DIR, os.environ.get('PYTHONPATH')]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, python_path)))
+    result = subprocess.run(
+        [sys.executable, '-c', snippet],
+        cwd=workdir, env=env, capture_output=True, text=True, check=False
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(runs):
+    """Median cold import and first render time over several fresh processes"""
+    samples = {'import_core': [], 'import_app': [], 'first_render': []}
+    for _ in range(runs):
+        workdir = prepare_workdir()
+        try:
+            samples['import_core'].append(time_snippet(CORE_IMPORT_SNIPPET.format(repo=REPO_DIR), workdir))
+            samples['import_app'].append(time_snippet(IMPORT_SNIPPET.format(repo=REPO_DIR), workdir))
+            # The app writes its database and static files next to the script, use a copy
+            shutil.copy(os.path.join(REPO_DIR, 'app.py'), workdir)
+            script = os.path.join(workdir, 'app.py')
+            samples['first_render'].append(time_snippet(RENDER_SNIPPET.format(script=script), workdir))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {name: round(statistics.median(values), 4) for name, values in samples.items()}
+
+
+def load_budget():
+    if not os.path.exists(BUDGET_FILE):
+        return None
+    with open(BUDGET_FILE) as budget_file:
+        return json.load(budget_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per measurement (default 5)')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help='allowed slowdown over budget as a fraction (default from budget file)')
+    parser.add_argument('--update-budget', action='store_true', help='write the measured times as the new budget')
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs)
+    budget = load_budget()
+    report = {'results': results, 'budget': budget, 'regressions': []}
+
+    if args.update_budget:
+        budget = {'seconds': results, 'tolerance': args.tolerance if args.tolerance is not None else 0.25}
+        with open(BUDGET_FILE, 'w') as budget_file:
+            json.dump(budget, budget_file, indent=2)
+            budget_file.write('\n')
+        report['budget'] = budget
+    elif budget:
+        tolerance = args.tolerance if args.tolerance is not None else budget.get('tolerance', 0.25)
+        for name, seconds in results.items():
+            limit = budget['seconds'].get(name)
+            if limit is not None and seconds > limit * (1 + tolerance):
+                report['regressions'].append({'metric': name, 'seconds': seconds, 'budget': limit})
+
+    print(json.dumps(report, indent=2))
+    return 1 if report['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
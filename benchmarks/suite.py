@@ -0,0 +1,410 @@
+"""Benchmark suite for scoring, database queries, rendering and exports.
+
+Each case runs in its own interpreter against a synthetic dataset of fixed
+size (see synthetic_data.py), so a case that runs out of memory or time is
+recorded as failed without taking the rest of the run down, and no case
+benefits from caches warmed by another. Cases that do not touch the database
+run once, under the size "-".
+
+Results are printed as JSON. When a baseline exists, every case is compared
+with it and the script exits non-zero if a median is slower than the
+baseline by more than the threshold, so it can gate CI. Cases in
+RELATIVE_BUDGETS must also stay within a multiple of another case from the
+same run, like the Hindi PDF report against the English one.
+
+    python benchmarks/suite.py                          # all cases, all sizes
+    python benchmarks/suite.py --sizes 1k,100k --cases load_all_assessments
+    python benchmarks/suite.py --update-baseline        # record new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import synthetic_data  # noqa: E402
+
+BASELINE_FILE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+
+# Seconds a single case may take, including setup, before it is recorded as a timeout
+CASE_TIMEOUT = 900
+
+# PDF reports written per sample of generate_reports_bulk
+BULK_REPORTS = 200
+
+# Samples per case; slow cases stop early once MIN_SAMPLE_TIME has been spent
+MAX_SAMPLES = 7
+MIN_SAMPLE_TIME = 2.0
+
+
+def sample_scores():
+    from gateway import calculate_scores, get_interpretation
+    responses = synthetic_data.random_responses(random.Random(0), 'en')
+    scores, total_possible = calculate_scores(responses, 'en')
+    interpretations, overall = get_interpretation(scores, total_possible)
+    return responses, scores, total_possible, interpretations, overall
+
+
+def setup_calculate_scores(size):
+    from gateway import calculate_scores
+    responses = sample_scores()[0]
+    return lambda: calculate_scores(responses, 'en'), 1000
+
+
+def setup_get_interpretation(size):
+    from gateway import get_interpretation
+    _, scores, total_possible, _, _ = sample_scores()
+    return lambda: get_interpretation(scores, total_possible), 1000
+
+
+def setup_get_active_assessment_window(size):
+    from gateway.db import get_active_assessment_window
+    return get_active_assessment_window, 100
+
+
+def setup_load_all_assessments(size):
+    # Admin dashboard and employee records pages
+    from gateway.db import load_all_assessments
+    return load_all_assessments, 1
+
+
+def setup_load_employee_assessments(size):
+    # Employee dashboard
+    from gateway.db import load_employee_assessments
+    return lambda: load_employee_assessments('EMP000001'), 1
+
+
+def setup_load_candidates(size):
+    # Candidate admin, candidates tab
+    from gateway.db import load_candidates
+    return load_candidates, 1
+
+
+def setup_load_candidate_assessments(size):
+    # Candidate admin, results tab
+    from gateway.db import load_candidate_assessments
+    return load_candidate_assessments, 1
+
+
+def setup_load_assessment_windows(size):
+    # Assessment window management
+    from gateway.db import load_assessment_windows
+    return load_assessment_windows, 1
+
+
+def setup_load_competency_summary(size):
+    # Competency averages on the admin and candidate admin dashboards
+    from gateway.db import load_competency_summary
+    return lambda: load_competency_summary('employee'), 1
+
+
+def setup_score_all_responses(size):
+    # Bulk analytics over stored answers: decode every packed row and score them as arrays
+    from gateway.db import load_answer_matrix
+    from gateway.scoring import score_answer_matrix
+    from gateway.templates import DEFAULT_TEMPLATE, get_template
+
+    bank = get_template(DEFAULT_TEMPLATE).current_bank()
+
+    def run():
+        _, languages, answers = load_answer_matrix('assessments')
+        is_hindi = [language == 'hi' for language in languages]
+        for language, rows in (('en', [not hindi for hindi in is_hindi]), ('hi', is_hindi)):
+            score_answer_matrix(answers[rows], language, bank)
+    return run, 1
+
+
+def setup_build_results_figure(size):
+    import app
+    _, scores, total_possible, interpretations, _ = sample_scores()
+    return lambda: app.build_results_figure(scores, interpretations, total_possible), 10
+
+
+def setup_generate_assessment_pdf(size, language='en'):
+    from gateway.reports import generate_assessment_pdf
+    _, scores, total_possible, interpretations, overall = sample_scores()
+    user_data = {'employee_id': 'EMP000001', 'employee_name': 'Benchmark User',
+                 'department': 'Sales', 'submit_date': '2025-01-01', 'language': language}
+    output_path = os.path.join(tempfile.mkdtemp(prefix='gateway-bench-'), 'report.pdf')
+
+    def run():
+        generate_assessment_pdf(user_data, scores, interpretations, overall, total_possible,
+                                output_path=output_path)
+    return run, 1
+
+
+def setup_generate_assessment_pdf_hi(size):
+    # Needs a Devanagari font (gateway.reports), without one this times the English fallback
+    return setup_generate_assessment_pdf(size, 'hi')
+
+
+def setup_generate_reports_bulk(size):
+    # python -m gateway reports, charts included, over the first BULK_REPORTS assessments
+    from itertools import islice
+    from gateway import get_interpretation
+    from gateway.db import iter_report_data
+    from gateway.reports import generate_assessment_pdf
+    output_dir = tempfile.mkdtemp(prefix='gateway-bench-')
+
+    def run():
+        for assessment_id, user_data, scores, total_possible in islice(iter_report_data('employee'), BULK_REPORTS):
+            interpretations, overall = get_interpretation(scores, total_possible)
+            user_data['submit_date'] = str(user_data['submit_date'])
+            generate_assessment_pdf(user_data, scores, interpretations, overall, total_possible,
+                                    output_path=os.path.join(output_dir, f"{assessment_id}.pdf"))
+    return run, 1
+
+
+def setup_generate_cohort_pdf(size):
+    # python -m gateway cohort-reports for the largest department of the largest window
+    from gateway.db import get_connection
+    from gateway.reports import generate_cohort_pdf
+    conn = get_connection()
+    window_id, department = conn.execute(
+        "SELECT window_id, department FROM assessments WHERE window_id IS NOT NULL "
+        "GROUP BY window_id, department ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    conn.close()
+    output_path = os.path.join(tempfile.mkdtemp(prefix='gateway-bench-'), 'cohort.pdf')
+    return lambda: generate_cohort_pdf(window_id, department, output_path=output_path), 1
+
+
+def setup_excel_export(size):
+    # Download Excel on the employee records page before exports were precomputed:
+    # load, build the display frame, write the workbook in memory
+    from gateway import exports
+    from gateway.db import EMPLOYEE_RECORD_COLUMNS, MAX_TOTAL_SCORE, load_all_assessments
+
+    def run():
+        df = load_all_assessments()
+        display_df = df[EMPLOYEE_RECORD_COLUMNS[:-1]].copy()
+        display_df['percentage'] = (display_df['total_score'] / MAX_TOTAL_SCORE * 100).round(1)
+        exports.build_excel_report(display_df, 'Assessment_Records')
+    return run, 1
+
+
+def setup_excel_export_stream(size):
+    # python -m gateway export records -o records.xlsx
+    from gateway import exports
+    from gateway.db import EMPLOYEE_RECORD_COLUMNS, iter_employee_records
+    output_path = os.path.join(tempfile.mkdtemp(prefix='gateway-bench-'), 'records.xlsx')
+    return lambda: exports.write_xlsx(EMPLOYEE_RECORD_COLUMNS, iter_employee_records(), output_path,
+                                      'Assessment_Records'), 1
+
+
+def setup_excel_export_precomputed(size):
+    # Download Excel on the employee records page while the data is unchanged: find the export and read it
+    os.environ['GATEWAY_EXPORT_CACHE_DIR'] = tempfile.mkdtemp(prefix='gateway-bench-')
+    from gateway import precomputed
+    precomputed.export_file('records')
+
+    def run():
+        with open(precomputed.export_file('records'), 'rb') as excel_file:
+            excel_file.read()
+    return run, 1
+
+
+# name: (setup, uses the dataset); setup returns the function to time and the calls per sample
+CASES = {
+    'calculate_scores': (setup_calculate_scores, False),
+    'get_interpretation': (setup_get_interpretation, False),
+    'build_results_figure': (setup_build_results_figure, False),
+    'generate_assessment_pdf': (setup_generate_assessment_pdf, False),
+    'generate_assessment_pdf_hi': (setup_generate_assessment_pdf_hi, False),
+    'generate_reports_bulk': (setup_generate_reports_bulk, True),
+    'generate_cohort_pdf': (setup_generate_cohort_pdf, True),
+    'get_active_assessment_window': (setup_get_active_assessment_window, True),
+    'load_all_assessments': (setup_load_all_assessments, True),
+    'load_employee_assessments': (setup_load_employee_assessments, True),
+    'load_candidates': (setup_load_candidates, True),
+    'load_candidate_assessments': (setup_load_candidate_assessments, True),
+    'load_assessment_windows': (setup_load_assessment_windows, True),
+    'load_competency_summary': (setup_load_competency_summary, True),
+    'score_all_responses': (setup_score_all_responses, True),
+    'excel_export': (setup_excel_export, True),
+    'excel_export_stream': (setup_excel_export_stream, True),
+    'excel_export_precomputed': (setup_excel_export_precomputed, True),
+}
+
+
+# case: (reference case, highest allowed ratio of their medians), checked whenever both ran
+RELATIVE_BUDGETS = {
+    # Embedding the font subset's glyphs and widths roughly doubles a one-page report
+    'generate_assessment_pdf_hi': ('generate_assessment_pdf', 3.0),
+}
+
+
+def run_case(name, size):
+    """Time one case in this process and return its result dict"""
+    setup, _ = CASES[name]
+    func, number = setup(size)
+    # Warm up imports and the page cache; a call this slow is not worth repeating
+    started = time.perf_counter()
+    func()
+    warmup = time.perf_counter() - started
+    samples = [warmup] if number == 1 and warmup > MIN_SAMPLE_TIME else []
+
+    started = time.perf_counter()
+    while not samples or (len(samples) < MAX_SAMPLES and time.perf_counter() - started < MIN_SAMPLE_TIME):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        'median_s': round(statistics.median(samples), 7),
+        'min_s': round(min(samples), 7),
+        'samples': len(samples),
+        'calls_per_sample': number
+    }
+
+
+def spawn_case(name, size, db_path, timeout):
+    """Run one case in a fresh interpreter and return its result dict"""
+    env = dict(os.environ)
+    if db_path:
+        env['GATEWAY_DB_PATH'] = db_path
+    command = [sys.executable, os.path.abspath(__file__), '--worker', name, '--sizes', size]
+    try:
+        result = subprocess.run(command, cwd=REPO_DIR, env=env, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'status': 'timeout', 'error': f"exceeded {timeout}s"}
+    if result.returncode < 0:
+        # SIGKILL here is nearly always the kernel's out-of-memory killer
+        return {'status': 'failed', 'error': f"killed by signal {-result.returncode}"}
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or [f"exit code {result.returncode}"])[-1]
+        return {'status': 'failed', 'error': error}
+    return dict(json.loads(result.stdout.strip().splitlines()[-1]), status='ok')
+
+
+def compare(results, baseline, threshold):
+    """Cases whose median is slower than the baseline by more than threshold"""
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get('results', {}).get(key)
+        if not reference or reference.get('status') != 'ok':
+            continue
+        if result.get('status') != 'ok':
+            regressions.append({'case': key, 'status': result['status'], 'baseline_s': reference['median_s']})
+        elif result['median_s'] > reference['median_s'] * (1 + threshold):
+            regressions.append({
+                'case': key,
+                'median_s': result['median_s'],
+                'baseline_s': reference['median_s'],
+                'change': f"{(result['median_s'] / reference['median_s'] - 1) * 100:+.1f}%"
+            })
+    return regressions
+
+
+def check_relative_budgets(results):
+    """Cases slower than their reference case by more than RELATIVE_BUDGETS allows"""
+    overruns = []
+    for key, result in results.items():
+        name, _, size = key.partition('@')
+        if name not in RELATIVE_BUDGETS or result.get('status') != 'ok':
+            continue
+        reference_name, ratio = RELATIVE_BUDGETS[name]
+        reference = results.get(f"{reference_name}@{size}")
+        if not reference or reference.get('status') != 'ok':
+            continue
+        if result['median_s'] > reference['median_s'] * ratio:
+            overruns.append({
+                'case': key,
+                'median_s': result['median_s'],
+                'reference': f"{reference_name}@{size}",
+                'reference_s': reference['median_s'],
+                'budget': f"{ratio:.2f}x"
+            })
+    return overruns
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE_FILE):
+        return None
+    with open(BASELINE_FILE) as baseline_file:
+        return json.load(baseline_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(synthetic_data.SIZES),
+                        help=f"comma-separated dataset sizes (default {','.join(synthetic_data.SIZES)})")
+    parser.add_argument('--cases', default=','.join(CASES), help='comma-separated cases (default all)')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='allowed slowdown over baseline as a fraction (default from baseline file, else 0.2)')
+    parser.add_argument('--timeout', type=int, default=CASE_TIMEOUT, help=f'seconds per case (default {CASE_TIMEOUT})')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    parser.add_argument('--update-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_case(args.worker, args.sizes)))
+        return 0
+
+    sizes = [size for size in args.sizes.split(',') if size]
+    cases = [case for case in args.cases.split(',') if case]
+    unknown = [name for name in sizes if name not in synthetic_data.SIZES] + [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown size or case: {', '.join(unknown)}")
+
+    results = {}
+    for name in cases:
+        if CASES[name][1]:
+            for size in sizes:
+                db_path = synthetic_data.ensure_dataset(size)
+                results[f"{name}@{size}"] = spawn_case(name, size, db_path, args.timeout)
+        else:
+            results[f"{name}@-"] = spawn_case(name, '-', None, args.timeout)
+        for key in [key for key in results if key.startswith(f"{name}@")]:
+            print(f"{key}: {results[key].get('median_s', results[key].get('status'))}", file=sys.stderr)
+
+    baseline = load_baseline()
+    threshold = args.threshold
+    if threshold is None:
+        threshold = baseline.get('threshold', 0.2) if baseline else 0.2
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'threshold': threshold,
+        'results': results,
+        'regressions': []
+    }
+
+    if args.update_baseline:
+        # Keep cases and sizes that were not part of this run
+        merged = dict(baseline.get('results', {})) if baseline else {}
+        merged.update(results)
+        with open(BASELINE_FILE, 'w') as baseline_file:
+            json.dump(dict(report, results=merged, regressions=[]), baseline_file, indent=2)
+            baseline_file.write('\n')
+    elif baseline:
+        report['regressions'] = compare(results, baseline, threshold)
+    report['regressions'] += check_relative_budgets(results)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    print(output)
+    return 1 if report['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""Synthetic data generator for load and scale testing.
+
+Fills a fresh database with employees, assessment windows, candidates and
+assessments. Every employee takes one assessment per window, so the number
+of assessments is employees × windows. Candidates take one assessment each.
+
+Scores come from running calculate_scores and get_interpretation on
+randomized responses in both languages. Scoring a million response sets one
+by one would take longer than the inserts, so a pool of scored response sets
+is built per language and rows draw from it. With --seed the output is
+identical from run to run.
+
+Rows go in with explicit ids in batches, each followed by its competency
+scores. The data version triggers are dropped for the bulk insert and put
+back with the versions they would have reached. On one core the 1m preset
+takes about 35 s (4.5 s for 100k).
+
+    python benchmarks/synthetic_data.py --size 100k
+    python benchmarks/synthetic_data.py --employees 2000 --windows 12 --candidates 500 --db /tmp/load.db
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from gateway import QUESTIONS, calculate_scores, get_interpretation  # noqa: E402
+from gateway.encoding import pack_responses  # noqa: E402
+from gateway.scoring import compact_interpretation  # noqa: E402
+from gateway.auth import hash_password  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Dataset sizes shared with the benchmark suite: (employees, windows, candidates)
+SIZES = {
+    '1k': (250, 4, 100),
+    '100k': (5000, 20, 5000),
+    '1m': (20000, 50, 20000),
+}
+
+# Password of every generated employee and candidate
+PASSWORD = "Synthetic@123"
+
+DEPARTMENTS = ["Sales", "Operations", "Finance", "Human Resources", "Engineering",
+               "Production", "Quality", "Procurement", "Logistics", "IT"]
+POSITIONS = ["Sales Executive", "Site Engineer", "Accountant", "HR Associate",
+             "Production Supervisor", "Quality Inspector", "Software Developer"]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ananya", "Diya", "Ishaan", "Kavya", "Meera",
+               "Rohan", "Saanvi", "Arjun", "Priya", "Rahul", "Neha", "Vikram", "Pooja"]
+LAST_NAMES = ["Sharma", "Verma", "Patel", "Singh", "Gupta", "Iyer", "Reddy", "Nair",
+              "Das", "Mehta", "Joshi", "Khan", "Kulkarni", "Bose", "Chopra", "Rao"]
+
+# Share of Hindi submissions, the rest are English
+HINDI_SHARE = 0.3
+
+# Distinct scored response sets per language that rows are drawn from
+POOL_SIZE = 2000
+
+# Rows handed to executemany at a time
+INSERT_BATCH_SIZE = 50000
+
+
+def random_responses(rng, language):
+    """One respondent's answers, with a per-respondent ability so scores spread realistically"""
+    ability = rng.betavariate(4, 2)
+    responses = {}
+    for competency, questions in QUESTIONS.items():
+        for i, question in enumerate(questions[language]):
+            if question["type"] == "likert":
+                value = round(1 + 4 * ability + rng.gauss(0, 0.8))
+                responses[f"{competency}_{i}"] = min(5, max(1, value))
+            elif question["type"] == "situational":
+                if rng.random() < ability:
+                    responses[f"{competency}_{i}"] = question["correct"]
+                else:
+                    responses[f"{competency}_{i}"] = rng.randrange(len(question["options"]))
+            else:
+                responses[f"{competency}_{i}"] = 1 if rng.random() < ability else 0
+    return responses
+
+
+def build_response_pool(rng, language, size=POOL_SIZE):
+    """Scored response sets ready for insertion: (score columns, total, packed responses, compact interpretation)"""
+    pool = []
+    for _ in range(size):
+        responses = random_responses(rng, language)
+        scores, total_possible = calculate_scores(responses, language)
+        interpretations, _ = get_interpretation(scores, total_possible)
+        pool.append((
+            tuple(scores.values()),
+            sum(scores.values()),
+            pack_responses(responses),
+            compact_interpretation(interpretations)
+        ))
+    return pool
+
+
+def random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def random_time(rng, start_hour=9, end_hour=18):
+    seconds = rng.randrange(start_hour * 3600, end_hour * 3600)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def create_schema(db_path):
+    """Create the application schema in db_path"""
+    from gateway import db
+
+    previous = os.environ.get('GATEWAY_DB_PATH')
+    os.environ['GATEWAY_DB_PATH'] = db_path
+    try:
+        db.init_database()
+    finally:
+        if previous is None:
+            del os.environ['GATEWAY_DB_PATH']
+        else:
+            os.environ['GATEWAY_DB_PATH'] = previous
+
+
+def generate(db_path, employees, windows, candidates, seed=None, today=None):
+    """Fill a new database and return the number of rows written per table"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    create_schema(db_path)
+
+    pools = {language: build_response_pool(rng, language) for language in ('en', 'hi')}
+    password_hash = hash_password(PASSWORD)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA journal_mode = MEMORY')
+    # 256 MB, enough to keep the competency_scores index of the 1m preset in memory
+    conn.execute('PRAGMA cache_size = -262144')
+    cursor = conn.cursor()
+    # The data version triggers would fire on every row, the versions are set once at the end
+    # and create_schema puts the triggers back
+    for (trigger,) in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                     "AND name LIKE 'data_version_%'").fetchall():
+        cursor.execute(f'DROP TRIGGER {trigger}')
+
+    # Employees
+    users = [
+        (f"EMP{n:06d}", random_name(rng), password_hash, rng.choice(DEPARTMENTS), 'employee')
+        for n in range(1, employees + 1)
+    ]
+    cursor.executemany('''
+        INSERT INTO users (employee_id, employee_name, password_hash, department, user_type)
+        VALUES (?, ?, ?, ?, ?)
+    ''', users)
+
+    # Two-week windows every month, ending before today; the newest one is still open
+    window_rows = []
+    for n in range(windows):
+        start = today - timedelta(days=30 * (windows - 1 - n) + 7)
+        end = start + timedelta(days=14)
+        window_rows.append((f"Appraisal {start:%b %Y} #{n + 1}", start.isoformat(), end.isoformat(),
+                            '00:00:00', '23:59:59', 1 if end >= today else 0, 'admin'))
+    cursor.executemany('''
+        INSERT INTO assessment_windows (window_name, start_date, end_date, start_time, end_time, is_active, created_by)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', window_rows)
+    cursor.execute('SELECT id, start_date FROM assessment_windows ORDER BY id')
+    window_ids = cursor.fetchall()
+
+    # One assessment per employee per window, ids given so competency scores go in with each batch
+    def assessment_rows():
+        assessment_id = 0
+        for window_id, start_date in window_ids:
+            start = date.fromisoformat(start_date)
+            submit_dates = [(start + timedelta(days=day)).isoformat() for day in range(14)]
+            for employee_id, employee_name, _, department, _ in users:
+                language = 'hi' if rng.random() < HINDI_SHARE else 'en'
+                scores, total, responses, interpretation = rng.choice(pools[language])
+                submit_date = rng.choice(submit_dates)
+                assessment_id += 1
+                yield (assessment_id, employee_id, employee_name, department, submit_date, random_time(rng),
+                       language, window_id) + scores + (total, responses, interpretation)
+
+    assessments = insert_batches(cursor, 'assessments', '''
+        INSERT INTO assessments (
+            id, employee_id, employee_name, department, submit_date, submit_time, language, window_id,
+            accountability_score, teamwork_score, result_orientation_score,
+            communication_score, adaptability_score, integrity_score,
+            conflict_resolution_score, total_score, response_data, interpretation
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', assessment_rows())
+
+    # Candidates spread over the last 90 days, each with one assessment
+    candidate_rows, candidate_assessment_rows = [], []
+    for n in range(1, candidates + 1):
+        code = f"TELCAN{n:05d}"
+        name = random_name(rng)
+        position = rng.choice(POSITIONS)
+        created = datetime.combine(today - timedelta(days=rng.randrange(90)), datetime.min.time())
+        created += timedelta(seconds=rng.randrange(9 * 3600, 18 * 3600))
+        expires = created + timedelta(days=2)
+        candidate_rows.append((code, name, position, password_hash, created.isoformat(' '),
+                               expires.isoformat(' '), 1 if expires > datetime.now() else 0))
+
+        language = 'hi' if rng.random() < HINDI_SHARE else 'en'
+        scores, total, responses, interpretation = rng.choice(pools[language])
+        candidate_assessment_rows.append((n, code, name, position, created.date().isoformat(),
+                                          random_time(rng), language) + scores + (total, responses, interpretation))
+    cursor.executemany('''
+        INSERT INTO candidates (candidate_code, full_name, position_applied, password_hash, created_at, expires_at, is_active)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', candidate_rows)
+    insert_batches(cursor, 'candidate_assessments', '''
+        INSERT INTO candidate_assessments (
+            id, candidate_code, full_name, position_applied, submit_date, submit_time, language,
+            accountability_score, teamwork_score, result_orientation_score,
+            communication_score, adaptability_score, integrity_score,
+            conflict_resolution_score, total_score, response_data, interpretation
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', iter(candidate_assessment_rows))
+
+    set_data_versions(cursor)
+    conn.commit()
+    conn.close()
+    create_schema(db_path)
+    return {
+        'users': len(users),
+        'assessment_windows': len(window_rows),
+        'assessments': assessments,
+        'candidates': len(candidate_rows),
+        'candidate_assessments': len(candidate_assessment_rows)
+    }
+
+
+def set_data_versions(cursor):
+    """Data versions as the triggers would have left them: one bump per row inserted in each scope"""
+    from gateway import db
+
+    for owner_type, table in db.ASSESSMENT_TABLES.items():
+        cursor.execute(f"UPDATE data_versions SET version = (SELECT COUNT(*) FROM {table}) WHERE name = ?",
+                       (owner_type,))
+    # The scopes of db.DATA_VERSION_SCOPES
+    for scope, column in (('window', 'window_id'), ('department', 'department')):
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO data_versions (name, version)
+            SELECT 'employee:{scope}:' || {column}, COUNT(*) FROM assessments
+            WHERE {column} IS NOT NULL GROUP BY {column}
+        ''')
+
+
+def fill_competency_scores(cursor):
+    """Per-competency scores of every assessment, as saving an assessment writes them"""
+    from gateway import db
+
+    for table in ('assessments', 'candidate_assessments'):
+        db.copy_legacy_scores(cursor, table, 1, cursor.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0)
+
+
+def insert_batches(cursor, table, query, rows):
+    """executemany assessment rows in fixed-size batches, returns the number of rows
+
+    Rows start with their id, so each batch's competency scores are copied
+    from its score columns right after it, while its pages are in cache.
+    """
+    from gateway import db
+
+    count = 0
+    while True:
+        batch = [row for _, row in zip(range(INSERT_BATCH_SIZE), rows)]
+        if not batch:
+            return count
+        cursor.executemany(query, batch)
+        db.copy_legacy_scores(cursor, table, batch[0][0], batch[-1][0])
+        count += len(batch)
+
+
+def dataset_path(size):
+    """Default location of a preset dataset"""
+    return os.path.join(DATA_DIR, f"synthetic_{size}.db")
+
+
+def ensure_dataset(size, seed=0):
+    """Path of a preset dataset, generating it first if it does not exist yet
+
+    A dataset generated by an older version gets the schema migrations of
+    init_database() applied and its competency scores filled in, its other
+    rows are left as they are.
+    """
+    path = dataset_path(size)
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        employees, windows, candidates = SIZES[size]
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+        generate(path + '.tmp', employees, windows, candidates, seed=seed)
+        os.replace(path + '.tmp', path)
+    else:
+        create_schema(path)
+        conn = sqlite3.connect(path)
+        if conn.execute("SELECT 1 FROM competency_scores LIMIT 1").fetchone() is None:
+            fill_competency_scores(conn.cursor())
+            conn.commit()
+        conn.close()
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', choices=sorted(SIZES), help='preset dataset (employees x windows, candidates)')
+    parser.add_argument('--employees', type=int, help='employees, each takes one assessment per window')
+    parser.add_argument('--windows', type=int, help='assessment windows')
+    parser.add_argument('--candidates', type=int, help='candidates, each with one assessment')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default 0)')
+    parser.add_argument('--db', help='output database (default benchmarks/data/synthetic_<size>.db)')
+    parser.add_argument('--force', action='store_true', help='replace the output database if it exists')
+    args = parser.parse_args(argv)
+
+    employees, windows, candidates = SIZES[args.size or '1k']
+    employees = args.employees if args.employees is not None else employees
+    windows = args.windows if args.windows is not None else windows
+    candidates = args.candidates if args.candidates is not None else candidates
+
+    db_path = args.db or dataset_path(args.size or 'custom')
+    if os.path.exists(db_path):
+        if not args.force:
+            parser.error(f"{db_path} exists, use --force to replace it")
+        os.remove(db_path)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    start = time.perf_counter()
+    counts = generate(db_path, employees, windows, candidates, seed=args.seed)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        'db': db_path,
+        'rows': counts,
+        'seconds': round(elapsed, 2),
+        'size_mb': round(os.path.getsize(db_path) / 1e6, 1)
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""Headless core of the assessment gateway.
+
+Scoring, the question bank, data access, PDF reports and mail live here so
+they can be used from batch jobs, benchmarks and worker processes without
+importing Streamlit. ``app.py`` is the UI layer on top of this package.
+"""
+from gateway.questions import QUESTIONS
+from gateway.scoring import calculate_scores, get_interpretation
+
+__all__ = ['QUESTIONS', 'calculate_scores', 'get_interpretation']
@@ -0,0 +1,24 @@
+"""Password hashing and validation"""
+import hashlib
+import re
+
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def validate_password(password):
+    """Validate password according to requirements"""
+    if len(password) < 8:
+        return False, "Password must be at least 8 characters long."
+    
+    if not password[0].isupper():
+        return False, "Password must start with an uppercase letter."
+    
+    if not re.search(r'[a-z]', password):
+        return False, "Password must contain at least one lowercase letter."
+    
+    if not re.search(r'[@#$]', password):
+        return False, "Password must contain at least one special symbol (@, #, or $)."
+    
+    return True, "Password is valid."
@@ -0,0 +1,364 @@
+"""Command-line tool for batch operations on the assessment database
+
+    python -m gateway export records --window "Q3 2025" -o records.xlsx
+    python -m gateway export candidates --since 2025-01-01 > candidates.csv
+    python -m gateway reports --department Sales --output-dir reports/
+    python -m gateway reports --window "Q3 2025" --zip reports.zip
+    python -m gateway cohort-reports --window "Q3 2025" --output-dir cohorts/
+    python -m gateway rescore --dry-run
+    python -m gateway migrate-responses --all --vacuum
+    python -m gateway backfill-scores --all
+    python -m gateway expire-candidates
+    python -m gateway precompute-exports
+    python -m gateway import-users users.csv
+    python -m gateway create-window "Q4 2025" --start 2025-10-01 --end 2025-10-15
+
+Every command reads the database named by GATEWAY_DB_PATH (default
+assessment_data.db in the working directory), streams rows instead of loading
+whole tables, writes a one-line summary to stderr and exits non-zero on
+failure, so the commands can run from cron outside the Streamlit server.
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from datetime import date, datetime, time
+
+from gateway import db, exports, precomputed, reports
+from gateway.auth import validate_password
+from gateway.config import ConfigError
+from gateway.scoring import calculate_scores, get_interpretation
+from gateway.templates import get_template
+
+# Columns expected in an import-users CSV file
+USER_IMPORT_COLUMNS = ['employee_id', 'employee_name', 'department', 'password']
+
+
+class CommandError(Exception):
+    """A command failed in a way worth a short message rather than a traceback"""
+
+
+def log(message):
+    print(message, file=sys.stderr)
+
+
+def resolve_window(window):
+    if window is None:
+        return None
+    window_id = db.find_assessment_window(window)
+    if window_id is None:
+        raise CommandError(f"No assessment window with id or name '{window}'")
+    return window_id
+
+
+def cmd_export(args):
+    """Export employee records or candidate results as CSV or Excel"""
+    if args.kind == 'records':
+        columns = db.EMPLOYEE_RECORD_COLUMNS
+        rows = db.iter_employee_records(resolve_window(args.window), args.department, args.since, args.until)
+        sheet_name, prefix = 'Assessment_Records', 'assessment_records'
+    else:
+        columns = db.CANDIDATE_RESULT_COLUMNS
+        rows = db.iter_candidate_results(args.position, args.since, args.until)
+        sheet_name, prefix = 'Candidate_Results', 'candidate_results'
+
+    export_format = args.format
+    if export_format is None:
+        export_format = 'xlsx' if args.output and args.output.endswith('.xlsx') else 'csv'
+
+    if export_format == 'xlsx':
+        output = args.output or f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        if output == '-':
+            raise CommandError("Excel exports need an output file")
+        count = exports.write_xlsx(columns, rows, output, sheet_name)
+    elif args.output in (None, '-'):
+        output = 'stdout'
+        count = exports.write_csv(columns, rows, sys.stdout)
+    else:
+        output = args.output
+        with open(output, 'w', newline='', encoding='utf-8') as csv_file:
+            count = exports.write_csv(columns, rows, csv_file)
+
+    log(f"Exported {count} rows to {output}")
+
+
+def cmd_reports(args):
+    """Generate a PDF report for every matching assessment, as files or one ZIP archive"""
+    user_type = 'candidate' if args.candidates else 'employee'
+    records = db.iter_report_data(
+        user_type, resolve_window(args.window), args.department, args.position, args.since, args.until)
+
+    if args.zip:
+        count = 0
+
+        def counted(records):
+            nonlocal count
+            for record in records:
+                count += 1
+                yield record
+
+        if args.zip == '-':
+            output, zip_file = 'stdout', sys.stdout.buffer
+        else:
+            output, zip_file = args.zip, open(args.zip, 'wb')
+        try:
+            for chunk in reports.iter_reports_zip(counted(records), user_type):
+                zip_file.write(chunk)
+        finally:
+            if zip_file is not sys.stdout.buffer:
+                zip_file.close()
+        log(f"Wrote {count} reports to {output}")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    generated = skipped = 0
+    for assessment_id, user_data, scores, total_possible in records:
+        owner_id = user_data.get('employee_id') or user_data.get('candidate_code')
+        path = os.path.join(args.output_dir, f"{owner_id}_{assessment_id}.pdf")
+        if args.skip_existing and os.path.exists(path):
+            skipped += 1
+            continue
+        reports.generate_stored_report(user_data, scores, total_possible, user_type, output_path=path)
+        generated += 1
+
+    log(f"Generated {generated} reports in {args.output_dir}" + (f", skipped {skipped} existing" if skipped else ""))
+
+
+def cmd_cohort_reports(args):
+    """Generate a cohort PDF for every department assessed in a window"""
+    window_id = resolve_window(args.window)
+    departments = [args.department] if args.department else db.load_window_departments(window_id)
+    if not departments:
+        raise CommandError(f"No assessments in window '{args.window}'")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for department in departments:
+        safe_name = ''.join(char if char.isalnum() else '_' for char in department)
+        path = os.path.join(args.output_dir, f"cohort_{window_id}_{safe_name}.pdf")
+        reports.generate_cohort_pdf(window_id, department, output_path=path, language=args.language)
+
+    log(f"Generated {len(departments)} cohort reports in {args.output_dir}")
+
+
+def question_bank_for(template, bank_version):
+    """The bank version an assessment was scored with, the current one for rows without a recorded version"""
+    bank = get_template(template).current_bank()
+    if bank_version is None or bank_version == bank.version:
+        return bank
+    recorded = db.load_question_bank(bank.name, bank_version)
+    if recorded is None:
+        raise CommandError(f"Question bank {bank.name} version {bank_version} was never recorded")
+    return recorded
+
+
+def cmd_rescore(args):
+    """Recalculate stored scores and interpretations with the question bank each row was scored with"""
+    tables = ['candidate_assessments'] if args.candidates else ['assessments']
+    if args.all:
+        tables = ['assessments', 'candidate_assessments']
+
+    banks = {}
+    for table in tables:
+        rescored = 0
+        for batch in db.iter_stored_responses(table, args.batch_size):
+            updates = []
+            for row_id, language, responses, template, bank_version in batch:
+                if (template, bank_version) not in banks:
+                    banks[template, bank_version] = question_bank_for(template, bank_version)
+                bank = banks[template, bank_version]
+                if language not in bank.languages:
+                    language = 'en'
+                scores, total_possible = calculate_scores(responses, language, bank.questions)
+                interpretations, _ = get_interpretation(scores, total_possible)
+                updates.append((row_id, scores, total_possible, interpretations))
+            rescored += len(updates)
+            if not args.dry_run:
+                # One short transaction per batch keeps the write lock away from the UI
+                db.update_assessment_scores(table, updates)
+        action = "Would rescore" if args.dry_run else "Rescored"
+        log(f"{action} {rescored} rows in {table}")
+
+
+def cmd_migrate_responses(args):
+    """Convert stored JSON responses and interpretations to their compact forms"""
+    tables = ['candidate_assessments'] if args.candidates else ['assessments']
+    if args.all:
+        tables = ['assessments', 'candidate_assessments']
+
+    for table in tables:
+        converted = sum(db.iter_pack_stored_responses(table, args.batch_size))
+        log(f"Packed {converted} responses in {table}")
+        compacted = sum(db.iter_compact_stored_interpretations(table, args.batch_size))
+        log(f"Compacted {compacted} interpretations in {table}")
+    if args.vacuum:
+        db.vacuum_database()
+        log("Vacuumed the database")
+
+
+def cmd_backfill_scores(args):
+    """Copy the legacy score columns into the per-competency scores table"""
+    tables = ['candidate_assessments'] if args.candidates else ['assessments']
+    if args.all:
+        tables = ['assessments', 'candidate_assessments']
+
+    for table in tables:
+        copied = sum(db.iter_backfill_competency_scores(table, args.batch_size))
+        log(f"Backfilled competency scores of {copied} rows in {table}")
+
+
+def cmd_expire_candidates(args):
+    """Deactivate candidate logins whose two-day access has run out"""
+    updated = db.deactivate_expired_candidates()
+    log(f"Deactivated {updated} expired candidates")
+
+
+def cmd_precompute_exports(args):
+    """Build the standard Excel exports the admin pages serve, where the data changed since the last build"""
+    built = precomputed.precompute_exports()
+    log(f"Built {built} exports in {precomputed.export_dir()}" + ("" if built else ", all were current"))
+
+
+def cmd_import_users(args):
+    """Create employee logins from a CSV file"""
+    source = sys.stdin if args.file == '-' else open(args.file, newline='', encoding='utf-8-sig')
+    try:
+        reader = csv.DictReader(source)
+        missing = [column for column in USER_IMPORT_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise CommandError(f"Missing columns in {args.file}: {', '.join(missing)}")
+
+        users, invalid = [], 0
+        for line_number, row in enumerate(reader, start=2):
+            employee_id = (row['employee_id'] or '').strip()
+            employee_name = (row['employee_name'] or '').strip()
+            department = (row['department'] or '').strip()
+            if not (employee_id and employee_name and department):
+                log(f"Line {line_number}: employee_id, employee_name and department are required")
+                invalid += 1
+                continue
+            is_valid, message = validate_password(row['password'] or '')
+            if not is_valid:
+                log(f"Line {line_number} ({employee_id}): {message}")
+                invalid += 1
+                continue
+            users.append((employee_id, employee_name, row['password'], department))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    if args.dry_run:
+        log(f"{len(users)} valid users, {invalid} invalid rows")
+    else:
+        created = db.create_users(users) if users else []
+        log(f"Created {len(created)} users, {len(users) - len(created)} already existed, {invalid} invalid rows")
+    if invalid:
+        return 1
+
+
+def cmd_create_window(args):
+    """Create an assessment window"""
+    if args.end < args.start:
+        raise CommandError("End date must be on or after the start date")
+    if not db.create_assessment_window(args.name, args.start, args.end, args.start_time, args.end_time,
+                                       args.created_by):
+        raise CommandError(f"Could not create window '{args.name}'")
+    log(f"Created assessment window '{args.name}' ({args.start} to {args.end})")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='gateway', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_date_range(subparser):
+        subparser.add_argument('--since', type=date.fromisoformat, help='first submit date (YYYY-MM-DD)')
+        subparser.add_argument('--until', type=date.fromisoformat, help='last submit date (YYYY-MM-DD)')
+
+    export = subparsers.add_parser('export', help=cmd_export.__doc__)
+    export.add_argument('kind', choices=['records', 'candidates'])
+    export.add_argument('--window', help='assessment window id or name (records only)')
+    export.add_argument('--department', help='department (records only)')
+    export.add_argument('--position', help='position applied for (candidates only)')
+    add_date_range(export)
+    export.add_argument('--format', choices=['csv', 'xlsx'], help='default: from the output file name, else csv')
+    export.add_argument('-o', '--output', help="output file, '-' or omitted writes CSV to stdout")
+    export.set_defaults(handler=cmd_export)
+
+    pdf_reports = subparsers.add_parser('reports', help=cmd_reports.__doc__)
+    pdf_reports.add_argument('--candidates', action='store_true', help='candidate assessments instead of employees')
+    pdf_reports.add_argument('--window', help='assessment window id or name')
+    pdf_reports.add_argument('--department', help='department')
+    pdf_reports.add_argument('--position', help='position applied for (with --candidates)')
+    add_date_range(pdf_reports)
+    pdf_reports_output = pdf_reports.add_mutually_exclusive_group(required=True)
+    pdf_reports_output.add_argument('--output-dir', help='directory for the PDF files')
+    pdf_reports_output.add_argument('--zip', help="ZIP archive of the reports ('-' for stdout), "
+                                                  "rendered through the report cache")
+    pdf_reports.add_argument('--skip-existing', action='store_true', help='keep reports that were already generated')
+    pdf_reports.set_defaults(handler=cmd_reports)
+
+    cohort_reports = subparsers.add_parser('cohort-reports', help=cmd_cohort_reports.__doc__)
+    cohort_reports.add_argument('--window', required=True, help='assessment window id or name')
+    cohort_reports.add_argument('--department', help='one department, default: every department in the window')
+    cohort_reports.add_argument('--language', choices=sorted(reports.LABELS), default='en', help='default: en')
+    cohort_reports.add_argument('--output-dir', required=True, help='directory for the PDF files')
+    cohort_reports.set_defaults(handler=cmd_cohort_reports)
+
+    rescore = subparsers.add_parser('rescore', help=cmd_rescore.__doc__)
+    rescore_scope = rescore.add_mutually_exclusive_group()
+    rescore_scope.add_argument('--candidates', action='store_true', help='candidate assessments instead of employees')
+    rescore_scope.add_argument('--all', action='store_true', help='employee and candidate assessments')
+    rescore.add_argument('--batch-size', type=int, default=db.FETCH_BATCH_SIZE, help='rows per transaction')
+    rescore.add_argument('--dry-run', action='store_true', help='calculate without writing')
+    rescore.set_defaults(handler=cmd_rescore)
+
+    migrate = subparsers.add_parser('migrate-responses', help=cmd_migrate_responses.__doc__)
+    migrate_scope = migrate.add_mutually_exclusive_group()
+    migrate_scope.add_argument('--candidates', action='store_true', help='candidate assessments instead of employees')
+    migrate_scope.add_argument('--all', action='store_true', help='employee and candidate assessments')
+    migrate.add_argument('--batch-size', type=int, default=db.FETCH_BATCH_SIZE, help='rows per transaction')
+    migrate.add_argument('--vacuum', action='store_true', help='shrink the database file afterwards')
+    migrate.set_defaults(handler=cmd_migrate_responses)
+
+    backfill = subparsers.add_parser('backfill-scores', help=cmd_backfill_scores.__doc__)
+    backfill_scope = backfill.add_mutually_exclusive_group()
+    backfill_scope.add_argument('--candidates', action='store_true', help='candidate assessments instead of employees')
+    backfill_scope.add_argument('--all', action='store_true', help='employee and candidate assessments')
+    backfill.add_argument('--batch-size', type=int, default=db.FETCH_BATCH_SIZE, help='rows per transaction')
+    backfill.set_defaults(handler=cmd_backfill_scores)
+
+    expire = subparsers.add_parser('expire-candidates', help=cmd_expire_candidates.__doc__)
+    expire.set_defaults(handler=cmd_expire_candidates)
+
+    precompute = subparsers.add_parser('precompute-exports', help=cmd_precompute_exports.__doc__)
+    precompute.set_defaults(handler=cmd_precompute_exports)
+
+    import_users = subparsers.add_parser('import-users', help=cmd_import_users.__doc__)
+    import_users.add_argument('file', help=f"CSV with columns {', '.join(USER_IMPORT_COLUMNS)} ('-' for stdin)")
+    import_users.add_argument('--dry-run', action='store_true', help='validate without writing')
+    import_users.set_defaults(handler=cmd_import_users)
+
+    window = subparsers.add_parser('create-window', help=cmd_create_window.__doc__)
+    window.add_argument('name')
+    window.add_argument('--start', type=date.fromisoformat, required=True, help='start date (YYYY-MM-DD)')
+    window.add_argument('--end', type=date.fromisoformat, required=True, help='end date (YYYY-MM-DD)')
+    window.add_argument('--start-time', type=time.fromisoformat, default=time(0, 0), help='default 00:00')
+    window.add_argument('--end-time', type=time.fromisoformat, default=time(23, 59, 59), help='default 23:59:59')
+    window.add_argument('--created-by', default='cli', help='recorded as the window creator')
+    window.set_defaults(handler=cmd_create_window)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        db.init_database()
+        return args.handler(args) or 0
+    except BrokenPipeError:
+        # Output piped into head or similar
+        return 0
+    except (CommandError, ConfigError, sqlite3.Error, OSError) as e:
+        log(f"gateway {args.command}: {e}")
+        return 1
@@ -0,0 +1,92 @@
+"""Runtime configuration resolved lazily from the environment or secrets.toml.
+
+Nothing here imports Streamlit: the mail settings are read from the
+environment first and otherwise from the same ``[email]`` section of
+``.streamlit/secrets.toml`` that ``st.secrets`` uses, so batch jobs and
+workers see the same configuration as the UI. When the UI has already
+loaded Streamlit, ``st.secrets`` itself is used.
+"""
+import functools
+import os
+import sys
+
+# Environment variables that override the [email] section of secrets.toml
+EMAIL_ENV_VARS = {
+    'smtp_server': 'GATEWAY_SMTP_SERVER',
+    'smtp_port': 'GATEWAY_SMTP_PORT',
+    'from_email': 'GATEWAY_FROM_EMAIL',
+    'password': 'GATEWAY_SMTP_PASSWORD',
+    'to_email': 'GATEWAY_TO_EMAIL'
+}
+
+
+class ConfigError(Exception):
+    """Raised when a required setting is missing"""
+
+
+def get_db_path():
+    """Path of the SQLite database"""
+    return os.environ.get('GATEWAY_DB_PATH', 'assessment_data.db')
+
+
+def env_flag(name, default=False):
+    """True when an environment variable is set to 1/true/yes/on"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def secrets_file_paths():
+    """secrets.toml locations in the order Streamlit reads them, later files win"""
+    return [
+        os.path.join(os.path.expanduser('~'), '.streamlit', 'secrets.toml'),
+        os.path.join(os.getcwd(), '.streamlit', 'secrets.toml')
+    ]
+
+
+def load_secrets():
+    """Merge every secrets.toml that exists into one dict"""
+    streamlit = sys.modules.get('streamlit')
+    if streamlit is not None:
+        try:
+            return dict(streamlit.secrets)
+        except FileNotFoundError:
+            pass
+
+    try:
+        import tomllib
+        def parse(path):
+            with open(path, 'rb') as secrets_file:
+                return tomllib.load(secrets_file)
+    except ImportError:
+        # Python < 3.11, Streamlit already depends on the toml package
+        import toml
+        def parse(path):
+            with open(path, encoding='utf-8') as secrets_file:
+                return toml.load(secrets_file)
+
+    secrets = {}
+    for path in secrets_file_paths():
+        if os.path.exists(path):
+            secrets.update(parse(path))
+    return secrets
+
+
+@functools.lru_cache(maxsize=None)
+def _load_email_config():
+    section = load_secrets().get('email', {})
+    config = {}
+    for key, env_var in EMAIL_ENV_VARS.items():
+        value = os.environ.get(env_var, section.get(key))
+        if value is None:
+            raise ConfigError(f"Missing email setting '{key}' (set {env_var} or [email].{key} in secrets.toml)")
+        config[key] = value
+    config['smtp_port'] = int(config['smtp_port'])
+    return config
+
+
+def get_email_config():
+    """SMTP settings, resolved on first use and cached for the process"""
+    # Hand out a copy so callers cannot change the settings of other sessions
+    return dict(_load_email_config())
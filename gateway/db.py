@@ -0,0 +1,1605 @@
+"""SQLite data access for the assessment gateway
+
+Every helper opens its own short-lived connection through get_connection(),
+so the functions can be called from the Streamlit UI, the CLI or worker
+processes alike. DataFrame loaders import pandas on first use.
+"""
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from gateway.auth import hash_password
+from gateway.encoding import decode_answer_matrix, layout, pack_responses, unpack_responses
+from gateway.config import get_db_path
+from gateway.locks import busy_timeout_seconds, retry_on_busy
+from gateway.metrics import timed
+from gateway.questions import parse_bank
+from gateway.scoring import compact_interpretation
+from gateway.sqlprofile import connect
+from gateway.templates import DEFAULT_TEMPLATE, all_templates, get_template
+
+# Score column of each competency in the assessments tables
+SCORE_COLUMNS = {
+    "Accountability": "accountability_score",
+    "Team Collaboration": "teamwork_score",
+    "Result Orientation": "result_orientation_score",
+    "Communication Skills": "communication_score",
+    "Adaptability": "adaptability_score",
+    "Integrity": "integrity_score",
+    "Conflict Resolution": "conflict_resolution_score"
+}
+
+MAX_TOTAL_SCORE = 252  # 7 competencies × 36 marks each
+
+# Assessments table of each owner type, as used in competency_scores and assessment_drafts
+ASSESSMENT_TABLES = {
+    'employee': 'assessments',
+    'candidate': 'candidate_assessments'
+}
+
+# Columns of the employee records and candidate results exports, as shown in the admin pages
+EMPLOYEE_RECORD_COLUMNS = ['employee_id', 'employee_name', 'department', 'window_name',
+                           'submit_date', 'submit_time', 'total_score'] + list(SCORE_COLUMNS.values()) + ['percentage']
+CANDIDATE_RESULT_COLUMNS = ['candidate_code', 'full_name', 'position_applied',
+                            'submit_date', 'submit_time', 'total_score', 'percentage']
+
+# Columns whose changes bump each data version, by table. The exports of an owner type
+# (gateway.precomputed) are rebuilt when its version moves.
+DATA_VERSION_SOURCES = {
+    'employee': {
+        'assessments': ['employee_id', 'employee_name', 'department', 'window_id', 'assessment_date',
+                        'submit_date', 'submit_time', 'total_score'] + list(SCORE_COLUMNS.values()),
+        'assessment_windows': ['window_name'],
+    },
+    'candidate': {
+        'candidate_assessments': ['candidate_code', 'full_name', 'position_applied', 'assessment_date',
+                                  'submit_date', 'submit_time', 'total_score'] + list(SCORE_COLUMNS.values()),
+    },
+}
+
+# Scopes with data versions of their own, as a query of the scopes a changed row of the table
+# falls in ({row} is NEW or OLD). Scoped versions are named '<owner type>:<scope>', e.g.
+# 'employee:window:3', so an export of one window or department only follows its own writes.
+DATA_VERSION_SCOPES = {
+    'assessments': "SELECT 'window:' || {row}.window_id AS scope UNION SELECT 'department:' || {row}.department",
+    # Department exports show window names too
+    'assessment_windows': ("SELECT 'window:' || {row}.id AS scope UNION "
+                           "SELECT 'department:' || department FROM assessments WHERE window_id = {row}.id"),
+}
+
+# Rows taken with the default template, which alone has a packed response layout (gateway.encoding).
+# Rows from before templates have no template_id. Takes the default template's name as parameter.
+_DEFAULT_TEMPLATE_ROWS = "(template_id IS NULL OR template_id = (SELECT id FROM assessment_templates WHERE name = ?))"
+
+# Rows fetched per round trip when streaming large result sets
+FETCH_BATCH_SIZE = 500
+
+# (name, version) of the question banks this process has already recorded
+_recorded_banks = set()
+
+
+def get_connection():
+    """Open a connection to the assessment database"""
+    return connect(get_db_path(), timeout=busy_timeout_seconds())
+
+
+@timed('db')
+def init_database():
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # Existing assessments table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assessments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id TEXT NOT NULL,
+            employee_name TEXT NOT NULL,
+            department TEXT,
+            assessment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            submit_date DATE,
+            submit_time TIME,
+            language TEXT,
+            window_id INTEGER,
+            accountability_score INTEGER,
+            teamwork_score INTEGER,
+            result_orientation_score INTEGER,
+            communication_score INTEGER,
+            adaptability_score INTEGER,
+            integrity_score INTEGER,
+            conflict_resolution_score INTEGER,
+            total_score INTEGER,
+            responses TEXT,
+            interpretation TEXT,
+            response_data BLOB,
+            bank_version TEXT,
+            FOREIGN KEY (window_id) REFERENCES assessment_windows (id)
+        )
+    ''')
+    
+    # Check if columns exist, if not add them
+    cursor.execute("PRAGMA table_info(assessments)")
+    columns = [column[1] for column in cursor.fetchall()]
+    
+    if 'window_id' not in columns:
+        cursor.execute('ALTER TABLE assessments ADD COLUMN window_id INTEGER')
+    if 'submit_date' not in columns:
+        cursor.execute('ALTER TABLE assessments ADD COLUMN submit_date DATE')
+    if 'submit_time' not in columns:
+        cursor.execute('ALTER TABLE assessments ADD COLUMN submit_time TIME')
+    
+    # Existing users table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id TEXT UNIQUE NOT NULL,
+            employee_name TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            department TEXT NOT NULL,
+            user_type TEXT DEFAULT 'employee',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Existing assessment windows table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assessment_windows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            window_name TEXT NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            start_time TIME NOT NULL,
+            end_time TIME NOT NULL,
+            is_active BOOLEAN DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            created_by TEXT NOT NULL
+        )
+    ''')
+    
+    # NEW: Candidates table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS candidates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_code TEXT UNIQUE NOT NULL,
+            full_name TEXT NOT NULL,
+            position_applied TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME NOT NULL,
+            is_active BOOLEAN DEFAULT 1
+        )
+    ''')
+    
+    # NEW: Candidate assessments table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_assessments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_code TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            position_applied TEXT,
+            assessment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            submit_date DATE,
+            submit_time TIME,
+            language TEXT,
+            accountability_score INTEGER,
+            teamwork_score INTEGER,
+            result_orientation_score INTEGER,
+            communication_score INTEGER,
+            adaptability_score INTEGER,
+            integrity_score INTEGER,
+            conflict_resolution_score INTEGER,
+            total_score INTEGER,
+            responses TEXT,
+            interpretation TEXT,
+            response_data BLOB,
+            bank_version TEXT,
+            FOREIGN KEY (candidate_code) REFERENCES candidates (candidate_code)
+        )
+    ''')
+    
+    # Packed responses (gateway.encoding), the template taken and its question bank version,
+    # older databases have none of them
+    for table in ('assessments', 'candidate_assessments'):
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [column[1] for column in cursor.fetchall()]
+        if 'response_data' not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN response_data BLOB')
+        if 'template_id' not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN template_id INTEGER REFERENCES assessment_templates (id)')
+        if 'bank_version' not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN bank_version TEXT')
+    
+    # Department cohort reports read one department of one window at a time
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_assessments_window_department ON assessments (window_id, department)')
+    
+    # Data versions, bumped by triggers so writes from the CLI and other processes count too
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    triggers = dict(cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+    for name, tables in DATA_VERSION_SOURCES.items():
+        cursor.execute('INSERT OR IGNORE INTO data_versions (name) VALUES (?)', (name,))
+        for table, columns in tables.items():
+            events = {'update': (f"UPDATE OF {', '.join(columns)}", ('NEW', 'OLD')), 'delete': ('DELETE', ('OLD',))}
+            if table in ASSESSMENT_TABLES.values():
+                events['insert'] = ('INSERT', ('NEW',))
+            for event, (clause, rows) in events.items():
+                bump = f"UPDATE data_versions SET version = version + 1 WHERE name = '{name}'"
+                if table in DATA_VERSION_SCOPES:
+                    scopes = ' UNION '.join(DATA_VERSION_SCOPES[table].format(row=row) for row in rows)
+                    scoped = f"SELECT '{name}:' || scope FROM ({scopes})"
+                    bump = (f"INSERT OR IGNORE INTO data_versions (name) {scoped} WHERE scope IS NOT NULL; "
+                            f"{bump} OR name IN ({scoped})")
+                trigger = f"data_version_{table}_{event}"
+                sql = f"CREATE TRIGGER {trigger} AFTER {clause} ON {table} BEGIN {bump}; END"
+                # Replaced only when its definition changed, so databases made before a scope was added get it
+                if triggers.get(trigger) != sql:
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+                    cursor.execute(sql)
+    
+    # Every question bank version assessments were scored with (gateway.questions)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS question_banks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            version TEXT NOT NULL,
+            content TEXT NOT NULL,
+            recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (name, version)
+        )
+    ''')
+    
+    # Assessment templates (gateway.templates) and the competencies each one scores
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS competencies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assessment_templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            title TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS template_competencies (
+            template_id INTEGER NOT NULL REFERENCES assessment_templates (id),
+            competency_id INTEGER NOT NULL REFERENCES competencies (id),
+            position INTEGER NOT NULL,
+            max_score REAL NOT NULL,
+            PRIMARY KEY (template_id, competency_id)
+        ) WITHOUT ROWID
+    ''')
+    
+    # One row per scored competency of an assessment. The primary key covers
+    # reading one assessment back, the index covers per-competency aggregates.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS competency_scores (
+            owner_type TEXT NOT NULL,
+            assessment_id INTEGER NOT NULL,
+            competency_id INTEGER NOT NULL REFERENCES competencies (id),
+            score REAL NOT NULL,
+            max_score REAL NOT NULL,
+            PRIMARY KEY (owner_type, assessment_id, competency_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_competency_scores_competency
+        ON competency_scores (owner_type, competency_id, score, max_score)
+    ''')
+    sync_templates(cursor)
+    
+    # NEW: Candidate admin table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_admins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_id TEXT UNIQUE NOT NULL,
+            admin_name TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Drafts of in-progress assessments, one row per (user, window)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS assessment_drafts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner_type TEXT NOT NULL,
+            owner_id TEXT NOT NULL,
+            window_id INTEGER NOT NULL DEFAULT 0,
+            language TEXT,
+            responses TEXT NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (owner_type, owner_id, window_id)
+        )
+    ''')
+
+    # Outcome and stage timings of every submit click
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS submission_log (
+            id TEXT PRIMARY KEY,
+            user_type TEXT NOT NULL,
+            submitted_at TIMESTAMP NOT NULL,
+            day DATE NOT NULL,
+            outcome TEXT NOT NULL,
+            total_ms REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS submission_stage_timings (
+            submission_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            duration_ms REAL NOT NULL,
+            ok INTEGER NOT NULL,
+            FOREIGN KEY (submission_id) REFERENCES submission_log (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_submission_log_day ON submission_log (day)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_submission_stage_timings_submission
+        ON submission_stage_timings (submission_id)
+    ''')
+
+    # Insert default admins
+    admin_password = hash_password("admin123")
+    cursor.execute('''
+        INSERT OR IGNORE INTO users (employee_id, employee_name, password_hash, department, user_type)
+        VALUES (?, ?, ?, ?, ?)
+    ''', ("admin", "Administrator", admin_password, "Administration", "admin"))
+    
+    candidate_admin_password = hash_password("candidateadmin123")
+    cursor.execute('''
+        INSERT OR IGNORE INTO candidate_admins (admin_id, admin_name, password_hash)
+        VALUES (?, ?, ?)
+    ''', ("candidateadmin", "Candidate Administrator", candidate_admin_password))
+    
+    conn.commit()
+    conn.close()
+
+
+def sync_templates(cursor):
+    """Copy the registered templates, their competencies and current banks into the database"""
+    for template in all_templates():
+        record_question_bank(cursor, template.current_bank())
+        cursor.execute("INSERT OR IGNORE INTO assessment_templates (name, title) VALUES (?, ?)",
+                       (template.name, template.title))
+        cursor.execute("UPDATE assessment_templates SET title = ? WHERE name = ?", (template.title, template.name))
+        _insert_competencies(cursor, template.competencies)
+        cursor.executemany('''
+            INSERT OR REPLACE INTO template_competencies (template_id, competency_id, position, max_score)
+            SELECT t.id, c.id, ?, ? FROM assessment_templates t, competencies c
+            WHERE t.name = ? AND c.name = ?
+        ''', [(position, max_score, template.name, competency)
+              for position, (competency, max_score) in enumerate(template.max_scores().items())])
+
+
+def record_question_bank(cursor, bank):
+    """Keep a copy of a bank version, once per process"""
+    if (bank.name, bank.version) in _recorded_banks:
+        return
+    cursor.execute("INSERT OR IGNORE INTO question_banks (name, version, content) VALUES (?, ?, ?)",
+                   (bank.name, bank.version, bank.content))
+    _recorded_banks.add((bank.name, bank.version))
+
+
+@timed('db')
+def load_question_bank(name, version):
+    """A recorded bank version, None if it was never recorded"""
+    conn = get_connection()
+    row = conn.execute("SELECT content FROM question_banks WHERE name = ? AND version = ?",
+                       (name, version)).fetchone()
+    conn.close()
+    return parse_bank(row[0]) if row else None
+
+
+def _insert_competencies(cursor, competencies):
+    cursor.executemany("INSERT OR IGNORE INTO competencies (name) VALUES (?)", [(name,) for name in competencies])
+
+
+def _save_competency_scores(cursor, owner_type, assessment_id, scores, total_possible):
+    _insert_competencies(cursor, scores)
+    cursor.executemany('''
+        INSERT OR REPLACE INTO competency_scores (owner_type, assessment_id, competency_id, score, max_score)
+        SELECT ?, ?, id, ?, ? FROM competencies WHERE name = ?
+    ''', [(owner_type, assessment_id, score, total_possible[competency], competency)
+          for competency, score in scores.items()])
+
+
+def _legacy_scores(template, scores):
+    """Values of the legacy score columns, only filled for the default template"""
+    if template.name != DEFAULT_TEMPLATE:
+        return [None] * len(SCORE_COLUMNS)
+    return [scores.get(competency) for competency in SCORE_COLUMNS]
+
+
+def _stored_responses(template, bank, language, responses):
+    """(response_data, responses) column values, packed when the bank's questions are the template's layout
+
+    A published layout never changes, so a bank edited since (a question
+    added, removed or renamed) would lose answers to it. Its responses are
+    kept as JSON instead, which packing later leaves alone too.
+    """
+    if template.packed_layout is not None and bank.question_keys(language) == layout(template.packed_layout):
+        return pack_responses(responses, template.packed_layout), None
+    return None, json.dumps(responses)
+
+
+@timed('db')
+def verify_user(employee_id, password):
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    password_hash = hash_password(password)
+    cursor.execute('''
+        SELECT employee_id, employee_name, department, user_type 
+        FROM users 
+        WHERE employee_id = ? AND password_hash = ?
+    ''', (employee_id, password_hash))
+    
+    result = cursor.fetchone()
+    conn.close()
+    
+    if result:
+        return {
+            'employee_id': result[0],
+            'employee_name': result[1],
+            'department': result[2],
+            'user_type': result[3]
+        }
+    return None
+
+
+@timed('db')
+@retry_on_busy('INSERT users')
+def create_user(employee_id, employee_name, password, department):
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    password_hash = hash_password(password)
+    try:
+        cursor.execute('''
+            INSERT INTO users (employee_id, employee_name, password_hash, department)
+            VALUES (?, ?, ?, ?)
+        ''', (employee_id, employee_name, password_hash, department))
+        conn.commit()
+        conn.close()
+        return True
+    except sqlite3.IntegrityError:
+        conn.close()
+        return False
+
+
+@timed('db')
+def generate_candidate_code():
+    """Generate next candidate code"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT COUNT(*) FROM candidates')
+    count = cursor.fetchone()[0]
+    conn.close()
+    
+    return f"TELCAN{count + 1:05d}"
+
+
+@timed('db')
+@retry_on_busy('INSERT candidates')
+def create_candidate(full_name, position_applied, password):
+    """Create new candidate with 2-day expiry"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    candidate_code = generate_candidate_code()
+    password_hash = hash_password(password)
+    expires_at = datetime.now() + timedelta(days=2)
+    
+    try:
+        cursor.execute('''
+            INSERT INTO candidates (candidate_code, full_name, position_applied, password_hash, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (candidate_code, full_name, position_applied, password_hash, expires_at))
+        conn.commit()
+        conn.close()
+        return candidate_code
+    except sqlite3.IntegrityError:
+        conn.close()
+        return None
+
+
+@timed('db')
+def verify_candidate(candidate_code, password):
+    """Verify candidate login and check expiry"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    password_hash = hash_password(password)
+    cursor.execute('''
+        SELECT candidate_code, full_name, position_applied, expires_at, is_active
+        FROM candidates 
+        WHERE candidate_code = ? AND password_hash = ?
+    ''', (candidate_code, password_hash))
+    
+    result = cursor.fetchone()
+    conn.close()
+    
+    if result:
+        expires_at = datetime.fromisoformat(result[3])
+        if datetime.now() > expires_at or not result[4]:
+            return None  # Expired or inactive
+        
+        return {
+            'candidate_code': result[0],
+            'full_name': result[1],
+            'position_applied': result[2],
+            'expires_at': result[3]
+        }
+    return None
+
+
+@timed('db')
+def verify_candidate_admin(admin_id, password):
+    """Verify candidate admin login"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    password_hash = hash_password(password)
+    cursor.execute('''
+        SELECT admin_id, admin_name
+        FROM candidate_admins 
+        WHERE admin_id = ? AND password_hash = ?
+    ''', (admin_id, password_hash))
+    
+    result = cursor.fetchone()
+    conn.close()
+    
+    if result:
+        return {
+            'admin_id': result[0],
+            'admin_name': result[1],
+            'user_type': 'candidate_admin'
+        }
+    return None
+
+
+@timed('db')
+def has_candidate_taken_assessment(candidate_code):
+    """Check if candidate has already taken assessment"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT COUNT(*) FROM candidate_assessments 
+        WHERE candidate_code = ?
+    ''', (candidate_code,))
+    
+    count = cursor.fetchone()[0]
+    conn.close()
+    
+    return count > 0
+
+
+@timed('db')
+def get_active_assessment_window():
+    """Get currently active assessment window"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # Use IST timezone
+    ist = timezone(timedelta(hours=5, minutes=30))
+    
+    current_datetime = datetime.now(ist)
+    current_date = current_datetime.date()
+    current_time = current_datetime.time()
+    
+    # Convert time to string for SQLite compatibility
+    current_time_str = current_time.strftime('%H:%M:%S')
+    
+    cursor.execute('''
+        SELECT * FROM assessment_windows 
+        WHERE is_active = 1 
+        AND start_date <= ? AND end_date >= ?
+        ORDER BY created_at DESC
+    ''', (current_date, current_date))
+    
+    results = cursor.fetchall()
+    conn.close()
+    
+    # Check time constraints in Python for more reliable comparison
+    for result in results:
+        start_time_str = result[4]  # start_time column
+        end_time_str = result[5]    # end_time column
+        
+        # Convert string times to time objects for comparison
+        try:
+            start_time = datetime.strptime(start_time_str, '%H:%M:%S').time()
+            end_time = datetime.strptime(end_time_str, '%H:%M:%S').time()
+            
+            # Check if current time is within the window
+            if start_time <= current_time <= end_time:
+                return {
+                    'id': result[0],
+                    'window_name': result[1],
+                    'start_date': result[2],
+                    'end_date': result[3],
+                    'start_time': result[4],
+                    'end_time': result[5],
+                    'is_active': result[6]
+                }
+        except ValueError:
+            # Skip if time format is invalid
+            continue
+    
+    return None
+
+
+@timed('db')
+def has_taken_assessment_in_window(employee_id, window_id):
+    """Check if employee has already taken assessment in this window"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT COUNT(*) FROM assessments 
+        WHERE employee_id = ? AND window_id = ?
+    ''', (employee_id, window_id))
+    
+    count = cursor.fetchone()[0]
+    conn.close()
+    
+    return count > 0
+
+
+@timed('db')
+def create_assessment_window(window_name, start_date, end_date, start_time, end_time, created_by):
+    """Create new assessment window"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Convert time objects to strings for SQLite compatibility
+        start_time_str = start_time.strftime('%H:%M:%S') if hasattr(start_time, 'strftime') else str(start_time)
+        end_time_str = end_time.strftime('%H:%M:%S') if hasattr(end_time, 'strftime') else str(end_time)
+        
+        cursor.execute('''
+            INSERT INTO assessment_windows (window_name, start_date, end_date, start_time, end_time, created_by)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (window_name, start_date, end_date, start_time_str, end_time_str, created_by))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        conn.close()
+        return False
+
+
+@timed('db')
+@retry_on_busy('UPDATE assessment_windows')
+def toggle_assessment_window(window_id, is_active):
+    """Toggle assessment window active status"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        UPDATE assessment_windows 
+        SET is_active = ? 
+        WHERE id = ?
+    ''', (is_active, window_id))
+
+    conn.commit()
+    conn.close()
+
+
+@timed('db')
+@retry_on_busy('UPSERT assessment_drafts')
+def save_assessment_draft(owner_type, owner_id, window_id, language, responses):
+    """Insert or update the saved draft of an in-progress assessment"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        INSERT INTO assessment_drafts (owner_type, owner_id, window_id, language, responses, updated_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (owner_type, owner_id, window_id) DO UPDATE SET
+            language = excluded.language,
+            responses = excluded.responses,
+            updated_at = excluded.updated_at
+    ''', (owner_type, owner_id, window_id, language, json.dumps(responses)))
+
+    conn.commit()
+    conn.close()
+
+
+@timed('db')
+def load_assessment_draft(owner_type, owner_id, window_id):
+    """Get the saved draft of an in-progress assessment, if any"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT language, responses FROM assessment_drafts
+        WHERE owner_type = ? AND owner_id = ? AND window_id = ?
+    ''', (owner_type, owner_id, window_id))
+
+    result = cursor.fetchone()
+    conn.close()
+
+    if result:
+        return {
+            'language': result[0],
+            'responses': json.loads(result[1])
+        }
+    return None
+
+
+@timed('db')
+def clear_assessment_draft(cursor, owner_type, owner_id, window_id):
+    """Delete a draft using the caller's cursor so it commits with the final submission"""
+    cursor.execute('''
+        DELETE FROM assessment_drafts
+        WHERE owner_type = ? AND owner_id = ? AND window_id = ?
+    ''', (owner_type, owner_id, window_id))
+
+
+@timed('db')
+def reset_user_password(employee_id, new_password):
+    """Reset employee password"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    password_hash = hash_password(new_password)
+    try:
+        cursor.execute('''
+            UPDATE users 
+            SET password_hash = ? 
+            WHERE employee_id = ?
+        ''', (password_hash, employee_id))
+        
+        if cursor.rowcount > 0:
+            conn.commit()
+            conn.close()
+            return True
+        else:
+            conn.close()
+            return False
+    except Exception:
+        conn.close()
+        return False
+
+
+@timed('db')
+def reset_candidate_password(candidate_code, new_password):
+    """Reset candidate password"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    password_hash = hash_password(new_password)
+    try:
+        cursor.execute('''
+            UPDATE candidates 
+            SET password_hash = ? 
+            WHERE candidate_code = ? AND is_active = 1
+        ''', (password_hash, candidate_code))
+        
+        if cursor.rowcount > 0:
+            conn.commit()
+            conn.close()
+            return True
+        else:
+            conn.close()
+            return False
+    except Exception:
+        conn.close()
+        return False
+
+
+@timed('db')
+def verify_user_exists(employee_id):
+    """Check if employee exists"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT employee_name FROM users WHERE employee_id = ?', (employee_id,))
+    result = cursor.fetchone()
+    conn.close()
+    
+    return result[0] if result else None
+
+
+@timed('db')
+def verify_candidate_exists(candidate_code):
+    """Check if candidate exists and is active"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+        SELECT full_name FROM candidates 
+        WHERE candidate_code = ? AND is_active = 1 AND expires_at > datetime('now')
+    ''', (candidate_code,))
+    result = cursor.fetchone()
+    conn.close()
+    
+    return result[0] if result else None
+
+
+@timed('db')
+@retry_on_busy('UPDATE assessment_windows')
+def deactivate_past_windows(today=None):
+    """Deactivate assessment windows whose end date has passed"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE assessment_windows 
+        SET is_active = 0 
+        WHERE end_date < ? AND is_active = 1
+    ''', (today or datetime.now().date(),))
+    conn.commit()
+    conn.close()
+
+
+@timed('db')
+def load_assessment_windows():
+    """All assessment windows with the number of assessments taken in each"""
+    import pandas as pd
+    
+    conn = get_connection()
+    windows_df = pd.read_sql_query('''
+        SELECT aw.*, 
+               COALESCE(COUNT(a.id), 0) as assessment_count
+        FROM assessment_windows aw
+        LEFT JOIN assessments a ON aw.id = a.window_id
+        GROUP BY aw.id
+        ORDER BY aw.created_at DESC
+    ''', conn)
+    conn.close()
+    return windows_df
+
+
+@timed('db')
+def load_employee_assessments(employee_id):
+    """Assessments of one employee, newest first"""
+    import pandas as pd
+    
+    conn = get_connection()
+    df = pd.read_sql_query(f'''
+        SELECT a.*, aw.window_name, {_max_total_sql('employee')} AS max_total_score
+        FROM assessments a
+        LEFT JOIN assessment_windows aw ON a.window_id = aw.id
+        WHERE a.employee_id = ? 
+        ORDER BY a.submit_date DESC, a.submit_time DESC
+    ''', conn, params=(employee_id,))
+    conn.close()
+    return df
+
+
+@timed('db')
+def load_all_assessments():
+    """Every employee assessment with its window name, newest first"""
+    import pandas as pd
+    
+    conn = get_connection()
+    df = pd.read_sql_query(f'''
+        SELECT a.*, aw.window_name, {_max_total_sql('employee')} AS max_total_score
+        FROM assessments a
+        LEFT JOIN assessment_windows aw ON a.window_id = aw.id
+        ORDER BY COALESCE(a.submit_date, a.assessment_date) DESC, 
+                 COALESCE(a.submit_time, '00:00:00') DESC
+    ''', conn)
+    conn.close()
+    return df
+
+
+@timed('db')
+def load_candidate_assessments(candidate_code=None):
+    """Candidate assessments, optionally for a single candidate, newest first"""
+    import pandas as pd
+    
+    conn = get_connection()
+    where, params = _build_filters(**{'a.candidate_code': candidate_code})
+    df = pd.read_sql_query(f'''
+        SELECT a.*, {_max_total_sql('candidate')} AS max_total_score
+        FROM candidate_assessments a
+        {where}
+        ORDER BY a.submit_date DESC, a.submit_time DESC
+    ''', conn, params=params)
+    conn.close()
+    return df
+
+
+@timed('db')
+def load_candidates():
+    """Registered candidates with their assessment status"""
+    import pandas as pd
+    
+    conn = get_connection()
+    candidates_df = pd.read_sql_query('''
+        SELECT c.*, 
+               CASE WHEN ca.candidate_code IS NOT NULL THEN 'Completed' ELSE 'Pending' END as assessment_status
+        FROM candidates c
+        LEFT JOIN candidate_assessments ca ON c.candidate_code = ca.candidate_code
+        ORDER BY c.created_at DESC
+    ''', conn)
+    conn.close()
+    return candidates_df
+
+
+@timed('db')
+@retry_on_busy('UPDATE candidates')
+def deactivate_expired_candidates():
+    """Deactivate candidates whose access has expired, returns the number updated"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        UPDATE candidates 
+        SET is_active = 0 
+        WHERE expires_at < datetime('now')
+    ''')
+    updated = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return updated
+
+
+@timed('db')
+@retry_on_busy('INSERT assessments')
+def save_employee_assessment(employee_id, employee_name, department, language, window_id,
+                             submit_date, submit_time, scores, responses, interpretations,
+                             total_possible=None, template=DEFAULT_TEMPLATE, bank=None):
+    """Store a submitted employee assessment and clear its draft in one transaction
+
+    bank is the QuestionBank the answers were scored with, the template's
+    current one by default. The legacy score columns only hold the default
+    template's competencies, competency_scores holds every template's.
+    """
+    template = get_template(template)
+    bank = bank or template.current_bank()
+    total_possible = total_possible or bank.max_scores(language)
+    response_data, responses_json = _stored_responses(template, bank, language, responses)
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+    INSERT INTO assessments (
+        employee_id, employee_name, department, language, window_id,
+        submit_date, submit_time,
+        accountability_score, teamwork_score, result_orientation_score,
+        communication_score, adaptability_score, integrity_score,
+        conflict_resolution_score, total_score, response_data, responses, interpretation, bank_version,
+        template_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+              (SELECT id FROM assessment_templates WHERE name = ?))
+    ''', (
+        employee_id, employee_name, department, language, window_id,
+        submit_date, submit_time,
+        *_legacy_scores(template, scores), sum(scores.values()),
+        response_data, responses_json, compact_interpretation(interpretations), bank.version, template.name
+    ))
+    assessment_id = cursor.lastrowid
+    record_question_bank(cursor, bank)
+    _save_competency_scores(cursor, 'employee', assessment_id, scores, total_possible)
+    clear_assessment_draft(cursor, 'employee', employee_id, window_id)
+    
+    conn.commit()
+    conn.close()
+    return assessment_id
+
+
+@timed('db')
+@retry_on_busy('INSERT candidate_assessments')
+def save_candidate_assessment(candidate_code, full_name, position_applied, language,
+                              submit_date, submit_time, scores, responses, interpretations,
+                              total_possible=None, template=DEFAULT_TEMPLATE, bank=None):
+    """Store a submitted candidate assessment and clear its draft in one transaction"""
+    template = get_template(template)
+    bank = bank or template.current_bank()
+    total_possible = total_possible or bank.max_scores(language)
+    response_data, responses_json = _stored_responses(template, bank, language, responses)
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute('''
+    INSERT INTO candidate_assessments (
+        candidate_code, full_name, position_applied, language,
+        submit_date, submit_time,
+        accountability_score, teamwork_score, result_orientation_score,
+        communication_score, adaptability_score, integrity_score,
+        conflict_resolution_score, total_score, response_data, responses, interpretation, bank_version,
+        template_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+              (SELECT id FROM assessment_templates WHERE name = ?))
+    ''', (
+        candidate_code, full_name, position_applied, language,
+        submit_date, submit_time,
+        *_legacy_scores(template, scores), sum(scores.values()),
+        response_data, responses_json, compact_interpretation(interpretations), bank.version, template.name
+    ))
+    assessment_id = cursor.lastrowid
+    record_question_bank(cursor, bank)
+    _save_competency_scores(cursor, 'candidate', assessment_id, scores, total_possible)
+    clear_assessment_draft(cursor, 'candidate', candidate_code, 0)
+    
+    conn.commit()
+    conn.close()
+    return assessment_id
+
+
+def iter_query(query, params=(), batch_size=FETCH_BATCH_SIZE):
+    """Yield the rows of a query in batches without loading the whole result"""
+    conn = get_connection()
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def load_data_versions():
+    """{name: version} of DATA_VERSION_SOURCES and their scopes, each moves whenever its exported data changes
+
+    A scope no row has fallen in yet has no entry, read it as version 0.
+    """
+    conn = get_connection()
+    rows = conn.execute('SELECT name, version FROM data_versions').fetchall()
+    conn.close()
+    return dict(rows)
+
+
+@timed('db')
+def load_export_scopes():
+    """Ids of the windows and names of the departments that have employee assessments"""
+    conn = get_connection()
+    window_ids = [row[0] for row in conn.execute(
+        'SELECT DISTINCT window_id FROM assessments WHERE window_id IS NOT NULL ORDER BY window_id')]
+    departments = [row[0] for row in conn.execute(
+        'SELECT DISTINCT department FROM assessments WHERE department IS NOT NULL ORDER BY department')]
+    conn.close()
+    return window_ids, departments
+
+
+@timed('db')
+def find_assessment_window(window):
+    """Id of the assessment window with the given id or name, or None"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id FROM assessment_windows
+        WHERE CAST(id AS TEXT) = ? OR window_name = ?
+        ORDER BY id DESC
+    ''', (str(window), str(window)))
+    result = cursor.fetchone()
+    conn.close()
+    return result[0] if result else None
+
+
+def _build_filters(start_date=None, end_date=None, date_column="submit_date", **equals):
+    """WHERE clause and parameters for a date range plus column = value filters"""
+    conditions, params = [], []
+    if start_date:
+        conditions.append(f"{date_column} >= ?")
+        params.append(str(start_date))
+    if end_date:
+        conditions.append(f"{date_column} <= ?")
+        params.append(str(end_date))
+    for column, value in equals.items():
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where, params
+
+
+def _max_total_sql(owner_type, alias='a'):
+    """SQL for the highest possible total of an assessment row, from the maximums stored with its scores
+
+    Rows not backfilled into competency_scores yet are default-template rows
+    and fall back to MAX_TOTAL_SCORE.
+    """
+    if owner_type not in ASSESSMENT_TABLES:
+        raise ValueError(f"Unknown owner type: {owner_type}")
+    return (f"COALESCE((SELECT SUM(ms.max_score) FROM competency_scores ms "
+            f"WHERE ms.owner_type = '{owner_type}' AND ms.assessment_id = {alias}.id), {MAX_TOTAL_SCORE})")
+
+
+def iter_employee_records(window_id=None, department=None, start_date=None, end_date=None):
+    """Stream employee assessment records in EMPLOYEE_RECORD_COLUMNS order, newest first"""
+    submit_date = "COALESCE(a.submit_date, DATE(a.assessment_date))"
+    where, params = _build_filters(start_date, end_date, date_column=submit_date,
+                                   **{"a.window_id": window_id, "a.department": department})
+    score_columns = ", ".join(f"a.{column}" for column in SCORE_COLUMNS.values())
+
+    return iter_query(f'''
+        SELECT a.employee_id, a.employee_name, a.department, aw.window_name,
+               {submit_date}, SUBSTR(a.submit_time, 1, 8), a.total_score, {score_columns},
+               ROUND(a.total_score * 100.0 / {_max_total_sql('employee')}, 1) as percentage
+        FROM assessments a
+        LEFT JOIN assessment_windows aw ON a.window_id = aw.id
+        {where}
+        ORDER BY COALESCE(a.submit_date, a.assessment_date) DESC,
+                 COALESCE(a.submit_time, '00:00:00') DESC
+    ''', params)
+
+
+def iter_candidate_results(position=None, start_date=None, end_date=None):
+    """Stream candidate assessment results in CANDIDATE_RESULT_COLUMNS order, newest first"""
+    where, params = _build_filters(start_date, end_date, position_applied=position)
+
+    return iter_query(f'''
+        SELECT a.candidate_code, a.full_name, a.position_applied, a.submit_date,
+               SUBSTR(a.submit_time, 1, 8), a.total_score,
+               ROUND(a.total_score * 100.0 / {_max_total_sql('candidate')}, 1) as percentage
+        FROM candidate_assessments a
+        {where}
+        ORDER BY submit_date DESC, submit_time DESC
+    ''', params)
+
+
+def iter_report_data(user_type="employee", window_id=None, department=None, position=None,
+                     start_date=None, end_date=None):
+    """Stream (assessment id, user_data, scores, total_possible) of stored assessments for PDF reports"""
+    if user_type == "employee":
+        submit_date = "COALESCE(submit_date, DATE(assessment_date))"
+        where, params = _build_filters(start_date, end_date, date_column=submit_date,
+                                       window_id=window_id, department=department)
+        identity = f"employee_id, employee_name, department, {submit_date}, language"
+        user_keys = ('employee_id', 'employee_name', 'department', 'submit_date', 'language')
+        table = "assessments"
+    else:
+        where, params = _build_filters(start_date, end_date, position_applied=position)
+        identity = "candidate_code, full_name, position_applied, submit_date, language"
+        user_keys = ('candidate_code', 'full_name', 'position_applied', 'submit_date', 'language')
+        table = "candidate_assessments"
+
+    rows = iter_query(f"SELECT id, {identity} FROM {table} {where} ORDER BY id", params)
+    for row, scores, total_possible in _with_stored_scores(user_type, rows):
+        yield row[0], dict(zip(user_keys, row[1:])), scores, total_possible
+
+
+@timed('db')
+def load_window_departments(window_id):
+    """Departments with assessments in a window, alphabetically"""
+    conn = get_connection()
+    rows = conn.execute("SELECT DISTINCT department FROM assessments WHERE window_id = ? ORDER BY department",
+                        (window_id,)).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+@timed('db')
+def load_cohort_stats(window_id, department, low_percentage):
+    """Window name, assessments, average score and average/highest/lowest percentage of one department
+    in one window, and how many assessments are below low_percentage"""
+    percentage = f"a.total_score * 100.0 / {_max_total_sql('employee')}"
+    conn = get_connection()
+    row = conn.execute(f'''
+        SELECT (SELECT window_name FROM assessment_windows WHERE id = ?),
+               COUNT(*), AVG(total_score), AVG(percentage), MAX(percentage), MIN(percentage),
+               COALESCE(SUM(percentage < ?), 0)
+        FROM (SELECT a.total_score, {percentage} AS percentage FROM assessments a
+              WHERE a.window_id = ? AND a.department = ?)
+    ''', (window_id, low_percentage, window_id, department)).fetchone()
+    conn.close()
+    keys = ('window_name', 'assessments', 'average_score', 'average_percentage', 'highest_percentage',
+            'lowest_percentage', 'low_performers')
+    return dict(zip(keys, row))
+
+
+def iter_cohort_records(window_id, department, below_percentage=None):
+    """Stream (employee_id, employee_name, submit_date, scores, total_score, percentage) of one
+    department in one window by name, or only those below a percentage, lowest first
+
+    scores is {competency: score} as stored in competency_scores.
+    """
+    params = [window_id, department]
+    if below_percentage is None:
+        condition, order = "", "employee_name, employee_id"
+    else:
+        condition, order = "WHERE percentage < ?", "percentage, employee_name"
+        params.append(below_percentage)
+    rows = iter_query(f'''
+        SELECT id, employee_id, employee_name, submit_date, total_score, ROUND(percentage, 1)
+        FROM (SELECT a.id, a.employee_id, a.employee_name, COALESCE(a.submit_date, DATE(a.assessment_date))
+                     AS submit_date, a.total_score, a.total_score * 100.0 / {_max_total_sql('employee')} AS percentage
+              FROM assessments a
+              WHERE a.window_id = ? AND a.department = ?)
+        {condition}
+        ORDER BY {order}
+    ''', params)
+    for row, scores, _ in _with_stored_scores('employee', rows):
+        employee_id, name, submit_date, total_score, percentage = row[1:]
+        yield employee_id, name, submit_date, scores, total_score, percentage
+
+
+def _owner_type(table):
+    for owner_type, assessments_table in ASSESSMENT_TABLES.items():
+        if table == assessments_table:
+            return owner_type
+    raise ValueError(f"Unknown assessments table: {table}")
+
+
+def _load_stored_scores(conn, owner_type, assessment_ids):
+    """{id: (scores, total_possible)} of assessments, competencies in template order
+
+    Assessments not backfilled into competency_scores yet are read from the
+    legacy score columns.
+    """
+    table = ASSESSMENT_TABLES[owner_type]
+    placeholders = ", ".join("?" * len(assessment_ids))
+    stored = {assessment_id: ({}, {}) for assessment_id in assessment_ids}
+    rows = conn.execute(f'''
+        SELECT s.assessment_id, c.name, s.score, s.max_score
+        FROM competency_scores s
+        JOIN competencies c ON c.id = s.competency_id
+        JOIN {table} a ON a.id = s.assessment_id
+        LEFT JOIN template_competencies tc
+            ON tc.template_id = COALESCE(a.template_id, (SELECT id FROM assessment_templates WHERE name = ?))
+            AND tc.competency_id = s.competency_id
+        WHERE s.owner_type = ? AND s.assessment_id IN ({placeholders})
+        ORDER BY s.assessment_id, tc.position, c.id
+    ''', (DEFAULT_TEMPLATE, owner_type, *assessment_ids))
+    for assessment_id, name, score, max_score in rows:
+        scores, total_possible = stored[assessment_id]
+        scores[name] = score
+        total_possible[name] = max_score
+
+    missing = [assessment_id for assessment_id, (scores, _) in stored.items() if not scores]
+    if missing:
+        maximums = get_template(DEFAULT_TEMPLATE).max_scores()
+        legacy = conn.execute(f"SELECT id, {', '.join(SCORE_COLUMNS.values())} FROM {table} "
+                              f"WHERE id IN ({', '.join('?' * len(missing))})", missing)
+        for assessment_id, *values in legacy:
+            scores, total_possible = stored[assessment_id]
+            for competency, score in zip(SCORE_COLUMNS, values):
+                if score is not None:
+                    scores[competency] = score
+                    total_possible[competency] = maximums[competency]
+    return stored
+
+
+def _with_stored_scores(owner_type, rows, batch_size=FETCH_BATCH_SIZE):
+    """Yield (row, scores, total_possible) for streamed rows whose first column is the assessment id,
+    the scores looked up a batch of rows at a time"""
+    from itertools import islice
+
+    rows = iter(rows)
+    conn = get_connection()
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            stored = _load_stored_scores(conn, owner_type, [row[0] for row in batch])
+            for row in batch:
+                yield (row, *stored[row[0]])
+    finally:
+        conn.close()
+
+
+@timed('db')
+def load_assessment_scores(owner_type, assessment_id):
+    """(scores, total_possible) of one assessment, competencies in template order
+
+    Assessments not backfilled into competency_scores yet are read from the
+    legacy score columns.
+    """
+    conn = get_connection()
+    scores, total_possible = _load_stored_scores(conn, owner_type, [assessment_id])[assessment_id]
+    conn.close()
+    return scores, total_possible
+
+
+@timed('db')
+def load_competency_summary(owner_type, department=None, window_id=None, position=None, bank_version=None):
+    """Assessments, average score and average percentage per competency in one GROUP BY"""
+    import pandas as pd
+
+    table = ASSESSMENT_TABLES[owner_type]
+    filters = {'a.department': department, 'a.window_id': window_id, 'a.position_applied': position,
+               'a.bank_version': bank_version}
+    if any(value is not None for value in filters.values()):
+        # CROSS JOIN keeps the filtered assessments as the outer loop, so a cohort reads only
+        # its own scores by primary key instead of every score of the owner type
+        source = f"{table} a CROSS JOIN competency_scores s ON s.assessment_id = a.id"
+    else:
+        source = "competency_scores s"
+    where, params = _build_filters(**{'s.owner_type': owner_type}, **filters)
+    conn = get_connection()
+    df = pd.read_sql_query(f'''
+        SELECT c.name AS competency,
+               COUNT(*) AS assessments,
+               AVG(s.score) AS average_score,
+               AVG(s.score * 100.0 / s.max_score) AS average_percentage
+        FROM {source}
+        JOIN competencies c ON c.id = s.competency_id
+        {where}
+        GROUP BY s.competency_id
+        ORDER BY c.id
+    ''', conn, params=params)
+    conn.close()
+    return df
+
+
+def decode_stored_responses(packed, responses_json):
+    """Responses dict of a row from its packed column, or the JSON one if not yet migrated"""
+    if packed is not None:
+        return unpack_responses(packed)
+    return json.loads(responses_json or '{}')
+
+
+def iter_stored_responses(table, batch_size=FETCH_BATCH_SIZE):
+    """Yield batches of (id, language, responses, template name, bank version) from an assessments table
+
+    Pages by id with a fresh connection per batch instead of holding one read
+    open, so the caller can write each batch back in between.
+    """
+    if table not in ('assessments', 'candidate_assessments'):
+        raise ValueError(f"Unknown assessments table: {table}")
+    last_id = 0
+    while True:
+        conn = get_connection()
+        rows = conn.execute(f'''
+            SELECT a.id, a.language, a.response_data, a.responses, t.name, a.bank_version FROM {table} a
+            LEFT JOIN assessment_templates t ON t.id = a.template_id
+            WHERE a.id > ?
+            ORDER BY a.id
+            LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        conn.close()
+        if not rows:
+            break
+        yield [(row_id, language, decode_stored_responses(packed, responses), template or DEFAULT_TEMPLATE,
+                bank_version) for row_id, language, packed, responses, template, bank_version in rows]
+        last_id = rows[-1][0]
+
+
+@timed('db')
+@retry_on_busy('UPDATE assessment scores')
+def update_assessment_scores(table, updates):
+    """Write recalculated (id, scores, total_possible, interpretations) rows back in one transaction"""
+    owner_type = _owner_type(table)
+    assignments = ", ".join(f"{column} = ?" for column in SCORE_COLUMNS.values())
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(f'''
+        UPDATE {table}
+        SET {assignments}, total_score = ?, interpretation = ?
+        WHERE id = ?
+    ''', [
+        [scores.get(competency) for competency in SCORE_COLUMNS]
+        + [sum(scores.values()), compact_interpretation(interpretations), row_id]
+        for row_id, scores, _, interpretations in updates
+    ])
+    for row_id, scores, total_possible, _ in updates:
+        _save_competency_scores(cursor, owner_type, row_id, scores, total_possible)
+    conn.commit()
+    conn.close()
+
+
+@timed('db')
+@retry_on_busy('INSERT users')
+def create_users(users):
+    """Insert (employee_id, employee_name, password, department) rows in one transaction
+
+    Existing employee ids are left untouched. Returns the ids that were created.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    created = []
+    for employee_id, employee_name, password, department in users:
+        cursor.execute('''
+            INSERT OR IGNORE INTO users (employee_id, employee_name, password_hash, department)
+            VALUES (?, ?, ?, ?)
+        ''', (employee_id, employee_name, hash_password(password), department))
+        if cursor.rowcount:
+            created.append(employee_id)
+    conn.commit()
+    conn.close()
+    return created
+
+
+@timed('db')
+@retry_on_busy('INSERT submission_log')
+def save_submission_trace(submission_id, user_type, submitted_at, outcome, total_ms, stages):
+    """Store a submission's outcome and its (stage, duration_ms, ok) timings"""
+    conn = get_connection()
+    conn.execute('''
+        INSERT INTO submission_log (id, user_type, submitted_at, day, outcome, total_ms)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (submission_id, user_type, submitted_at.isoformat(sep=' ', timespec='seconds'),
+          submitted_at.date().isoformat(), outcome, total_ms))
+    conn.executemany('''
+        INSERT INTO submission_stage_timings (submission_id, stage, duration_ms, ok)
+        VALUES (?, ?, ?, ?)
+    ''', [(submission_id, stage, duration_ms, int(ok)) for stage, duration_ms, ok in stages])
+    conn.commit()
+    conn.close()
+
+
+@timed('db')
+def load_submission_stage_timings(since=None, user_type=None):
+    """(day, stage, duration_ms, ok) rows of the stored submissions"""
+    where, params = _build_filters(since, None, "l.day", **{"l.user_type": user_type})
+    conn = get_connection()
+    rows = conn.execute(f'''
+        SELECT l.day, t.stage, t.duration_ms, t.ok
+        FROM submission_stage_timings t
+        JOIN submission_log l ON l.id = t.submission_id
+        {where}
+    ''', params).fetchall()
+    conn.close()
+    return rows
+
+
+@timed('db')
+def load_submission_outcomes(since=None, user_type=None):
+    """Submission counts per day and outcome as a DataFrame"""
+    import pandas as pd
+
+    where, params = _build_filters(since, None, "day", user_type=user_type)
+    conn = get_connection()
+    df = pd.read_sql_query(f'''
+        SELECT day, outcome, COUNT(*) AS submissions, ROUND(AVG(total_ms), 1) AS mean_total_ms
+        FROM submission_log
+        {where}
+        GROUP BY day, outcome
+        ORDER BY day, outcome
+    ''', conn, params=params)
+    conn.close()
+    return df
+
+
+@timed('db')
+@retry_on_busy('UPDATE packed responses')
+def _pack_response_batch(table, last_id, batch_size):
+    layout_version = get_template(DEFAULT_TEMPLATE).packed_layout
+    conn = get_connection()
+    rows = conn.execute(f'''
+        SELECT id, responses FROM {table}
+        WHERE id > ? AND response_data IS NULL AND responses IS NOT NULL AND {_DEFAULT_TEMPLATE_ROWS}
+        ORDER BY id
+        LIMIT ?
+    ''', (last_id, DEFAULT_TEMPLATE, batch_size)).fetchall()
+    updates = []
+    for row_id, responses in rows:
+        responses = json.loads(responses)
+        packed = pack_responses(responses, layout_version)
+        # The JSON is only dropped when the packed form gives back every answer
+        if unpack_responses(packed) == {key: value for key, value in responses.items() if value is not None}:
+            updates.append((packed, row_id))
+    conn.executemany(f"UPDATE {table} SET response_data = ?, responses = NULL WHERE id = ?", updates)
+    conn.commit()
+    conn.close()
+    return rows[-1][0] if rows else None, len(rows), len(updates)
+
+
+def iter_pack_stored_responses(table, batch_size=FETCH_BATCH_SIZE):
+    """Convert JSON responses of a table to the packed column, yielding the rows done per batch
+
+    Each batch is its own short transaction, and the JSON is cleared as rows
+    are converted, so the migration can be interrupted and run again. Only
+    default-template rows have a packed layout; rows of other templates, and
+    rows whose answers would not survive packing, keep their JSON.
+    """
+    if table not in ('assessments', 'candidate_assessments'):
+        raise ValueError(f"Unknown assessments table: {table}")
+    last_id = 0
+    while True:
+        last_id, fetched, converted = _pack_response_batch(table, last_id, batch_size)
+        if not fetched:
+            break
+        yield converted
+
+
+@timed('db')
+@retry_on_busy('UPDATE compact interpretations')
+def _compact_interpretation_batch(table, last_id, batch_size):
+    conn = get_connection()
+    rows = conn.execute(f'''
+        SELECT id, interpretation FROM {table}
+        WHERE id > ? AND interpretation LIKE '{{%'
+        ORDER BY id
+        LIMIT ?
+    ''', (last_id, batch_size)).fetchall()
+    conn.executemany(f"UPDATE {table} SET interpretation = ? WHERE id = ?",
+                     [(compact_interpretation(json.loads(interpretation)), row_id) for row_id, interpretation in rows])
+    conn.commit()
+    conn.close()
+    return rows[-1][0] if rows else None, len(rows)
+
+
+def iter_compact_stored_interpretations(table, batch_size=FETCH_BATCH_SIZE):
+    """Rewrite JSON interpretations of a table as level codes, yielding the rows done per batch"""
+    if table not in ('assessments', 'candidate_assessments'):
+        raise ValueError(f"Unknown assessments table: {table}")
+    last_id = 0
+    while True:
+        last_id, converted = _compact_interpretation_batch(table, last_id, batch_size)
+        if not converted:
+            break
+        yield converted
+
+
+def copy_legacy_scores(cursor, table, first_id, last_id):
+    """Copy the legacy score columns of an id range into competency_scores, skipping rows already there"""
+    owner_type = _owner_type(table)
+    maximums = get_template(DEFAULT_TEMPLATE).max_scores()
+    for competency, column in SCORE_COLUMNS.items():
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO competency_scores (owner_type, assessment_id, competency_id, score, max_score)
+            SELECT ?, a.id, c.id, a.{column}, ?
+            FROM {table} a JOIN competencies c ON c.name = ?
+            WHERE a.id BETWEEN ? AND ? AND a.{column} IS NOT NULL
+        ''', (owner_type, maximums[competency], competency, first_id, last_id))
+
+
+def _backfill_score_batch(table, last_id, batch_size):
+    conn = get_connection()
+    cursor = conn.cursor()
+    ids = [row[0] for row in cursor.execute(f"SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                                            (last_id, batch_size))]
+    if ids:
+        copy_legacy_scores(cursor, table, ids[0], ids[-1])
+        conn.commit()
+    conn.close()
+    return ids[-1] if ids else None, len(ids)
+
+
+def iter_backfill_competency_scores(table, batch_size=FETCH_BATCH_SIZE):
+    """Copy the legacy score columns of a table into competency_scores, yielding the rows done per batch
+
+    Rows that already have competency scores are left alone, so it can be
+    interrupted and run again.
+    """
+    _owner_type(table)
+    last_id = 0
+    while True:
+        last_id, copied = _backfill_score_batch(table, last_id, batch_size)
+        if not copied:
+            break
+        yield copied
+
+
+@timed('db')
+def vacuum_database():
+    """Rebuild the database file to hand freed pages back to the filesystem"""
+    conn = get_connection()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+@timed('db')
+def load_answer_matrix(table, language=None):
+    """(ids, languages, answers) of every default-template assessment, answers as an (n, questions) uint8 array
+
+    Other templates have other questions and no packed layout, so they are
+    left out, as are rows kept as JSON because their bank no longer matched
+    the layout. Rows not migrated yet are packed on the fly.
+    """
+    if table not in ('assessments', 'candidate_assessments'):
+        raise ValueError(f"Unknown assessments table: {table}")
+    layout_version = get_template(DEFAULT_TEMPLATE).packed_layout
+    where, params = _build_filters(language=language)
+    where = f"{where} AND {_DEFAULT_TEMPLATE_ROWS}" if where else f"WHERE {_DEFAULT_TEMPLATE_ROWS}"
+    conn = get_connection()
+    rows = conn.execute(f"SELECT id, language, response_data, responses FROM {table} {where} ORDER BY id",
+                        (*params, DEFAULT_TEMPLATE)).fetchall()
+    conn.close()
+    ids, languages, packed = [], [], []
+    for row_id, row_language, response_data, responses_json in rows:
+        if response_data is None:
+            responses = json.loads(responses_json or '{}')
+            response_data = pack_responses(responses, layout_version)
+            if unpack_responses(response_data) != {key: value for key, value in responses.items() if value is not None}:
+                continue
+        ids.append(row_id)
+        languages.append(row_language)
+        packed.append(response_data)
+    return ids, languages, decode_answer_matrix(packed, layout_version)
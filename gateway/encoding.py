@@ -0,0 +1,130 @@
+"""Packed binary encoding of stored assessment responses
+
+A packed response set is a two-byte header, the format version and the
+number of answers, followed by one unsigned byte per question in the fixed
+order of that version's layout::
+
+    b'\\x01\\x31' + bytes([4, 2, 1, 5, ...])     # 51 bytes for 49 answers
+
+Likert answers are 1-5, situational answers the option index, forced choice
+answers 0/1, and NO_ANSWER marks a question left blank. The JSON dict this
+replaces takes about 1 KB per row.
+
+A published layout must never be reordered: a new question bank gets a new
+version with its own layout, and old rows keep decoding with theirs.
+
+Interpretations are stored as text, the layout version followed by each
+competency's level code and percentage in the same competency order::
+
+    '1:E83.3,G69.4,A55.6,B40.3,P22.2,E80.6,G66.7'
+
+Competency sets that match no layout, those of other assessment templates,
+are stored with their names instead: ``'0:Innovation=E86.7;Integrity=G66.7'``.
+
+The level descriptions are not stored, scoring.expand_interpretation()
+looks them up when the row is shown.
+"""
+FORMAT_VERSION = 1
+HEADER_SIZE = 2
+NO_ANSWER = 255
+
+# Competency order of the version 1 layout, seven questions each
+_V1_COMPETENCIES = ("Accountability", "Team Collaboration", "Result Orientation", "Communication Skills",
+                    "Adaptability", "Integrity", "Conflict Resolution")
+
+# Response keys in storage order, per format version
+LAYOUTS = {
+    1: tuple(f"{competency}_{i}" for competency in _V1_COMPETENCIES for i in range(7))
+}
+
+# Competencies of a stored interpretation in storage order, per format version
+INTERPRETATION_LAYOUTS = {
+    1: _V1_COMPETENCIES
+}
+
+# Version marking an interpretation that names its competencies, for
+# templates whose competencies match no layout
+NAMED_INTERPRETATION = 0
+
+
+def layout(version=FORMAT_VERSION):
+    try:
+        return LAYOUTS[version]
+    except KeyError:
+        raise ValueError(f"Unknown packed response version: {version}") from None
+
+
+def pack_responses(responses, version=FORMAT_VERSION):
+    """Encode a responses dict as packed bytes"""
+    keys = layout(version)
+    packed = bytearray((version, len(keys)))
+    for key in keys:
+        value = responses.get(key)
+        packed.append(NO_ANSWER if value is None else int(value))
+    return bytes(packed)
+
+
+def _check_header(packed):
+    if len(packed) < HEADER_SIZE:
+        raise ValueError("Packed responses are too short")
+    version, count = packed[0], packed[1]
+    keys = layout(version)
+    if count != len(keys) or len(packed) != HEADER_SIZE + count:
+        raise ValueError(f"Packed responses do not match layout version {version}")
+    return keys
+
+
+def unpack_responses(packed):
+    """Decode packed bytes back into a responses dict, blank answers left out"""
+    keys = _check_header(packed)
+    return {key: value for key, value in zip(keys, packed[HEADER_SIZE:]) if value != NO_ANSWER}
+
+
+def decode_answers(packed):
+    """Answers of one packed response set as a read-only uint8 array, without copying"""
+    import numpy as np
+
+    _check_header(packed)
+    return np.frombuffer(packed, dtype=np.uint8, offset=HEADER_SIZE)
+
+
+def decode_answer_matrix(packed_rows, version=FORMAT_VERSION):
+    """Answers of many packed response sets of one version as an (n, questions) uint8 array"""
+    import numpy as np
+
+    width = HEADER_SIZE + len(layout(version))
+    matrix = np.frombuffer(b''.join(packed_rows), dtype=np.uint8)
+    if matrix.size % width:
+        raise ValueError(f"Packed responses do not all match layout version {version}")
+    matrix = matrix.reshape(-1, width)
+    if (matrix[:, 0] != version).any():
+        raise ValueError(f"Packed responses are not all version {version}")
+    return matrix[:, HEADER_SIZE:]
+
+
+def pack_interpretation(levels, version=FORMAT_VERSION):
+    """Encode {competency: (level code, percentage)} as compact text"""
+    try:
+        competencies = INTERPRETATION_LAYOUTS[version]
+    except KeyError:
+        raise ValueError(f"Unknown interpretation version: {version}") from None
+    if set(levels) != set(competencies):
+        return f"{NAMED_INTERPRETATION}:" + ";".join(
+            f"{competency}={code}{percentage:.1f}" for competency, (code, percentage) in levels.items())
+    return f"{version}:" + ",".join(f"{levels[competency][0]}{levels[competency][1]:.1f}" for competency in competencies)
+
+
+def unpack_interpretation(packed):
+    """Decode compact interpretation text back into {competency: (level code, percentage)}"""
+    version, _, body = packed.partition(':')
+    if version == str(NAMED_INTERPRETATION):
+        entries = (entry.rpartition('=') for entry in body.split(';') if entry)
+        return {competency: (value[0], float(value[1:])) for competency, _, value in entries}
+    try:
+        competencies = INTERPRETATION_LAYOUTS[int(version)]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unknown interpretation version: {version}") from None
+    entries = body.split(',')
+    if len(entries) != len(competencies):
+        raise ValueError(f"Interpretation does not match layout version {version}")
+    return {competency: (entry[0], float(entry[1:])) for competency, entry in zip(competencies, entries)}
@@ -0,0 +1,78 @@
+"""CSV and Excel exports of assessment records
+
+Rows with a percentage below LOW_PERFORMANCE_PERCENT are filled red in Excel,
+matching the highlighting of the admin pages. The streaming writers take any
+iterable of row tuples, so exports of the whole database run in constant memory.
+"""
+import csv
+
+LOW_PERFORMANCE_PERCENT = 60
+LOW_PERFORMANCE_COLOR = 'FFCCCC'
+
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def build_excel_report(df, sheet_name):
+    """Excel workbook bytes for a DataFrame with a 'percentage' column, low performers in red"""
+    from io import BytesIO
+    import pandas as pd
+    from openpyxl.styles import PatternFill
+
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name=sheet_name, index=False)
+        worksheet = writer.sheets[sheet_name]
+
+        # Apply red background to rows where percentage < 60
+        red_fill = PatternFill(start_color=LOW_PERFORMANCE_COLOR, end_color=LOW_PERFORMANCE_COLOR, fill_type='solid')
+        for row_num, percentage in enumerate(df['percentage'], start=2):
+            if percentage < LOW_PERFORMANCE_PERCENT:
+                for col_num in range(1, len(df.columns) + 1):
+                    worksheet.cell(row=row_num, column=col_num).fill = red_fill
+
+    return output.getvalue()
+
+
+def write_csv(columns, rows, output):
+    """Write a header and rows to an open text file, returns the number of rows"""
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_xlsx(columns, rows, path, sheet_name):
+    """Stream a header and rows into an .xlsx file, returns the number of rows
+
+    Uses openpyxl's write-only mode, which flushes each row to disk instead of
+    keeping the whole sheet in memory.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import PatternFill
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    worksheet.append(columns)
+
+    red_fill = PatternFill(start_color=LOW_PERFORMANCE_COLOR, end_color=LOW_PERFORMANCE_COLOR, fill_type='solid')
+    percentage_index = columns.index('percentage')
+    count = 0
+    for row in rows:
+        percentage = row[percentage_index]
+        if percentage is not None and percentage < LOW_PERFORMANCE_PERCENT:
+            cells = []
+            for value in row:
+                cell = WriteOnlyCell(worksheet, value=value)
+                cell.fill = red_fill
+                cells.append(cell)
+            worksheet.append(cells)
+        else:
+            worksheet.append(list(row))
+        count += 1
+
+    workbook.save(path)
+    return count
@@ -0,0 +1,138 @@
+"""Busy timeout, write retries and lock-contention counters for SQLite
+
+SQLite allows one writer at a time. A connection that finds the database
+locked waits up to the busy timeout and then fails with "database is
+locked". Write transactions wrapped with ``@retry_on_busy('INSERT table')``
+are then rolled back and run again, up to a bounded number of times,
+sleeping a random (full-jitter) exponential backoff in between so that the
+retries of colliding sessions spread out instead of colliding again.
+
+Counters per statement type (transactions, busy events, retries, failures
+and the time spent waiting) are always kept, in memory per process, and
+shown on the admin Performance page.
+
+Settings, all optional:
+    GATEWAY_BUSY_TIMEOUT_MS     how long a statement waits for a lock (default 5000)
+    GATEWAY_WRITE_RETRIES       retries of a write transaction after a lock error (default 3)
+    GATEWAY_RETRY_BACKOFF_MS    first backoff, doubled on every retry (default 50)
+"""
+import functools
+import os
+import random
+import sqlite3
+import threading
+import time
+import traceback
+
+# Longest single backoff, however many retries are configured
+MAX_BACKOFF_MS = 2000
+
+
+class DatabaseBusyError(sqlite3.OperationalError):
+    """Raised when a write transaction still finds the database locked after every retry"""
+
+
+class _State:
+    def __init__(self):
+        self.busy_timeout_ms = int(os.environ.get('GATEWAY_BUSY_TIMEOUT_MS', 5000))
+        self.retries = int(os.environ.get('GATEWAY_WRITE_RETRIES', 3))
+        self.backoff_ms = float(os.environ.get('GATEWAY_RETRY_BACKOFF_MS', 50))
+
+
+_state = _State()
+_lock = threading.Lock()
+_counters = {}
+
+
+def busy_timeout_seconds():
+    """Busy timeout for sqlite3.connect()"""
+    return _state.busy_timeout_ms / 1000
+
+
+def settings():
+    return {
+        'busy_timeout_ms': _state.busy_timeout_ms,
+        'retries': _state.retries,
+        'backoff_ms': _state.backoff_ms
+    }
+
+
+def is_busy_error(exception):
+    """True for the errors SQLite raises when another connection holds the lock"""
+    if not isinstance(exception, sqlite3.OperationalError):
+        return False
+    message = str(exception)
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def backoff_seconds(retry):
+    """Full-jitter exponential backoff before the given retry (1 = first)"""
+    ceiling = min(MAX_BACKOFF_MS, _state.backoff_ms * 2 ** (retry - 1))
+    return random.uniform(0, ceiling) / 1000
+
+
+def _counter(statement_type):
+    counter = _counters.get(statement_type)
+    if counter is None:
+        counter = _counters[statement_type] = {
+            'transactions': 0, 'busy_events': 0, 'retries': 0, 'failures': 0, 'wait_s': 0.0
+        }
+    return counter
+
+
+def retry_on_busy(statement_type):
+    """Decorator running a write transaction again when it hits a locked database
+
+    The wrapped function must open its own connection and commit at the end,
+    so a failed attempt leaves nothing behind. statement_type names the
+    counters, e.g. 'INSERT assessments'.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _lock:
+                _counter(statement_type)['transactions'] += 1
+            retry = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if not is_busy_error(e):
+                        raise
+                    waited = time.perf_counter() - start
+                    # Drop the failed attempt's frames so its connection closes and rolls back now
+                    traceback.clear_frames(e.__traceback__)
+                    retry += 1
+                    exhausted = retry > _state.retries
+                    with _lock:
+                        counter = _counter(statement_type)
+                        counter['busy_events'] += 1
+                        counter['wait_s'] += waited
+                        if exhausted:
+                            counter['failures'] += 1
+                        else:
+                            counter['retries'] += 1
+                    if exhausted:
+                        raise DatabaseBusyError(
+                            f"{statement_type}: database still locked after {_state.retries} retries"
+                        ) from None
+                pause = backoff_seconds(retry)
+                with _lock:
+                    _counter(statement_type)['wait_s'] += pause
+                time.sleep(pause)
+        return wrapper
+    return decorator
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+
+
+def snapshot():
+    """One row of counters per statement type, most busy events first"""
+    with _lock:
+        rows = [dict(counter, statement=statement_type) for statement_type, counter in _counters.items()]
+    rows.sort(key=lambda row: (row['busy_events'], row['transactions']), reverse=True)
+    return rows
@@ -0,0 +1,85 @@
+"""Outgoing mail over SMTP"""
+import contextlib
+import os
+
+from gateway.config import get_email_config
+from gateway.metrics import timed
+
+
+@timed('mail')
+def send_email_with_attachment(subject, body, attachment_path, attachment_name, cc_emails=None,
+                               to_email=None, progress=None, stage=None):
+    """Send email with attachment and return the list of recipients.
+
+    SMTP errors are raised to the caller. ``progress`` is called with a short
+    message before each step of the exchange, and ``stage(name)``, when given,
+    must return a context manager wrapped around each step, e.g. to time it.
+    """
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.base import MIMEBase
+    from email import encoders
+
+    def report(message):
+        if progress:
+            progress(message)
+
+    stage = stage or (lambda name: contextlib.nullcontext())
+
+    config = get_email_config()
+    to_email = to_email or config['to_email']
+    report("📧 Starting email process...")
+    
+    msg = MIMEMultipart()
+    msg['From'] = config['from_email']
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    
+    recipients = [to_email]
+    if cc_emails:
+        cc_emails = [email.strip() for email in cc_emails if email.strip()]
+        if cc_emails:
+            msg['Cc'] = ', '.join(cc_emails)
+            recipients.extend(cc_emails)
+    
+    # Add body
+    msg.attach(MIMEText(body, 'plain'))
+    
+    # Attach file if exists
+    if attachment_path and os.path.exists(attachment_path):
+        report(f"📎 Attaching file: {attachment_name}")
+        with open(attachment_path, "rb") as attachment:
+            part = MIMEBase('application', 'octet-stream')
+            part.set_payload(attachment.read())
+        
+        encoders.encode_base64(part)
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename="{attachment_name}"'
+        )
+        msg.attach(part)
+    
+    # Connect to server
+    report("🔗 Connecting to Gmail SMTP...")
+    with stage('smtp_connect'):
+        server = smtplib.SMTP(config['smtp_server'], config['smtp_port'])
+    
+    try:
+        report("🔐 Starting TLS encryption...")
+        with stage('smtp_tls'):
+            server.starttls()
+        
+        report("👤 Logging in...")
+        with stage('smtp_login'):
+            server.login(config['from_email'], config['password'])
+        
+        report("📤 Sending email...")
+        with stage('smtp_send'):
+            server.sendmail(config['from_email'], recipients, msg.as_string())
+            server.quit()
+    finally:
+        # No-op after quit(), releases the socket if a step above failed
+        server.close()
+    
+    return recipients
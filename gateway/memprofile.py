@@ -0,0 +1,247 @@
+"""tracemalloc-based memory tracking of page renders and sessions
+
+While tracing is on (GATEWAY_TRACEMALLOC=1, or switched on by an admin from
+the Performance page), every tracked page render is wrapped in
+``with render(page, session_id, session_state)``. The context manager takes
+tracemalloc snapshots before and after the render and records:
+
+- the peak traced memory during the render, checked against the page
+  memory budget (GATEWAY_PAGE_MEMORY_BUDGET_MB, default 200)
+- the memory the render left allocated, and the allocation sites that
+  grew the most
+- an estimate of the session's footprint, from the size of what its
+  session_state holds plus what its last render left allocated
+
+tracemalloc's peak is process-wide, so only renders that run alone are
+measured: a render that starts while another is in progress is not
+recorded, and neither is one that another render overlapped. With many
+concurrent sessions fewer renders get recorded, but those that do are not
+inflated by other sessions' work.
+
+Tracing slows Python allocations down noticeably, so leave it off unless
+you are investigating.
+"""
+import collections
+import io
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from gateway.config import env_flag
+
+MB = 1024 * 1024
+
+# Frames stored per allocation, one is enough to group by line
+TRACE_FRAMES = 1
+
+# Allocation sites kept per page, budget alerts kept in memory, sessions tracked
+TOP_SITES = 15
+RECENT_ALERTS = 50
+MAX_SESSIONS = 500
+
+# Files whose allocations are bookkeeping, not page work
+_IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', '<unknown>')
+
+_logger = logging.getLogger(__name__)
+
+
+class _State:
+    def __init__(self):
+        self.budget = float(os.environ.get('GATEWAY_PAGE_MEMORY_BUDGET_MB', 200)) * MB
+        # Renders in progress, and whether one started while another was running
+        self.active = 0
+        self.overlapped = False
+
+
+_state = _State()
+_lock = threading.Lock()
+_pages = {}
+_sessions = collections.OrderedDict()
+_alerts = collections.deque(maxlen=RECENT_ALERTS)
+
+
+def is_enabled():
+    return tracemalloc.is_tracing()
+
+
+def set_enabled(enabled):
+    """Start or stop tracing allocations for the whole process"""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACE_FRAMES)
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def budget_mb():
+    return _state.budget / MB
+
+
+def estimate_size(value, depth=3):
+    """Rough size in bytes of what a session keeps alive"""
+    if hasattr(value, 'memory_usage') and hasattr(value, 'columns'):
+        # DataFrame
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, 'data') and type(value).__name__ == 'Styler':
+        return estimate_size(value.data, depth) + sys.getsizeof(value)
+    if isinstance(value, io.BytesIO):
+        return value.getbuffer().nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if hasattr(value, 'to_plotly_json'):
+        return estimate_size(value.to_plotly_json(), depth)
+    size = sys.getsizeof(value)
+    if depth > 0:
+        if isinstance(value, dict):
+            size += sum(estimate_size(key, depth - 1) + estimate_size(item, depth - 1) for key, item in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(estimate_size(item, depth - 1) for item in value)
+    return size
+
+
+def _top_sites(before, after):
+    filters = [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+    differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    sites = []
+    for difference in differences[:TOP_SITES]:
+        if difference.size_diff <= 0:
+            break
+        frame = difference.traceback[0]
+        sites.append({
+            'site': f"{frame.filename}:{frame.lineno}",
+            'size_kb': difference.size_diff / 1024,
+            'blocks': difference.count_diff
+        })
+    return sites
+
+
+def _record(page, session_id, user, peak, retained, session_bytes, sites):
+    now = datetime.now().isoformat(timespec='seconds')
+    with _lock:
+        stats = _pages.get(page)
+        if stats is None:
+            stats = _pages[page] = {'renders': 0, 'peak': 0, 'max_peak': 0, 'retained': 0, 'over_budget': 0, 'sites': []}
+        stats['renders'] += 1
+        stats['peak'] = peak
+        stats['max_peak'] = max(stats['max_peak'], peak)
+        stats['retained'] = retained
+        stats['sites'] = sites
+        if peak > _state.budget:
+            stats['over_budget'] += 1
+            _alerts.appendleft({'time': now, 'page': page, 'user': user, 'peak_mb': peak / MB})
+
+        _sessions[session_id] = {
+            'user': user,
+            'page': page,
+            'session_state_mb': session_bytes / MB,
+            'retained_mb': max(retained, 0) / MB,
+            'footprint_mb': (session_bytes + max(retained, 0)) / MB,
+            'updated': now
+        }
+        _sessions.move_to_end(session_id)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+
+    if peak > _state.budget:
+        _logger.warning("Page %s used %.1f MB, over the %.0f MB budget (user %s)",
+                        page, peak / MB, budget_mb(), user)
+
+
+@contextmanager
+def render(page, session_id, user=None, session_state=None):
+    """Measure one page render, a no-op while tracing is off or another render is in progress"""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    with _lock:
+        measured = _state.active == 0
+        _state.overlapped = not measured
+        _state.active += 1
+    if measured:
+        before = tracemalloc.take_snapshot()
+        start_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        with _lock:
+            _state.active -= 1
+            measured = measured and not _state.overlapped
+        if measured and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            session_bytes = estimate_size(dict(session_state)) if session_state is not None else 0
+            _record(page, session_id, user, peak - start_current, current - start_current,
+                    session_bytes, _top_sites(before, after))
+
+
+def forget_idle_sessions(max_idle_s=3600):
+    """Drop sessions not seen for max_idle_s seconds"""
+    cutoff = datetime.fromtimestamp(time.time() - max_idle_s).isoformat(timespec='seconds')
+    with _lock:
+        for session_id in [key for key, session in _sessions.items() if session['updated'] < cutoff]:
+            del _sessions[session_id]
+
+
+def reset():
+    with _lock:
+        _pages.clear()
+        _sessions.clear()
+        _alerts.clear()
+
+
+def page_stats():
+    """One row per page, largest peak first"""
+    with _lock:
+        rows = [{
+            'page': page,
+            'renders': stats['renders'],
+            'last_peak_mb': stats['peak'] / MB,
+            'max_peak_mb': stats['max_peak'] / MB,
+            'retained_mb': stats['retained'] / MB,
+            'over_budget': stats['over_budget']
+        } for page, stats in _pages.items()]
+    rows.sort(key=lambda row: row['max_peak_mb'], reverse=True)
+    return rows
+
+
+def page_sites(page):
+    """Allocation sites that grew most during the page's last render"""
+    with _lock:
+        stats = _pages.get(page)
+        return list(stats['sites']) if stats else []
+
+
+def session_stats():
+    """Estimated footprint of every tracked session, largest first"""
+    with _lock:
+        rows = [dict(session, session=session_id[:8]) for session_id, session in _sessions.items()]
+    rows.sort(key=lambda row: row['footprint_mb'], reverse=True)
+    return rows
+
+
+def recent_alerts():
+    with _lock:
+        return list(_alerts)
+
+
+def process_top_sites(limit=TOP_SITES):
+    """Allocation sites holding the most traced memory in the whole process right now"""
+    if not tracemalloc.is_tracing():
+        return []
+    filters = [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+    statistics = tracemalloc.take_snapshot().filter_traces(filters).statistics('lineno')[:limit]
+    return [{
+        'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+        'size_kb': stat.size / 1024,
+        'blocks': stat.count
+    } for stat in statistics]
+
+
+# Tracing from start-up catches allocations of the first renders too
+if env_flag('GATEWAY_TRACEMALLOC'):
+    set_enabled(True)
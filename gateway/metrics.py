@@ -0,0 +1,179 @@
+"""In-process timing metrics for pages, data access, scoring, reports and mail
+
+Functions are wrapped with ``@timed('group')`` and blocks with
+``with timer('group.name')``. Each name gets a histogram of wall times with
+fixed millisecond buckets. Metrics live in memory only, per server
+process, and are shown on the admin Performance page.
+
+Recording is off unless GATEWAY_METRICS is set or an admin switches it on.
+While off, a wrapped call costs one attribute check.
+"""
+import bisect
+import functools
+import threading
+import time
+
+from gateway.config import env_flag
+
+# Upper bounds of the histogram buckets in milliseconds, the last bucket is open-ended
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+# Exceptions Streamlit uses to end a script run early
+CONTROL_FLOW_EXCEPTIONS = ('RerunException', 'StopException')
+
+
+class _State:
+    def __init__(self):
+        self.enabled = env_flag('GATEWAY_METRICS')
+
+
+_state = _State()
+_lock = threading.Lock()
+_histograms = {}
+
+
+class Histogram:
+    """Call count, total and bucketed distribution of one metric's wall times"""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'errors', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.errors = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+
+    def add(self, seconds, failed=False):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        if failed:
+            self.errors += 1
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+
+    def quantile(self, fraction):
+        """Upper bound in seconds of the bucket holding the given quantile"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                if index == len(BUCKET_BOUNDS_MS):
+                    return self.max
+                return min(BUCKET_BOUNDS_MS[index] / 1000, self.max)
+        return self.max
+
+
+def _is_failure(exception):
+    # st.rerun() and st.stop() end a page by raising, that is not an error
+    return type(exception).__name__ not in CONTROL_FLOW_EXCEPTIONS
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def set_enabled(enabled):
+    """Switch recording on or off for the whole process"""
+    _state.enabled = bool(enabled)
+
+
+def record(name, seconds, failed=False):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(seconds, failed)
+
+
+def timed(group):
+    """Decorator recording each call's wall time as '<group>.<function name>'"""
+    def decorator(func):
+        name = f"{group}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            failed = False
+            try:
+                return func(*args, **kwargs)
+            except BaseException as e:
+                failed = _is_failure(e)
+                raise
+            finally:
+                record(name, time.perf_counter() - start, failed)
+        return wrapper
+    return decorator
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self.name, time.perf_counter() - self.start, exc_value is not None and _is_failure(exc_value))
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """Context manager recording the wall time of a block under name"""
+    if not _state.enabled:
+        return _NULL_TIMER
+    return _Timer(name)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot():
+    """Summary rows of every metric, slowest total first"""
+    rows = []
+    with _lock:
+        for name, histogram in _histograms.items():
+            group, _, function = name.partition('.')
+            rows.append({
+                'group': group,
+                'name': function or name,
+                'calls': histogram.count,
+                'errors': histogram.errors,
+                'total_s': histogram.total,
+                'mean_ms': histogram.total / histogram.count * 1000,
+                'p50_ms': histogram.quantile(0.50) * 1000,
+                'p95_ms': histogram.quantile(0.95) * 1000,
+                'max_ms': histogram.max * 1000,
+                'buckets': list(histogram.buckets)
+            })
+    rows.sort(key=lambda row: row['total_s'], reverse=True)
+    return rows
+
+
+def bucket_labels():
+    """Labels for the histogram buckets of snapshot() rows"""
+    labels = [f"≤{bound} ms" for bound in BUCKET_BOUNDS_MS]
+    labels.append(f">{BUCKET_BOUNDS_MS[-1]} ms")
+    return labels
@@ -0,0 +1,98 @@
+"""Per-submission stage timings and outcomes of the assessment submit path
+
+A submit click runs as::
+
+    with submission('employee') as trace:
+        with trace.stage('scoring'):
+            ...
+        trace.outcome = 'duplicate'   # for an early return
+
+Every stage's wall time and success are saved with the submission's outcome
+when the block exits. An exception escaping the block is recorded as the
+outcome 'error'. Saving is best effort: a metrics write that fails never
+fails the submission. stage_percentiles() aggregates the stored timings per
+day and stage for the admin Performance page.
+"""
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from gateway import db
+from gateway.metrics import CONTROL_FLOW_EXCEPTIONS
+
+# Stages of the submit path in the order they run
+STAGES = ('duplicate_check', 'scoring', 'interpretation', 'insert', 'render', 'pdf',
+          'smtp_connect', 'smtp_tls', 'smtp_login', 'smtp_send')
+
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+class SubmissionTrace:
+    """Stage timings of one submission"""
+
+    def __init__(self, user_type):
+        self.id = uuid.uuid4().hex
+        self.user_type = user_type
+        self.submitted_at = datetime.now()
+        self.outcome = 'ok'
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException as e:
+            ok = type(e).__name__ in CONTROL_FLOW_EXCEPTIONS
+            raise
+        finally:
+            self.stages.append((name, (time.perf_counter() - start) * 1000, ok))
+
+
+@contextmanager
+def submission(user_type):
+    """Trace the stages of one submission and save them when the block exits"""
+    trace = SubmissionTrace(user_type)
+    start = time.perf_counter()
+    try:
+        yield trace
+    except BaseException as e:
+        if type(e).__name__ not in CONTROL_FLOW_EXCEPTIONS:
+            trace.outcome = 'error'
+        raise
+    finally:
+        try:
+            db.save_submission_trace(trace.id, trace.user_type, trace.submitted_at, trace.outcome,
+                                     (time.perf_counter() - start) * 1000, trace.stages)
+        except sqlite3.Error:
+            pass
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def stage_percentiles(since=None, user_type=None):
+    """p50/p95/p99/max and failures per (day, stage), stages in submit order"""
+    durations = {}
+    failures = {}
+    for day, stage, duration_ms, ok in db.load_submission_stage_timings(since, user_type):
+        durations.setdefault((day, stage), []).append(duration_ms)
+        if not ok:
+            failures[(day, stage)] = failures.get((day, stage), 0) + 1
+
+    order = {stage: index for index, stage in enumerate(STAGES)}
+    rows = []
+    for (day, stage), values in sorted(durations.items(), key=lambda item: (item[0][0], order.get(item[0][1], len(order)))):
+        values.sort()
+        row = {'day': day, 'stage': stage, 'count': len(values), 'failures': failures.get((day, stage), 0)}
+        for fraction in PERCENTILES:
+            row[f"p{round(fraction * 100)}_ms"] = percentile(values, fraction)
+        row['max_ms'] = values[-1]
+        rows.append(row)
+    return rows
@@ -0,0 +1,229 @@
+"""Precomputed Excel exports, served from disk until their data changes
+
+Every export file is named after what it holds and the data version it was
+built from (db.load_data_versions, bumped by triggers on every write that
+changes exported columns, from any process)::
+
+    cache/exports/records_3f2a9c1e0b7d_v418.xlsx
+
+An export of one window or department follows that scope's version, so a
+submission in another department leaves it current; the others follow the
+version of their owner type.
+
+export_file() returns the file of the current version and builds it only
+when there is none, so the download and email buttons answer at once unless
+the data changed since the last build. precompute_exports() builds the
+standard exports ahead of time: all records, each window, each department
+and all candidate results. It runs from cron through
+``python -m gateway precompute-exports``, or in the Streamlit process on a
+daemon thread (start_refresher) that checks the versions every
+GATEWAY_EXPORT_REFRESH_S seconds (default 3600, 0 turns it off).
+
+Files of older versions are removed when a newer one is written. Ad-hoc
+exports, those filtered by date or position, are removed by the refresher
+and precompute_exports once unused for AD_HOC_EXPORT_MAX_AGE seconds.
+GATEWAY_EXPORT_CACHE_DIR moves the files (default cache/exports).
+"""
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from gateway import db, exports
+from gateway.metrics import timed
+
+_logger = logging.getLogger(__name__)
+
+# Sheet name and row source of each kind of export, and the data version it follows
+EXPORT_KINDS = {
+    'records': ('Assessment_Records', 'employee'),
+    'candidates': ('Candidate_Results', 'candidate'),
+}
+
+# Filters with data versions of their own (db.DATA_VERSION_SCOPES); exports with any other are ad hoc
+SCOPE_FILTERS = {'window_id': 'window', 'department': 'department'}
+
+AD_HOC_EXPORT_MAX_AGE = 24 * 3600
+
+# Build locks kept for the most recently built exports
+MAX_BUILD_LOCKS = 256
+
+
+class _State:
+    def __init__(self):
+        self.directory = os.environ.get('GATEWAY_EXPORT_CACHE_DIR', os.path.join('cache', 'exports'))
+        self.refresh_interval = float(os.environ.get('GATEWAY_EXPORT_REFRESH_S', 3600))
+        self.refresher = None
+
+
+_state = _State()
+_lock = threading.Lock()
+# One lock per export, so a button and the refresher never build the same file twice.
+# An evicted lock can at worst let a file be built twice, each build replaces it whole.
+_build_locks = collections.OrderedDict()
+
+
+def export_dir():
+    return _state.directory
+
+
+def _export_rows(kind, filters):
+    if kind == 'records':
+        return db.EMPLOYEE_RECORD_COLUMNS, db.iter_employee_records(
+            filters.get('window_id'), filters.get('department'), filters.get('since'), filters.get('until'))
+    return db.CANDIDATE_RESULT_COLUMNS, db.iter_candidate_results(
+        filters.get('position'), filters.get('since'), filters.get('until'))
+
+
+def _active_filters(filters):
+    return {name: value for name, value in filters.items() if value is not None}
+
+
+def _export_prefix(kind, filters):
+    filters = _active_filters(filters)
+    key = json.dumps(filters, sort_keys=True, default=str)
+    ad_hoc = 'adhoc_' if set(filters) - set(SCOPE_FILTERS) else ''
+    return f"{ad_hoc}{kind}_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]}_v"
+
+
+def _export_version(kind, filters, versions):
+    """Data version an export follows, that of each scope it is filtered to or else its owner type's"""
+    owner_type = EXPORT_KINDS[kind][1]
+    filters = _active_filters(filters)
+    scoped = [versions.get(f"{owner_type}:{scope}:{filters[name]}", 0)
+              for name, scope in SCOPE_FILTERS.items() if name in filters]
+    return '.'.join(map(str, scoped)) if scoped else versions[owner_type]
+
+
+def _build_lock(prefix):
+    with _lock:
+        build_lock = _build_locks.pop(prefix, None) or threading.Lock()
+        _build_locks[prefix] = build_lock
+        while len(_build_locks) > MAX_BUILD_LOCKS:
+            _build_locks.popitem(last=False)
+    return build_lock
+
+
+@timed('exports')
+def export_file(kind, versions=None, **filters):
+    """Path of the .xlsx export of kind ('records' or 'candidates') under filters, built if stale
+
+    filters are those of db.iter_employee_records (window_id, department,
+    since, until) or db.iter_candidate_results (position, since, until).
+    """
+    sheet_name = EXPORT_KINDS[kind][0]
+    # Read before the rows, so a write during the build leaves the file a version behind, not ahead
+    version = _export_version(kind, filters, versions or db.load_data_versions())
+    prefix = _export_prefix(kind, filters)
+    path = os.path.join(_state.directory, f"{prefix}{version}.xlsx")
+    if _reuse(path):
+        return path
+
+    with _build_lock(prefix):
+        if _reuse(path):
+            return path
+        os.makedirs(_state.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.xlsx', dir=_state.directory)
+        os.close(fd)
+        try:
+            columns, rows = _export_rows(kind, filters)
+            exports.write_xlsx(columns, rows, temp_path, sheet_name)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        for name in os.listdir(_state.directory):
+            if name.startswith(prefix) and name != os.path.basename(path):
+                try:
+                    os.unlink(os.path.join(_state.directory, name))
+                except FileNotFoundError:
+                    pass
+    return path
+
+
+def _reuse(path):
+    """Whether the export at path exists, marked as just used so pruning leaves it"""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def prune_exports(max_age=AD_HOC_EXPORT_MAX_AGE):
+    """Remove ad-hoc exports and leftover temporary files unused for max_age seconds, returns how many"""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        names = os.listdir(_state.directory)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if not name.startswith(('adhoc_', 'tmp')):
+            continue
+        path = os.path.join(_state.directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def standard_exports():
+    """(kind, filters) of the exports worth building ahead of time"""
+    window_ids, departments = db.load_export_scopes()
+    return ([('records', {})]
+            + [('records', {'window_id': window_id}) for window_id in window_ids]
+            + [('records', {'department': department}) for department in departments]
+            + [('candidates', {})])
+
+
+def precompute_exports():
+    """Build every standard export missing for the current data versions, returns how many were built
+
+    Unused ad-hoc exports are pruned on the way.
+    """
+    prune_exports()
+    versions = db.load_data_versions()
+    built = 0
+    for kind, filters in standard_exports():
+        prefix = _export_prefix(kind, filters)
+        version = _export_version(kind, filters, versions)
+        if not os.path.exists(os.path.join(_state.directory, f"{prefix}{version}.xlsx")):
+            export_file(kind, versions, **filters)
+            built += 1
+    return built
+
+
+def _refresh_loop(interval):
+    versions = None
+    while True:
+        try:
+            current = db.load_data_versions()
+            if current != versions:
+                built = precompute_exports()
+                versions = current
+                if built:
+                    _logger.info("Precomputed %d exports", built)
+            else:
+                prune_exports()
+        except Exception:
+            # A busy or half-migrated database is tried again on the next round
+            _logger.exception("Precomputing exports failed")
+        time.sleep(interval)
+
+
+def start_refresher():
+    """Start the daemon thread that keeps the standard exports current, once per process"""
+    with _lock:
+        if _state.refresher is None and _state.refresh_interval > 0:
+            _state.refresher = threading.Thread(target=_refresh_loop, args=(_state.refresh_interval,),
+                                                name='export-refresher', daemon=True)
+            _state.refresher.start()
+        return _state.refresher
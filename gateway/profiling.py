@@ -0,0 +1,137 @@
+"""Opt-in cProfile capture of whole Streamlit reruns
+
+An admin arms the profiler for the next N reruns, of any session, from the
+Performance page. When GATEWAY_PROFILE_QUERY_PARAM is set, opening the app
+with ``?profile=N`` also arms it for the next N reruns of that browser
+session. Each profiled rerun is saved as a pstats file in the profiles
+directory (GATEWAY_PROFILE_DIR, default ``profiles``), which can be opened
+with pstats, snakeviz or similar tools, and summarized by top_functions()
+for the admin page. Only the newest MAX_PROFILES files are kept.
+"""
+import cProfile
+import os
+import pstats
+import re
+import threading
+import time
+from datetime import datetime
+
+from gateway.config import env_flag
+
+MAX_PROFILES = 50
+PROFILE_SUFFIX = '.prof'
+
+# Longest ?profile=N a session may ask for
+MAX_SESSION_RUNS = 20
+
+
+class _State:
+    def __init__(self):
+        self.remaining = 0
+        self.directory = os.environ.get('GATEWAY_PROFILE_DIR', 'profiles')
+        self.query_param_allowed = env_flag('GATEWAY_PROFILE_QUERY_PARAM')
+
+
+_state = _State()
+_lock = threading.Lock()
+
+
+def profile_dir():
+    return _state.directory
+
+
+def query_param_allowed():
+    return _state.query_param_allowed
+
+
+def arm(runs):
+    """Profile the next runs reruns of any session in this process"""
+    with _lock:
+        _state.remaining = max(0, int(runs))
+
+
+def remaining():
+    return _state.remaining
+
+
+def take_run():
+    """Claim one of the armed reruns, True when this rerun should be profiled"""
+    if not _state.remaining:
+        return False
+    with _lock:
+        if _state.remaining <= 0:
+            return False
+        _state.remaining -= 1
+        return True
+
+
+def _safe_label(label):
+    return re.sub(r'[^A-Za-z0-9_-]+', '-', str(label)).strip('-')[:40] or 'run'
+
+
+def _prune():
+    profiles = list_profiles()
+    for profile in profiles[MAX_PROFILES:]:
+        try:
+            os.remove(profile['path'])
+        except OSError:
+            pass
+
+
+def profile_call(func, label, *args, **kwargs):
+    """Call func under cProfile and save the stats, even when it ends by raising"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active in this process
+        return func(*args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        os.makedirs(_state.directory, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}_{_safe_label(label)}_{elapsed_ms:.0f}ms{PROFILE_SUFFIX}"
+        profiler.dump_stats(os.path.join(_state.directory, name))
+        _prune()
+
+
+def list_profiles():
+    """Saved profiles, newest first"""
+    try:
+        names = [name for name in os.listdir(_state.directory) if name.endswith(PROFILE_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for name in sorted(names, reverse=True):
+        stamp, _, rest = name[:-len(PROFILE_SUFFIX)].partition('_')
+        label, _, duration = rest.rpartition('_')
+        try:
+            recorded = datetime.strptime(stamp, '%Y%m%d-%H%M%S-%f')
+        except ValueError:
+            # Not written by profile_call()
+            continue
+        profiles.append({
+            'name': name,
+            'path': os.path.join(_state.directory, name),
+            'recorded': recorded.strftime('%Y-%m-%d %H:%M:%S'),
+            'label': label,
+            'duration': duration
+        })
+    return profiles
+
+
+def top_functions(path, sort='cumulative', limit=30):
+    """Rows of the most expensive functions of a saved profile"""
+    stats = pstats.Stats(path)
+    key = {'cumulative': 3, 'tottime': 2, 'calls': 1}[sort]
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][key], reverse=True)[:limit]
+    return [{
+        'function': pstats.func_std_string(function),
+        'calls': total_calls,
+        'tottime_ms': tottime * 1000,
+        'cumtime_ms': cumtime * 1000,
+        'percall_ms': cumtime / total_calls * 1000 if total_calls else 0.0
+    } for function, (_, total_calls, tottime, cumtime, _) in entries]
@@ -0,0 +1,316 @@
+"""Question banks, loaded from versioned bundles in gateway/banks
+
+A bank is a directory. bank.json holds what every language shares, the
+version and each question's type, marks and correct option, and every
+other file is the bundle of one language's strings::
+
+    banks/behavioral/bank.json   {"name": "behavioral", "version": "1",
+                                  "language_names": {"en": "English", "hi": "हिंदी"},
+                                  "competencies": {"Accountability": [
+                                      {"type": "situational", "marks": 7, "correct": 1, "option_count": 4}, ...]}}
+    banks/behavioral/en.json     {"instructions": "...",
+                                  "competencies": {"Accountability": [
+                                      {"question": "...", "options": [...]}, ...]}}
+
+The structure is parsed and checked once into an immutable QuestionBank.
+A bundle is read and checked against it the first time its language is
+asked for and then kept with the bank, so memory grows with the languages
+in use rather than the bundles on disk. Adding a language is adding a file.
+
+current_bank() stats the files at most every GATEWAY_BANK_RELOAD_INTERVAL_S
+seconds (default 2) and loads the bank again when one changed, so a wording
+fix goes live without a restart. Only one thread reloads at a time. The
+others keep the bank they already have instead of waiting, and reruns that
+already hold a bank finish with it. A reload reads the bundles that were
+in use straight away, and a bank that fails to parse is logged while the
+previous version stays in use.
+
+Change the version whenever scoring changes (types, marks, correct options).
+Every assessment stores the version it was scored with, and the database
+keeps a copy of each version's structure (db.question_banks), so old rows
+can be rescored with their own rules.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Mapping
+
+# Directory of the banks shipped with the app
+BANK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'banks')
+
+# File of a bank's shared structure, every other .json file is a language bundle
+STRUCTURE_FILE = 'bank.json'
+
+QUESTION_TYPES = ('likert', 'situational', 'forced_choice')
+
+# Bank of the default assessment template, GATEWAY_QUESTION_BANK can point it at another directory
+DEFAULT_BANK = 'behavioral'
+
+# Offered first when a bank has it
+DEFAULT_LANGUAGE = 'en'
+
+_logger = logging.getLogger(__name__)
+
+
+class QuestionBankError(ValueError):
+    """Raised when a bank or one of its bundles is not valid"""
+
+
+class _Translations(Mapping):
+    """questions[competency] of a bank, indexed by language and loaded on first access"""
+
+    def __init__(self, bank, competency):
+        self._bank = bank
+        self._competency = competency
+
+    def __getitem__(self, language):
+        return self._bank.language_questions(language)[self._competency]
+
+    def __iter__(self):
+        return iter(self._bank.languages)
+
+    def __len__(self):
+        return len(self._bank.languages)
+
+
+class QuestionBank:
+    """One parsed and checked version of a question bank
+
+    ``questions[competency][language]`` is the list of question dicts in
+    that language, as scoring and the assessment form have always used it.
+    A bank read back from the database has no bundles, any language gives
+    the structure alone, which is all scoring needs.
+    """
+
+    def __init__(self, name, version, structure, content, language_names=None, directory=None,
+                 languages=(), digest=None):
+        self.name = name
+        self.version = version
+        self.structure = structure
+        self.content = content
+        self.language_names = language_names or {}
+        self.directory = directory
+        self.languages = list(languages)
+        # Changes with any edit, the version only with scoring changes
+        self.digest = digest or hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+        self.questions = {competency: _Translations(self, competency) for competency in structure}
+        self._bundles = {}
+        self._bundle_lock = threading.Lock()
+        self._question_count = sum(len(entries) for entries in structure.values())
+        self._question_keys = tuple(f"{competency}_{i}" for competency, entries in structure.items()
+                                    for i in range(len(entries)))
+        self._max_scores = {competency: sum(entry["marks"] for entry in entries)
+                            for competency, entries in structure.items()}
+
+    @property
+    def competencies(self):
+        return list(self.structure)
+
+    def language_name(self, language):
+        return self.language_names.get(language, language)
+
+    def loaded_languages(self):
+        """Languages whose bundles were read so far"""
+        return list(self._bundles)
+
+    def question_count(self, language=None):
+        return self._question_count
+
+    def question_keys(self, language=None):
+        """Response keys of every question in order, '<competency>_<index>', the same in every language"""
+        return self._question_keys
+
+    def max_scores(self, language=None):
+        """Highest possible score of every competency, the same in every language"""
+        return dict(self._max_scores)
+
+    def _bundle(self, language):
+        bundle = self._bundles.get(language)
+        if bundle is not None:
+            return bundle
+        if self.directory is not None and language not in self.languages:
+            raise KeyError(language)
+        with self._bundle_lock:
+            bundle = self._bundles.get(language)
+            if bundle is None:
+                if self.directory is None:
+                    bundle = {'strings': {}, 'questions': self.structure}
+                else:
+                    with open(os.path.join(self.directory, f"{language}.json"), encoding='utf-8') as f:
+                        bundle = _merge_bundle(self, language, f.read())
+                self._bundles[language] = bundle
+        return bundle
+
+    def language_questions(self, language):
+        """{competency: [question dicts]} in one language, its bundle read on first use"""
+        return self._bundle(language)['questions']
+
+    def strings(self, language):
+        """Strings of a language bundle besides its questions, such as the instructions"""
+        return self._bundle(language)['strings']
+
+
+def _check_entry(where, entry):
+    if entry.get("type") not in QUESTION_TYPES:
+        raise QuestionBankError(f"{where}: unknown question type {entry.get('type')!r}")
+    if not isinstance(entry.get("marks"), (int, float)):
+        raise QuestionBankError(f"{where}: needs marks")
+    if entry["type"] != "likert" and entry.get("option_count", 0) < 2:
+        raise QuestionBankError(f"{where}: needs at least two options")
+    if entry["type"] == "situational" and not 0 <= entry.get("correct", -1) < entry["option_count"]:
+        raise QuestionBankError(f"{where}: correct option out of range")
+
+
+def _structure_entry(question):
+    entry = {key: question[key] for key in ("type", "marks", "correct", "option_count") if key in question}
+    if "options" in question:
+        entry["option_count"] = len(question["options"])
+    return entry
+
+
+def parse_bank(content, directory=None, languages=(), digest=None):
+    """QuestionBank from the text of a bank.json, checked for the shape scoring relies on"""
+    try:
+        data = json.loads(content)
+        name, version, competencies = data["name"], str(data["version"]), data["competencies"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise QuestionBankError(f"Not a question bank: {e}") from None
+    if not competencies:
+        raise QuestionBankError(f"Bank {name} has no competencies")
+
+    structure = {}
+    for competency, entries in competencies.items():
+        if isinstance(entries, dict):
+            # Versions recorded before the split into bundles hold every language's questions,
+            # which all score the same
+            entries = next(iter(entries.values()))
+        structure[competency] = [_structure_entry(entry) for entry in entries]
+        for i, entry in enumerate(structure[competency]):
+            _check_entry(f"{name} {version} {competency} Q{i + 1}", entry)
+    return QuestionBank(name, version, structure, content, data.get("language_names"), directory, languages,
+                        digest)
+
+
+def _merge_bundle(bank, language, content):
+    """A language bundle's questions merged with the bank's structure, and its other strings"""
+    where = f"{bank.name} {bank.version} {language}"
+    try:
+        data = json.loads(content)
+        translations = data["competencies"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise QuestionBankError(f"{where}: not a language bundle: {e}") from None
+
+    questions = {}
+    for competency, entries in bank.structure.items():
+        texts = translations.get(competency)
+        if texts is None or len(texts) != len(entries):
+            raise QuestionBankError(f"{where} {competency}: questions do not match the bank")
+        merged = []
+        for i, (entry, text) in enumerate(zip(entries, texts)):
+            # Translations may differ in wording only, never in how they score
+            if not isinstance(text.get("question"), str):
+                raise QuestionBankError(f"{where} {competency} Q{i + 1}: needs question text")
+            if len(text.get("options") or ()) != entry.get("option_count", 0):
+                raise QuestionBankError(f"{where} {competency} Q{i + 1}: options do not match the bank")
+            question = {key: value for key, value in entry.items() if key != "option_count"}
+            question.update(text)
+            merged.append(question)
+        questions[competency] = merged
+    strings = {key: value for key, value in data.items() if key != "competencies"}
+    return {'strings': strings, 'questions': questions}
+
+
+def _bundle_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.json') and name != STRUCTURE_FILE)
+
+
+def _signature(directory):
+    signature = []
+    for name in [STRUCTURE_FILE] + _bundle_files(directory):
+        stat = os.stat(os.path.join(directory, name))
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def load_bank(directory, signature=None, preload=()):
+    """Bank in a directory, with the bundles of the preload languages read and checked already"""
+    signature = signature or _signature(directory)
+    with open(os.path.join(directory, STRUCTURE_FILE), encoding='utf-8') as f:
+        content = f.read()
+    languages = sorted((name[:-len('.json')] for name in _bundle_files(directory)),
+                       key=lambda language: (language != DEFAULT_LANGUAGE, language))
+    digest = hashlib.sha256(repr(signature).encode('utf-8') + content.encode('utf-8')).hexdigest()[:16]
+    bank = parse_bank(content, directory, languages, digest)
+    for language in preload:
+        if language in bank.languages:
+            bank.language_questions(language)
+    return bank
+
+
+class _LoadedBank:
+    def __init__(self, path, bank, signature):
+        self.path = path
+        self.bank = bank
+        self.signature = signature
+        self.checked = time.monotonic()
+
+
+class _State:
+    def __init__(self):
+        self.reload_interval = float(os.environ.get('GATEWAY_BANK_RELOAD_INTERVAL_S', 2))
+
+
+_state = _State()
+_lock = threading.Lock()
+_banks = {}
+
+
+def bank_path(name):
+    """Directory of a named bank, GATEWAY_QUESTION_BANK overrides the default one"""
+    if name == DEFAULT_BANK and os.environ.get('GATEWAY_QUESTION_BANK'):
+        return os.environ['GATEWAY_QUESTION_BANK']
+    return os.path.join(BANK_DIR, name)
+
+
+def current_bank(path):
+    """Latest version of the bank in path, reloaded when one of its files changed"""
+    loaded = _banks.get(path)
+    if loaded is None:
+        with _lock:
+            loaded = _banks.get(path)
+            if loaded is None:
+                signature = _signature(path)
+                loaded = _banks[path] = _LoadedBank(path, load_bank(path, signature), signature)
+        return loaded.bank
+
+    if time.monotonic() - loaded.checked < _state.reload_interval:
+        return loaded.bank
+    # Whoever gets the lock checks the files, everyone else carries on with the loaded bank
+    if not _lock.acquire(blocking=False):
+        return loaded.bank
+    try:
+        loaded.checked = time.monotonic()
+        try:
+            signature = _signature(path)
+            if signature == loaded.signature:
+                return loaded.bank
+            bank = load_bank(path, signature, preload=loaded.bank.loaded_languages())
+        except (OSError, QuestionBankError) as e:
+            _logger.error("Keeping question bank %s version %s, reloading %s failed: %s",
+                          loaded.bank.name, loaded.bank.version, path, e)
+            if isinstance(e, QuestionBankError):
+                # Not worth parsing again until the files change once more
+                loaded.signature = signature
+            return loaded.bank
+        _banks[path] = _LoadedBank(path, bank, signature)
+        _logger.info("Reloaded question bank %s version %s from %s", bank.name, bank.version, path)
+        return bank
+    finally:
+        _lock.release()
+
+
+# The default bank as loaded at import, for code that only needs its shape
+QUESTIONS = current_bank(bank_path(DEFAULT_BANK)).questions
@@ -0,0 +1,738 @@
+"""PDF assessment reports
+
+reportlab is imported inside the functions so importing this module stays cheap.
+
+Reports are written in the language the assessment was taken in. English
+uses the built-in Helvetica. Hindi needs a Unicode TrueType font with
+Devanagari glyphs, found through GATEWAY_PDF_FONT_HI (and
+GATEWAY_PDF_FONT_HI_BOLD) or in DEVANAGARI_FONT_PATHS. The font is parsed and
+registered with reportlab once per process, and every report embeds only a
+subset holding the glyphs it uses, so a Hindi report stays about as small
+as an English one. Conjuncts and vowel signs are shaped when uharfbuzz is
+installed. Without a font a Hindi report falls back to the English labels
+rather than printing empty boxes.
+
+Every report carries a bar chart and a radar chart of the competency
+percentages, drawn with reportlab.graphics as vector shapes, so no image
+export is needed. Their axes, grid and labels are built once per language
+and competency set, and each report only adds its bars and radar polygon.
+
+iter_reports_zip() streams the reports of many stored assessments as a ZIP
+archive. Each report is rendered once into GATEWAY_REPORT_CACHE_DIR (default
+cache/reports), in a folder of its own assessment under a name that changes
+with the data it shows (``employee/418/3f2a9c1e0b7d5a64.pdf``), and copied
+into the archive from there, so memory holds one report at a time however
+many are selected.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+
+from gateway.metrics import timed
+
+_logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Where a Devanagari font is looked for when GATEWAY_PDF_FONT_HI is not set,
+# as (regular, bold) pairs; the regular face doubles as bold when bold is missing
+DEVANAGARI_FONT_PATHS = (
+    (os.path.join(REPO_DIR, 'fonts', 'NotoSansDevanagari-Regular.ttf'),
+     os.path.join(REPO_DIR, 'fonts', 'NotoSansDevanagari-Bold.ttf')),
+    ('/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf',
+     '/usr/share/fonts/truetype/noto/NotoSansDevanagari-Bold.ttf'),
+    ('/usr/share/fonts/noto/NotoSansDevanagari-Regular.ttf',
+     '/usr/share/fonts/noto/NotoSansDevanagari-Bold.ttf'),
+    ('/usr/share/fonts/truetype/lohit-devanagari/Lohit-Devanagari.ttf', None),
+    ('/usr/share/fonts/truetype/freefont/FreeSans.ttf', '/usr/share/fonts/truetype/freefont/FreeSansBold.ttf'),
+    ('C:\\Windows\\Fonts\\Nirmala.ttf', 'C:\\Windows\\Fonts\\NirmalaB.ttf'),
+    ('C:\\Windows\\Fonts\\mangal.ttf', 'C:\\Windows\\Fonts\\mangalb.ttf'),
+)
+
+BASE_FONTS = ('Helvetica', 'Helvetica-Bold')
+
+# Report text per language; competencies and ratings missing here keep their English names
+LABELS = {
+    'en': {
+        'company': "Tuaman Engineering Limited",
+        'title': "Behavioral Competency Assessment Report",
+        'employee_id': "Employee ID:",
+        'candidate_code': "Candidate Code:",
+        'name': "Name:",
+        'department': "Department:",
+        'position_applied': "Position Applied:",
+        'date': "Assessment Date:",
+        'scores': "Assessment Scores",
+        'competency': "Competency",
+        'score': "Score",
+        'max_score': "Max Score",
+        'percentage': "Percentage",
+        'total': "TOTAL",
+        'overall': "Overall Assessment",
+        'profile': "Competency Profile",
+        'cohort_title': "Department Cohort Report",
+        'window': "Assessment Window:",
+        'generated': "Generated:",
+        'summary': "Summary",
+        'assessments': "Assessments",
+        'average_score': "Average Score",
+        'average_percentage': "Average Percentage",
+        'highest': "Highest Percentage",
+        'lowest': "Lowest Percentage",
+        'low_performers': "Low Performers (below {percent}%)",
+        'competency_averages': "Competency Averages",
+        'level': "Level",
+        'cohort': "All Assessments",
+        'none': "None",
+        'page': "Page",
+        'competencies': {},
+        'ratings': {}
+    },
+    'hi': {
+        'company': "Tuaman Engineering Limited",
+        'title': "व्यवहारिक दक्षता मूल्यांकन रिपोर्ट",
+        'employee_id': "कर्मचारी आईडी:",
+        'candidate_code': "उम्मीदवार कोड:",
+        'name': "नाम:",
+        'department': "विभाग:",
+        'position_applied': "आवेदित पद:",
+        'date': "मूल्यांकन तिथि:",
+        'scores': "मूल्यांकन स्कोर",
+        'competency': "दक्षता",
+        'score': "स्कोर",
+        'max_score': "अधिकतम स्कोर",
+        'percentage': "प्रतिशत",
+        'total': "कुल",
+        'overall': "समग्र मूल्यांकन",
+        'profile': "दक्षता प्रोफ़ाइल",
+        'cohort_title': "विभागीय समूह रिपोर्ट",
+        'window': "मूल्यांकन अवधि:",
+        'generated': "तैयार किया गया:",
+        'summary': "सारांश",
+        'assessments': "मूल्यांकन",
+        'average_score': "औसत स्कोर",
+        'average_percentage': "औसत प्रतिशत",
+        'highest': "उच्चतम प्रतिशत",
+        'lowest': "न्यूनतम प्रतिशत",
+        'low_performers': "कम प्रदर्शन करने वाले ({percent}% से कम)",
+        'competency_averages': "दक्षता औसत",
+        'level': "स्तर",
+        'cohort': "सभी मूल्यांकन",
+        'none': "कोई नहीं",
+        'page': "पृष्ठ",
+        'competencies': {
+            "Accountability": "जवाबदेही",
+            "Team Collaboration": "टीम सहयोग",
+            "Result Orientation": "परिणाम अभिमुखता",
+            "Communication Skills": "संचार कौशल",
+            "Adaptability": "अनुकूलनशीलता",
+            "Integrity": "सत्यनिष्ठा",
+            "Conflict Resolution": "संघर्ष समाधान"
+        },
+        'ratings': {
+            "High Performer": "उच्च प्रदर्शनकर्ता",
+            "Strong Performer": "मजबूत प्रदर्शनकर्ता",
+            "Average Performer": "औसत प्रदर्शनकर्ता",
+            "Needs Development": "विकास की आवश्यकता"
+        }
+    }
+}
+
+# Languages whose text Helvetica cannot draw, with the environment variables naming their font
+UNICODE_FONT_ENV_VARS = {
+    'hi': ('GATEWAY_PDF_FONT_HI', 'GATEWAY_PDF_FONT_HI_BOLD')
+}
+
+# Colors of the charts: the competency bars and radar outline, and the 100% ring of the radar
+CHART_COLOR = '#3780bf'
+CHART_GRID_COLOR = '#c8c8c8'
+
+# Report files are stored as is in a reports ZIP, PDF streams are compressed already
+REPORTS_ZIP_COMPRESSION = zipfile.ZIP_STORED
+
+_lock = threading.Lock()
+_fonts = {}
+_styles = {}
+# Chart backgrounds by (language, competencies)
+_charts = {}
+
+
+def _font_files(language):
+    regular_var, bold_var = UNICODE_FONT_ENV_VARS[language]
+    if os.environ.get(regular_var):
+        return os.environ[regular_var], os.environ.get(bold_var)
+    for regular, bold in DEVANAGARI_FONT_PATHS:
+        if os.path.exists(regular):
+            return regular, bold if bold and os.path.exists(bold) else None
+    return None, None
+
+
+def report_fonts(language):
+    """(regular, bold) font names for a language, registered with reportlab on first use
+
+    None when the language needs a font that is not installed.
+    """
+    if language not in UNICODE_FONT_ENV_VARS:
+        return BASE_FONTS
+    if language in _fonts:
+        return _fonts[language]
+    with _lock:
+        if language not in _fonts:
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont, TTFError
+
+            regular, bold = _font_files(language)
+            fonts = None
+            if regular is None:
+                _logger.warning("No font for %s reports, set %s; they use the English labels",
+                                language, UNICODE_FONT_ENV_VARS[language][0])
+            else:
+                names = (f"Report-{language}", f"Report-{language}-Bold")
+                try:
+                    # TTFont subsets on output, each PDF embeds only the glyphs it draws
+                    pdfmetrics.registerFont(TTFont(names[0], regular))
+                    pdfmetrics.registerFont(TTFont(names[1], bold or regular))
+                    fonts = names
+                except (OSError, TTFError) as e:
+                    _logger.error("Cannot load the %s report font %s: %s", language, regular, e)
+            _fonts[language] = fonts
+    return _fonts[language]
+
+
+def _report_styles(language):
+    """Paragraph and table styles of a report language, built once per process"""
+    styles = _styles.get(language)
+    if styles is not None:
+        return styles
+
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+
+    regular, bold = report_fonts(language)
+    sample = getSampleStyleSheet()
+    styles = {
+        'title': ParagraphStyle(
+            f'CustomTitle-{language}',
+            parent=sample['Heading1'],
+            fontName=bold,
+            fontSize=18,
+            spaceAfter=30,
+            alignment=1  # Center alignment
+        ),
+        'heading': ParagraphStyle(f'Heading2-{language}', parent=sample['Heading2'], fontName=bold),
+        'normal': ParagraphStyle(f'Normal-{language}', parent=sample['Normal'], fontName=regular),
+        'user_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), regular),
+            ('FONTSIZE', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('BACKGROUND', (1, 0), (1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]),
+        'cohort_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), bold),
+            ('FONTNAME', (0, 1), (-1, -1), regular),
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('LEADING', (0, 0), (-1, -1), 8.5),
+            ('ALIGN', (3, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.black)
+        ]),
+        'score_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), bold),
+            ('FONTNAME', (0, 1), (-1, -1), regular),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+            ('FONTNAME', (0, -1), (-1, -1), bold),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+    }
+    _styles[language] = styles
+    return styles
+
+
+def _expand_widgets(node):
+    """Shape tree with every widget replaced by the shapes it draws, so rendering does not redo it"""
+    from reportlab.graphics.shapes import Group, UserNode
+
+    while isinstance(node, UserNode):
+        node = node.provideNode()
+    if isinstance(node, Group):
+        node.contents = [_expand_widgets(child) for child in node.contents]
+    return node
+
+
+class _ChartBackgrounds:
+    """Axes, grid and labels of the report charts for one language and competency set"""
+
+    # Size of the chart drawings, the bar chart's plot area and the radar's center and radius
+    BAR_SIZE = (420, 230)
+    BAR_AREA = (40, 85, 370, 135)
+    RADAR_SIZE = (420, 250)
+    RADAR_CENTER = (210, 125)
+    RADAR_RADIUS = 100
+
+    def __init__(self, language, competencies):
+        from reportlab.graphics.charts.barcharts import VerticalBarChart
+        from reportlab.graphics.charts.spider import SpiderChart
+        from reportlab.lib import colors
+
+        self.font, _ = report_fonts(language)
+        self.count = len(competencies)
+        names = [LABELS[language]['competencies'].get(competency, competency) for competency in competencies]
+        grid = colors.HexColor(CHART_GRID_COLOR)
+
+        # A bar chart without bars leaves the value grid and the competency names
+        chart = VerticalBarChart()
+        chart.x, chart.y, chart.width, chart.height = self.BAR_AREA
+        chart.data = [[0] * self.count]
+        chart.bars[0].fillColor = None
+        chart.bars[0].strokeColor = None
+        chart.valueAxis.valueMin = 0
+        chart.valueAxis.valueMax = 100
+        chart.valueAxis.valueStep = 20
+        chart.valueAxis.labelTextFormat = '%d%%'
+        chart.valueAxis.labels.fontName = self.font
+        chart.valueAxis.labels.fontSize = 8
+        chart.valueAxis.visibleGrid = True
+        chart.valueAxis.gridStrokeColor = grid
+        chart.categoryAxis.categoryNames = names
+        chart.categoryAxis.labels.fontName = self.font
+        chart.categoryAxis.labels.fontSize = 8
+        chart.categoryAxis.labels.angle = 30
+        chart.categoryAxis.labels.boxAnchor = 'ne'
+        chart.categoryAxis.labels.dy = -4
+        self.bars = _expand_widgets(chart.draw())
+
+        # A radar of a single 100% strand leaves the spokes, the outer ring and the names
+        radius = self.RADAR_RADIUS
+        spider = SpiderChart()
+        spider.x, spider.y = self.RADAR_CENTER[0] - radius, self.RADAR_CENTER[1] - radius
+        spider.width = spider.height = 2 * radius
+        spider.data = [[100] * self.count]
+        spider.labels = names
+        spider.strands[0].strokeColor = grid
+        spider.strands[0].fillColor = None
+        spider.spokes.strokeColor = grid
+        spider.spokeLabels.fontName = self.font
+        spider.spokeLabels.fontSize = 8
+        self.radar = _expand_widgets(spider.draw())
+
+    def bar_drawing(self, percentages):
+        from reportlab.graphics.shapes import Drawing, Rect, String
+        from reportlab.lib import colors
+
+        x, y, width, height = self.BAR_AREA
+        slot = width / self.count
+        drawing = Drawing(*self.BAR_SIZE)
+        drawing.add(self.bars)
+        for i, percentage in enumerate(percentages):
+            top = height * min(max(percentage, 0), 100) / 100
+            center = x + slot * (i + 0.5)
+            drawing.add(Rect(center - slot * 0.3, y, slot * 0.6, top, fillColor=colors.HexColor(CHART_COLOR),
+                             strokeColor=None))
+            drawing.add(String(center, y + top + 3, f"{percentage:.0f}%", fontName=self.font, fontSize=8,
+                               textAnchor='middle'))
+        return drawing
+
+    def radar_drawing(self, percentages):
+        import math
+        from reportlab.graphics.shapes import Drawing, Polygon
+        from reportlab.lib import colors
+
+        color = colors.HexColor(CHART_COLOR)
+        cx, cy = self.RADAR_CENTER
+        points = []
+        for i, percentage in enumerate(percentages):
+            # Clockwise from north, as SpiderChart lays out the spokes
+            angle = math.pi / 2 - 2 * math.pi * i / self.count
+            radius = self.RADAR_RADIUS * min(max(percentage, 0), 100) / 100
+            points += [cx + radius * math.cos(angle), cy + radius * math.sin(angle)]
+        drawing = Drawing(*self.RADAR_SIZE)
+        drawing.add(self.radar)
+        drawing.add(Polygon(points, strokeColor=color, strokeWidth=1.5,
+                            fillColor=colors.Color(color.red, color.green, color.blue, alpha=0.3)))
+        return drawing
+
+
+def report_charts(language, competencies, percentages):
+    """Bar and radar chart drawings of one report
+
+    The axes, grid and labels are built once per language and competency
+    set and shared by every report; a report only adds its bars and its
+    radar polygon.
+    """
+    key = (language, tuple(competencies))
+    backgrounds = _charts.get(key)
+    if backgrounds is None:
+        with _lock:
+            backgrounds = _charts.get(key)
+            if backgrounds is None:
+                backgrounds = _charts[key] = _ChartBackgrounds(language, competencies)
+    return backgrounds.bar_drawing(percentages), backgrounds.radar_drawing(percentages)
+
+
+def report_language(language):
+    """Language a report can actually be written in, English when its font is missing"""
+    if language not in LABELS or report_fonts(language) is None:
+        return 'en'
+    return language
+
+
+@timed('reports')
+def generate_assessment_pdf(user_data, scores, interpretations, overall_assessment, total_possible, user_type="employee",
+                            output_path=None, language=None):
+    """Generate PDF report for assessment results and return its file path
+
+    The report goes to a new temporary file unless ``output_path`` is given.
+    It is written in ``language``, by default the language in ``user_data``.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+    from reportlab.lib.units import inch
+    
+    language = report_language(language or user_data.get('language') or 'en')
+    labels = LABELS[language]
+    styles = _report_styles(language)
+    
+    if output_path is None:
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+        temp_file.close()
+        output_path = temp_file.name
+    doc = SimpleDocTemplate(output_path, pagesize=A4)
+    story = []
+    
+    # Title
+    story.append(Paragraph(labels['company'], styles['title']))
+    story.append(Paragraph(labels['title'], styles['title']))
+    story.append(Spacer(1, 20))
+    
+    # User Information
+    if user_type == "employee":
+        user_info = [
+            [labels['employee_id'], user_data.get('employee_id', 'N/A')],
+            [labels['name'], user_data.get('employee_name', 'N/A')],
+            [labels['department'], user_data.get('department', 'N/A')],
+            [labels['date'], user_data.get('submit_date', 'N/A')]
+        ]
+    else:  # candidate
+        user_info = [
+            [labels['candidate_code'], user_data.get('candidate_code', 'N/A')],
+            [labels['name'], user_data.get('full_name', 'N/A')],
+            [labels['position_applied'], user_data.get('position_applied', 'N/A')],
+            [labels['date'], user_data.get('submit_date', 'N/A')]
+        ]
+    
+    # Create user info table
+    user_table = Table(user_info, colWidths=[2*inch, 4*inch])
+    user_table.setStyle(styles['user_table'])
+    story.append(user_table)
+    story.append(Spacer(1, 20))
+    
+    # Scores section
+    story.append(Paragraph(labels['scores'], styles['heading']))
+    story.append(Spacer(1, 12))
+    
+    score_data = [[labels['competency'], labels['score'], labels['max_score'], labels['percentage']]]
+    for comp, score in scores.items():
+        max_score = total_possible.get(comp, 36)
+        percentage = f"{(score/max_score)*100:.1f}%"
+        score_data.append([labels['competencies'].get(comp, comp), str(score), str(max_score), percentage])
+    
+    # Add total row
+    total_score = sum(scores.values())
+    total_max = sum(total_possible.values())
+    total_percentage = f"{(total_score/total_max)*100:.1f}%"
+    score_data.append([labels['total'], str(total_score), str(total_max), total_percentage])
+    
+    score_table = Table(score_data, colWidths=[3*inch, 1*inch, 1*inch, 1*inch])
+    score_table.setStyle(styles['score_table'])
+    story.append(score_table)
+    story.append(Spacer(1, 20))
+    
+    # Overall assessment
+    story.append(Paragraph(labels['overall'], styles['heading']))
+    story.append(Paragraph(labels['ratings'].get(overall_assessment, overall_assessment), styles['normal']))
+    story.append(Spacer(1, 20))
+    
+    # Charts
+    competencies = list(scores)
+    percentages = [(scores[comp] / total_possible.get(comp, 36)) * 100 for comp in competencies]
+    bar_chart, radar_chart = report_charts(language, competencies, percentages)
+    story.append(Paragraph(labels['profile'], styles['heading']))
+    story.append(bar_chart)
+    story.append(radar_chart)
+    
+    # Build PDF
+    doc.build(story)
+    
+    return output_path
+
+
+# Rows per table of a cohort report, about one landscape page; the document
+# is fed one table at a time so only that many rows are held at once
+COHORT_ROWS_PER_TABLE = 36
+
+
+class _FlowableStream(list):
+    """Story that refills itself from an iterator of flowable lists whenever platypus has used it up
+
+    doc.build() takes the next flowable while len(story) is non-zero, so only
+    the flowables of the current chunk exist at any time.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = iter(chunks)
+
+    def __len__(self):
+        if not list.__len__(self):
+            self.extend(next(self._chunks, ()))
+        return list.__len__(self)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _cohort_tables(rows, competencies, header, col_widths, style, low_percentage):
+    """One Table per COHORT_ROWS_PER_TABLE rows, rows below low_percentage in red"""
+    from reportlab.lib import colors
+    from reportlab.platypus import Table
+
+    from gateway.exports import LOW_PERFORMANCE_COLOR
+
+    low_color = colors.HexColor(f"#{LOW_PERFORMANCE_COLOR}")
+    for chunk in _chunks(rows, COHORT_ROWS_PER_TABLE):
+        data = [header]
+        highlights = []
+        for employee_id, name, submit_date, scores, total_score, percentage in chunk:
+            cells = [f"{scores[competency]:g}" if competency in scores else '' for competency in competencies]
+            data.append([employee_id, name, str(submit_date or ''), *cells, f"{total_score:g}", f"{percentage:.1f}%"])
+            if percentage < low_percentage:
+                highlights.append(('BACKGROUND', (0, len(data) - 1), (-1, len(data) - 1), low_color))
+        table = Table(data, colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        if highlights:
+            table.setStyle(highlights)
+        yield [table]
+
+
+@timed('reports')
+def generate_cohort_pdf(window_id, department, output_path=None, language='en'):
+    """One department's assessments in one window as a landscape PDF and return its file path
+
+    The summary and competency averages are aggregated in SQL, then the
+    low performers and every assessment are streamed from the database into
+    the document a table at a time, so memory does not grow with the
+    department's size.
+    """
+    from datetime import datetime
+
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.units import inch
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table
+
+    from gateway import db
+    from gateway.exports import LOW_PERFORMANCE_PERCENT
+    from gateway.scoring import describe_level, level_code
+
+    language = report_language(language)
+    labels = LABELS[language]
+    styles = _report_styles(language)
+    regular, _ = report_fonts(language)
+
+    stats = db.load_cohort_stats(window_id, department, LOW_PERFORMANCE_PERCENT)
+    averages = db.load_competency_summary('employee', department=department, window_id=window_id)
+    window_name = stats['window_name'] or str(window_id)
+
+    if output_path is None:
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+        temp_file.close()
+        output_path = temp_file.name
+    doc = SimpleDocTemplate(output_path, pagesize=landscape(A4), leftMargin=36, rightMargin=36,
+                            topMargin=36, bottomMargin=36, title=f"{labels['cohort_title']} - {department}")
+
+    def footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont(regular, 8)
+        canvas.drawString(36, 20, f"{department} - {window_name}")
+        canvas.drawRightString(doc.pagesize[0] - 36, 20, f"{labels['page']} {doc.page}")
+        canvas.restoreState()
+
+    def story():
+        header = [
+            Paragraph(labels['company'], styles['title']),
+            Paragraph(labels['cohort_title'], styles['title'])
+        ]
+        info = Table([
+            [labels['department'], department],
+            [labels['window'], window_name],
+            [labels['generated'], datetime.now().strftime('%Y-%m-%d %H:%M')]
+        ], colWidths=[2*inch, 4*inch])
+        info.setStyle(styles['user_table'])
+        header += [info, Spacer(1, 16)]
+
+        # Summary, one aggregate query
+        count = stats['assessments']
+        summary = [[labels['assessments'], str(count)]]
+        if count:
+            summary += [
+                [labels['average_score'], f"{stats['average_score']:.1f}"],
+                [labels['average_percentage'], f"{stats['average_percentage']:.1f}%"],
+                [labels['highest'], f"{stats['highest_percentage']:.1f}%"],
+                [labels['lowest'], f"{stats['lowest_percentage']:.1f}%"],
+                [labels['low_performers'].format(percent=LOW_PERFORMANCE_PERCENT), str(stats['low_performers'])]
+            ]
+        summary_table = Table(summary, colWidths=[3*inch, 1.5*inch])
+        summary_table.setStyle(styles['user_table'])
+        header += [Paragraph(labels['summary'], styles['heading']), summary_table, Spacer(1, 16)]
+        yield header
+
+        if not count:
+            return
+
+        # Competency averages, one GROUP BY over competency_scores
+        if not averages.empty:
+            rows = [[labels['competency'], labels['assessments'], labels['average_score'],
+                     labels['average_percentage'], labels['level']]]
+            for row in averages.itertuples():
+                percentage = row.average_percentage
+                rows.append([labels['competencies'].get(row.competency, row.competency), str(row.assessments),
+                             f"{row.average_score:.1f}", f"{percentage:.1f}%",
+                             describe_level(level_code(percentage), percentage, language)['level']])
+            averages_table = Table(rows, colWidths=[2.6*inch, 1.1*inch, 1.3*inch, 1.5*inch, 1.5*inch])
+            averages_table.setStyle(styles['score_table'])
+            bar_chart, _ = report_charts(language, list(averages['competency']), list(averages['average_percentage']))
+            yield [PageBreak(), Paragraph(labels['competency_averages'], styles['heading']), averages_table,
+                   Spacer(1, 12), bar_chart]
+
+        # Assessment tables, streamed from the database, a column per competency the cohort was scored on
+        competencies = list(averages['competency']) if not averages.empty else list(db.SCORE_COLUMNS)
+        competency_names = [labels['competencies'].get(name, name).replace(' ', '\n') for name in competencies]
+        table_header = [labels['employee_id'].rstrip(':'), labels['name'].rstrip(':'), labels['date'].rstrip(':'),
+                        *competency_names, labels['total'], "%"]
+        competency_width = min(56, (doc.width - 352) / len(competencies))
+        col_widths = [62, 140, 62] + [competency_width] * len(competencies) + [44, 44]
+
+        low_heading = labels['low_performers'].format(percent=LOW_PERFORMANCE_PERCENT)
+        yield [PageBreak(), Paragraph(low_heading, styles['heading'])]
+        if not stats['low_performers']:
+            yield [Paragraph(labels['none'], styles['normal'])]
+        yield from _cohort_tables(db.iter_cohort_records(window_id, department, LOW_PERFORMANCE_PERCENT),
+                                  competencies, table_header, col_widths, styles['cohort_table'],
+                                  LOW_PERFORMANCE_PERCENT)
+
+        yield [PageBreak(), Paragraph(labels['cohort'], styles['heading'])]
+        yield from _cohort_tables(db.iter_cohort_records(window_id, department),
+                                  competencies, table_header, col_widths, styles['cohort_table'],
+                                  LOW_PERFORMANCE_PERCENT)
+
+    doc.build(_FlowableStream(story()), onFirstPage=footer, onLaterPages=footer)
+    return output_path
+
+
+def report_cache_dir():
+    return os.environ.get('GATEWAY_REPORT_CACHE_DIR', os.path.join('cache', 'reports'))
+
+
+def generate_stored_report(user_data, scores, total_possible, user_type="employee", output_path=None):
+    """Report of a stored assessment as yielded by db.iter_report_data, rated like the emailed one"""
+    from gateway.scoring import get_interpretation
+
+    interpretations, overall_assessment = get_interpretation(scores, total_possible)
+    user_data = dict(user_data, submit_date=str(user_data['submit_date']))
+    return generate_assessment_pdf(user_data, scores, interpretations, overall_assessment, total_possible,
+                                   user_type, output_path=output_path)
+
+
+def cached_report(assessment_id, user_data, scores, total_possible, user_type="employee"):
+    """Path of a stored assessment's report in the report cache, rendered if it is not there yet
+
+    The file name holds a digest of what the report shows, so a rescored or
+    renamed assessment gets a new report and the outdated one is removed.
+    Each assessment has its own folder, so that takes one small listing.
+    """
+    directory = os.path.join(report_cache_dir(), user_type, str(assessment_id))
+    key = json.dumps([user_data, scores, total_possible], sort_keys=True, default=str)
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(directory, f"{digest}.pdf")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        generate_stored_report(user_data, scores, total_possible, user_type, output_path=temp_path)
+        # Renamed into place whole, so concurrent downloads never read half a report
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    for name in os.listdir(directory):
+        if name.endswith('.pdf') and name != os.path.basename(path):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    return path
+
+
+class _ZipSink:
+    """Write-only file for zipfile that hands back what was written since the last take()"""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_reports_zip(records, user_type="employee"):
+    """Yield a ZIP archive of the reports of (assessment id, user_data, scores, total_possible) records in chunks
+
+    records is streamed, typically straight from db.iter_report_data, and
+    each report is yielded as soon as it is in the archive. The archive is
+    written for a stream that cannot seek, so nothing is held back until
+    the end but the central directory.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=REPORTS_ZIP_COMPRESSION) as archive:
+        for assessment_id, user_data, scores, total_possible in records:
+            owner_id = user_data.get('employee_id') or user_data.get('candidate_code')
+            archive.write(cached_report(assessment_id, user_data, scores, total_possible, user_type),
+                          f"{owner_id}_{assessment_id}.pdf")
+            yield sink.take()
+    yield sink.take()
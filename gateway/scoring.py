@@ -0,0 +1,193 @@
+"""Scoring and interpretation logic"""
+import json
+
+from gateway import encoding
+from gateway.metrics import timed
+from gateway.questions import QUESTIONS
+
+
+@timed('scoring')
+def calculate_scores(responses, language, questions=QUESTIONS):
+    scores = {}
+    total_possible = {}
+    
+    for competency in questions.keys():
+        score = 0
+        max_score = 0
+        
+        for i, question in enumerate(questions[competency][language]):
+            response = responses.get(f"{competency}_{i}", 0)
+            max_score += question["marks"]
+            
+            if question["type"] == "likert":
+                score += response * question["marks"] / 5
+            elif question["type"] == "situational":
+                if response == question["correct"]:
+                    score += question["marks"]
+            elif question["type"] == "forced_choice":
+                if response == 1:  # Second option is usually the better choice
+                    score += question["marks"]
+        
+        scores[competency] = round(score, 1)
+        total_possible[competency] = max_score
+    
+    return scores, total_possible
+
+
+# Interpretation levels from the highest, with the lowest percentage that reaches each
+LEVELS = (
+    ('E', 80),
+    ('G', 65),
+    ('A', 50),
+    ('B', 35),
+    ('P', 0)
+)
+
+# Label and description of every level code, per language. Stored rows only
+# keep the codes, so editing this text changes how past assessments read too.
+LEVEL_TEXT = {
+    "en": {
+        'E': ("Excellent", "Demonstrates exceptional competency with consistent high performance"),
+        'G': ("Good", "Shows strong competency with room for minor improvements"),
+        'A': ("Average", "Displays adequate competency but needs focused development"),
+        'B': ("Below Average", "Shows limited competency requiring significant improvement"),
+        'P': ("Poor", "Demonstrates weak competency needing immediate attention")
+    },
+    "hi": {
+        'E': ("उत्कृष्ट", "लगातार उच्च प्रदर्शन के साथ असाधारण दक्षता प्रदर्शित करता है"),
+        'G': ("अच्छा", "मामूली सुधार की गुंजाइश के साथ मजबूत दक्षता दिखाता है"),
+        'A': ("औसत", "पर्याप्त दक्षता दिखाता है लेकिन केंद्रित विकास की आवश्यकता है"),
+        'B': ("औसत से कम", "सीमित दक्षता दिखाता है जिसमें महत्वपूर्ण सुधार की आवश्यकता है"),
+        'P': ("कमज़ोर", "कमज़ोर दक्षता प्रदर्शित करता है जिस पर तुरंत ध्यान देने की आवश्यकता है")
+    }
+}
+
+# Level code of every label in any language, for interpretations built before codes were stored
+_CODE_BY_LABEL = {label: code for texts in LEVEL_TEXT.values() for code, (label, _) in texts.items()}
+
+
+def level_code(percentage):
+    for code, minimum in LEVELS:
+        if percentage >= minimum:
+            return code
+    return LEVELS[-1][0]
+
+
+def describe_level(code, percentage, language="en"):
+    """Interpretation entry of one competency, the text looked up for the language"""
+    texts = LEVEL_TEXT.get(language, LEVEL_TEXT["en"])
+    label, description = texts.get(code, (code, ""))
+    return {
+        "level": label,
+        "percentage": percentage,
+        "description": description
+    }
+
+
+@timed('scoring')
+def get_interpretation(scores, total_possible, language="en"):
+    interpretations = {}
+    overall_categories = []
+    
+    for competency, score in scores.items():
+        percentage = (score / total_possible[competency]) * 100
+        code = level_code(percentage)
+        interpretations[competency] = describe_level(code, round(percentage, 1), language)
+        overall_categories.append(code)
+    
+    # Overall assessment
+    excellent_count = overall_categories.count('E')
+    good_count = overall_categories.count('G')
+    
+    if excellent_count >= 5:
+        overall = "High Performer"
+    elif excellent_count + good_count >= 5:
+        overall = "Strong Performer"
+    elif overall_categories.count('P') >= 3:
+        overall = "Needs Development"
+    else:
+        overall = "Average Performer"
+    
+    return interpretations, overall
+
+
+def compact_interpretation(interpretations):
+    """Stored form of get_interpretation() output: level codes and percentages only"""
+    levels = {}
+    for competency, entry in interpretations.items():
+        code = _CODE_BY_LABEL.get(entry["level"]) or level_code(entry["percentage"])
+        levels[competency] = (code, entry["percentage"])
+    return encoding.pack_interpretation(levels)
+
+
+def expand_interpretation(stored, language="en"):
+    """Interpretations of a stored row, as get_interpretation() returns them
+
+    Rows written before level codes were stored hold the full JSON, their
+    text is looked up again from the level as well.
+    """
+    if not stored:
+        return {}
+    if stored.startswith('{'):
+        levels = {competency: (_CODE_BY_LABEL.get(entry["level"], entry["level"]), entry["percentage"])
+                  for competency, entry in json.loads(stored).items()}
+    else:
+        levels = encoding.unpack_interpretation(stored)
+    return {competency: describe_level(code, percentage, language) for competency, (code, percentage) in levels.items()}
+
+
+# Weights of score_answer_matrix by bank name, bank version, language and layout version.
+# A bank's version changes with every scoring change, so a reloaded bank gets new weights.
+_matrix_weights_cache = {}
+
+
+def _matrix_weights(bank, language, version):
+    key = (bank.name, bank.version, language, version)
+    weights = _matrix_weights_cache.get(key)
+    if weights is None:
+        weights = _matrix_weights_cache[key] = _build_matrix_weights(bank.questions, language, version)
+    return weights
+
+
+def _build_matrix_weights(questions, language, version):
+    import numpy as np
+
+    competencies = list(questions)
+    keys = encoding.layout(version)
+    membership = np.zeros((len(keys), len(competencies)))
+    marks = np.zeros(len(keys))
+    kinds = []
+    correct = np.full(len(keys), -1)
+    for column, key in enumerate(keys):
+        competency, _, index = key.rpartition('_')
+        question = questions[competency][language][int(index)]
+        membership[column, competencies.index(competency)] = 1
+        marks[column] = question["marks"]
+        kinds.append(question["type"])
+        if question["type"] == "situational":
+            correct[column] = question["correct"]
+    kinds = np.array(kinds)
+    return competencies, membership, marks, kinds == "likert", correct, kinds == "forced_choice"
+
+
+@timed('scoring')
+def score_answer_matrix(answers, language, bank, version=encoding.FORMAT_VERSION):
+    """calculate_scores for an (n, questions) matrix of packed answers in one pass
+
+    Returns the competency names and an (n, competencies) array of scores in
+    the same order. Blank answers count as 0, like missing keys do in
+    calculate_scores. bank is the QuestionBank the answers were given to,
+    the one their rows' bank_version names when rescoring old assessments.
+
+    This is the bulk counterpart of calculate_scores for analytics over
+    stored answers (db.load_answer_matrix), kept beside it so both apply
+    the same scoring rules.
+    """
+    import numpy as np
+
+    competencies, membership, marks, likert, correct, forced = _matrix_weights(bank, language, version)
+    values = np.where(answers == encoding.NO_ANSWER, 0, answers).astype(np.int64)
+    points = (np.where(likert, values * marks / 5, 0)
+              + np.where(values == correct, marks, 0)
+              + np.where(forced & (values == 1), marks, 0))
+    return competencies, np.round(points @ membership, 1)
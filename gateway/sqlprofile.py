@@ -0,0 +1,282 @@
+"""SQL query profiler and slow-query log
+
+When profiling is on, get_connection() hands out a connection whose cursors
+time every statement from execute() until its rows have been fetched. For
+each statement, normalized to one entry per query shape, the profiler
+records the call count, total and max time, the rows returned or changed,
+and the page or function that issued it. Statements slower than the
+threshold also go to a rotating log file together with their EXPLAIN QUERY
+PLAN.
+
+Settings, all optional:
+    GATEWAY_SQL_PROFILE      1 to profile from start-up (admins can also
+                             switch it on from the Performance page)
+    GATEWAY_SLOW_QUERY_MS    slow-query threshold in ms (default 100)
+    GATEWAY_SLOW_QUERY_LOG   log file (default logs/slow_queries.log)
+"""
+import collections
+import functools
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from gateway.config import env_flag
+
+SLOW_QUERY_LOG_BYTES = 1_000_000
+SLOW_QUERY_LOG_BACKUPS = 5
+
+# Slow queries kept in memory for the Performance page
+RECENT_SLOW_QUERIES = 50
+
+# Modules whose frames are skipped when looking for the caller of a query
+_INTERNAL_MODULES = (__name__, 'gateway.db', 'gateway.metrics', 'sqlite3', 'pandas')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _State:
+    def __init__(self):
+        self.enabled = env_flag('GATEWAY_SQL_PROFILE')
+        self.threshold = float(os.environ.get('GATEWAY_SLOW_QUERY_MS', 100)) / 1000
+        self.log_path = os.environ.get('GATEWAY_SLOW_QUERY_LOG', os.path.join('logs', 'slow_queries.log'))
+
+
+_state = _State()
+_lock = threading.Lock()
+_stats = {}
+_slow_queries = collections.deque(maxlen=RECENT_SLOW_QUERIES)
+_plans = {}
+_logger = None
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def set_enabled(enabled):
+    """Switch profiling on or off for connections opened from now on"""
+    _state.enabled = bool(enabled)
+
+
+def slow_query_threshold_ms():
+    return _state.threshold * 1000
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Query shape with literals replaced by ? and whitespace collapsed"""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(?, ...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def calling_page():
+    """Name of the show_* page running the query, else the first caller outside the data layer"""
+    frame = sys._getframe(2)
+    caller = None
+    while frame is not None:
+        name = frame.f_code.co_name
+        if name.startswith('show_'):
+            return name
+        module = frame.f_globals.get('__name__', '')
+        if caller is None and not module.startswith(_INTERNAL_MODULES):
+            caller = f"{module}.{name}"
+        frame = frame.f_back
+    return caller or 'unknown'
+
+
+def _get_logger():
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger('gateway.slow_queries')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(_state.log_path)), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                _state.log_path, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+        except OSError:
+            logger.addHandler(logging.NullHandler())
+        _logger = logger
+    return _logger
+
+
+def _query_plan(connection, sql, parameters, shape):
+    """EXPLAIN QUERY PLAN lines for a statement, cached per query shape"""
+    plan = _plans.get(shape)
+    if plan is None:
+        try:
+            # A plain cursor, so the EXPLAIN is not profiled itself
+            rows = sqlite3.Cursor(connection).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+            plan = [row[-1] for row in rows]
+        except sqlite3.Error as e:
+            plan = [f"(no plan: {e})"]
+        _plans[shape] = plan
+    return plan
+
+
+def _record(connection, sql, parameters, page, elapsed, rows):
+    shape = normalize_sql(sql)
+    with _lock:
+        stats = _stats.get(shape)
+        if stats is None:
+            stats = _stats[shape] = {'calls': 0, 'total': 0.0, 'max': 0.0, 'rows': 0, 'pages': collections.Counter()}
+        stats['calls'] += 1
+        stats['total'] += elapsed
+        stats['max'] = max(stats['max'], elapsed)
+        stats['rows'] += max(rows, 0)
+        stats['pages'][page] += 1
+
+    if elapsed >= _state.threshold:
+        plan = _query_plan(connection, sql, parameters, shape)
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'ms': elapsed * 1000,
+            'rows': rows,
+            'page': page,
+            'sql': shape,
+            'plan': plan
+        }
+        with _lock:
+            _slow_queries.appendleft(entry)
+        _get_logger().info("%.1f ms rows=%d page=%s sql=%s plan=%s",
+                           entry['ms'], rows, page, shape, ' | '.join(plan))
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times each statement through execute() and every fetch of its rows"""
+
+    _pending = None
+
+    def _start(self, sql, parameters, elapsed):
+        if self.description is None:
+            # Not a query, nothing left to fetch
+            _record(self.connection, sql, parameters, calling_page(), elapsed, self.rowcount)
+        else:
+            self._pending = [sql, parameters, calling_page(), elapsed, 0]
+
+    def _add(self, elapsed, rows):
+        if self._pending is not None:
+            self._pending[3] += elapsed
+            self._pending[4] += rows
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, parameters, page, elapsed, rows = pending
+            _record(self.connection, sql, parameters, page, elapsed, rows)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._start(sql, parameters, time.perf_counter() - start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        _record(self.connection, sql, (), calling_page(), time.perf_counter() - start, self.rowcount)
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add(time.perf_counter() - start, row is not None)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add(time.perf_counter() - start, len(rows))
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add(time.perf_counter() - start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(time.perf_counter() - start, 0)
+            self._finish()
+            raise
+        self._add(time.perf_counter() - start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose cursors, including those of execute(), are profiled"""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(path, **kwargs):
+    """sqlite3.connect(), with a profiling connection when profiling is on"""
+    if _state.enabled:
+        kwargs.setdefault('factory', ProfilingConnection)
+    return sqlite3.connect(path, **kwargs)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _slow_queries.clear()
+        _plans.clear()
+
+
+def snapshot():
+    """One row per query shape, slowest total first"""
+    with _lock:
+        rows = [{
+            'sql': shape,
+            'calls': stats['calls'],
+            'total_ms': stats['total'] * 1000,
+            'mean_ms': stats['total'] / stats['calls'] * 1000,
+            'max_ms': stats['max'] * 1000,
+            'rows': stats['rows'],
+            'pages': ', '.join(f"{page} ({count})" for page, count in stats['pages'].most_common(3))
+        } for shape, stats in _stats.items()]
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    return rows
+
+
+def recent_slow_queries():
+    """The latest slow queries, newest first"""
+    with _lock:
+        return list(_slow_queries)
@@ -0,0 +1,97 @@
+"""Assessment templates: which question bank an assessment is taken from
+
+A template names a question bank (see gateway.questions) and the roles that
+take it. A role is an employee's department or the position a candidate
+applied for; roles no template claims take DEFAULT_TEMPLATE::
+
+    register(Template('engineering', "Engineering Competency Assessment",
+                      bank_path('engineering'), roles=('Engineering', 'Design Engineer')))
+
+The bank is a directory, reloaded when it changes, or a fixed QuestionBank.
+init_database() copies the registry to the assessment_templates and
+template_competencies tables, and scores are stored per competency in
+competency_scores, so a template with new competencies needs no schema
+change. Only DEFAULT_TEMPLATE has a packed response layout (gateway.encoding);
+responses to other templates are stored as JSON.
+"""
+import threading
+
+from gateway import encoding
+from gateway.questions import QuestionBank, bank_path, current_bank
+
+DEFAULT_TEMPLATE = 'behavioral'
+
+
+class Template:
+    """A question bank and the roles that take it"""
+
+    def __init__(self, name, title, bank, roles=(), packed_layout=None):
+        self.name = name
+        self.title = title
+        self.bank = bank
+        self.roles = tuple(roles)
+        self.packed_layout = packed_layout
+
+    def current_bank(self):
+        """The bank's latest version; hold on to it for the whole rerun"""
+        if isinstance(self.bank, QuestionBank):
+            return self.bank
+        return current_bank(self.bank)
+
+    @property
+    def questions(self):
+        return self.current_bank().questions
+
+    @property
+    def competencies(self):
+        return self.current_bank().competencies
+
+    @property
+    def languages(self):
+        return self.current_bank().languages
+
+    def question_count(self, language=None):
+        return self.current_bank().question_count(language)
+
+    def max_scores(self, language=None):
+        """Highest possible score of every competency"""
+        return self.current_bank().max_scores(language)
+
+
+_lock = threading.Lock()
+_templates = {}
+_roles = {}
+
+
+def register(template):
+    """Add or replace a template and claim its roles"""
+    with _lock:
+        previous = _templates.get(template.name)
+        if previous is not None:
+            for role in previous.roles:
+                _roles.pop(role, None)
+        _templates[template.name] = template
+        for role in template.roles:
+            _roles[role] = template.name
+
+
+def get_template(name=None):
+    """Template by name, the default one for None"""
+    try:
+        return _templates[name or DEFAULT_TEMPLATE]
+    except KeyError:
+        raise ValueError(f"Unknown assessment template: {name}") from None
+
+
+def template_for_role(role):
+    """Template taken by a department or applied position"""
+    return get_template(_roles.get(role))
+
+
+def all_templates():
+    with _lock:
+        return list(_templates.values())
+
+
+register(Template(DEFAULT_TEMPLATE, "Behavioral Competency Assessment", bank_path(DEFAULT_TEMPLATE),
+                  packed_layout=encoding.FORMAT_VERSION))
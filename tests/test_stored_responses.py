@@ -0,0 +1,87 @@
+"""Stored responses survive a question bank edited after its packed layout was published
+
+    python -m unittest discover tests
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gateway import db, questions  # noqa: E402
+from gateway.scoring import calculate_scores, get_interpretation  # noqa: E402
+
+
+class ReloadedBankTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.bank_dir = os.path.join(self.directory, 'behavioral')
+        shutil.copytree(questions.bank_path(questions.DEFAULT_BANK), self.bank_dir)
+
+        environ = mock.patch.dict(os.environ, GATEWAY_DB_PATH=os.path.join(self.directory, 'assessment_data.db'))
+        environ.start()
+        self.addCleanup(environ.stop)
+        db.init_database()
+
+    def _add_question(self):
+        """Add an eighth Accountability question to the bank on disk"""
+        for name, entry in (('bank.json', {'type': 'likert', 'marks': 5}),
+                            ('en.json', {'question': 'I follow up on commitments I make.'}),
+                            ('hi.json', {'question': 'मैं अपनी प्रतिबद्धताओं का पालन करता हूँ।'})):
+            path = os.path.join(self.bank_dir, name)
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            data['competencies']['Accountability'].append(entry)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+
+    def _submit(self, bank):
+        responses = {key: 4 for key in bank.question_keys('en')}
+        scores, total_possible = calculate_scores(responses, 'en', bank.questions)
+        interpretations, _ = get_interpretation(scores, total_possible)
+        assessment_id = db.save_employee_assessment(
+            'EMP001', 'Test Employee', 'IT', 'en', None, '2025-01-01', '10:00:00', scores, responses,
+            interpretations, total_possible=total_possible, bank=bank)
+        return assessment_id, responses
+
+    def _stored(self, assessment_id):
+        conn = db.get_connection()
+        packed = conn.execute('SELECT response_data FROM assessments WHERE id = ?', (assessment_id,)).fetchone()[0]
+        conn.close()
+        stored = {row_id: responses for batch in db.iter_stored_responses('assessments')
+                  for row_id, _, responses, _, _ in batch}
+        return packed, stored[assessment_id]
+
+    def test_layout_bank_is_packed(self):
+        bank = questions.current_bank(self.bank_dir)
+        assessment_id, responses = self._submit(bank)
+        packed, stored = self._stored(assessment_id)
+        self.assertIsNotNone(packed)
+        self.assertEqual(stored, responses)
+
+    def test_reloaded_bank_with_extra_question_keeps_every_answer(self):
+        questions.current_bank(self.bank_dir)
+        self._add_question()
+        # Checked again at once rather than after the reload interval
+        questions._banks[self.bank_dir].checked = float('-inf')
+        bank = questions.current_bank(self.bank_dir)
+        self.assertIn('Accountability_7', bank.question_keys('en'))
+
+        assessment_id, responses = self._submit(bank)
+        packed, stored = self._stored(assessment_id)
+        self.assertIsNone(packed)
+        self.assertEqual(stored, responses)
+
+        # Packing stored responses later leaves the row alone
+        list(db.iter_pack_stored_responses('assessments'))
+        self.assertEqual(self._stored(assessment_id), (None, responses))
+
+
+if __name__ == '__main__':
+    unittest.main()